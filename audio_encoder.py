@@ -0,0 +1,92 @@
+"""
+音频编码工具 - float32 音频向量化转换为 16bit PCM / WAV
+"""
+import struct
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+PCM_DTYPE = np.dtype('<i2')  # 小端 16bit PCM
+DIRECT_ENCODE_SAMPLES = 2048  # 短于此长度的帧 encode_bytes 直接转换，不经过预分配缓冲区
+
+
+def build_wav_header(num_samples: int, sample_rate: int, num_channels: int = 1) -> bytes:
+    """生成44字节的标准 PCM WAV 文件头"""
+    data_size = num_samples * num_channels * 2
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', data_size + 36, b'WAVE',
+        b'fmt ', 16, 1, num_channels,
+        sample_rate, sample_rate * num_channels * 2, num_channels * 2, 16,
+        b'data', data_size
+    )
+
+
+class PCMEncoder:
+    """float32 → int16 PCM 编码器
+
+    一次向量化完成裁剪与类型转换，结果直接写入预分配的缓冲区；
+    需要文件头时使用缓存的 WAV 头模板，只回填两个长度字段。
+    """
+
+    def __init__(self, sample_rate: int = 16000, with_header: bool = False, capacity: int = 0):
+        self.sample_rate = sample_rate
+        self.with_header = with_header
+        self.header_size = WAV_HEADER_SIZE if with_header else 0
+        self.header_template = build_wav_header(0, sample_rate) if with_header else b''
+        self.capacity = 0
+        self._allocate(max(capacity, 1))
+
+    def _allocate(self, capacity: int):
+        """分配输出缓冲区（头部 + PCM 数据）以及浮点暂存区"""
+        self.capacity = capacity
+        self.raw = bytearray(self.header_size + capacity * 2)
+        self.raw[:self.header_size] = self.header_template
+        self.pcm = np.frombuffer(self.raw, dtype=PCM_DTYPE, offset=self.header_size)
+        self.scratch = np.empty(capacity, dtype=np.float32)
+
+    def encode(self, audio_data: np.ndarray) -> memoryview:
+        """编码并返回内部缓冲区的视图（零拷贝，下次调用前有效）"""
+        n = len(audio_data)
+        if n > self.capacity:
+            # 旧缓冲区可能仍被调用方的视图引用，因此分配新的而不是原地扩容
+            self._allocate(max(n, self.capacity * 2))
+
+        scratch = self.scratch[:n]
+        np.clip(audio_data, -1.0, 1.0, out=scratch)
+        np.multiply(scratch, 0x7fff, out=self.pcm[:n], casting='unsafe')
+
+        if self.with_header:
+            data_size = n * 2
+            struct.pack_into('<I', self.raw, 4, data_size + 36)
+            struct.pack_into('<I', self.raw, 40, data_size)
+
+        return memoryview(self.raw)[:self.header_size + n * 2]
+
+    def encode_bytes(self, audio_data: np.ndarray) -> bytes:
+        """编码并返回独立的 bytes 副本（可跨协程/线程持有）
+
+        短帧直接转换：结果本来就要复制一份，回填文件头与切片视图的固定开销比省下的分配更大。
+        """
+        n = len(audio_data)
+        if n < DIRECT_ENCODE_SAMPLES:
+            pcm = float_to_pcm16(audio_data).tobytes()
+            return build_wav_header(n, self.sample_rate) + pcm if self.with_header else pcm
+        return bytes(self.encode(audio_data))
+
+
+def float_to_pcm16(audio_data: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """裁剪到 [-1, 1] 并转换为 int16，可写入调用方提供的 out"""
+    if out is None:
+        out = np.empty(len(audio_data), dtype=PCM_DTYPE)
+    np.copyto(out, np.clip(audio_data, -1.0, 1.0) * 0x7fff, casting='unsafe')
+    return out
+
+
+def encode_pcm(audio_data: np.ndarray) -> bytes:
+    """生成不带文件头的 16bit PCM 数据"""
+    return float_to_pcm16(audio_data).tobytes()
+
+
+def encode_wav(audio_data: np.ndarray, sample_rate: int = 16000) -> bytes:
+    """生成完整的WAV文件（包含文件头）"""
+    return build_wav_header(len(audio_data), sample_rate) + float_to_pcm16(audio_data).tobytes()
@@ -202,88 +202,19 @@ import asyncio
 import soundcard as sc
 import numpy as np
 import websockets
-import struct
 from time import sleep
 # from quick_processor import LocalRecordProcessor
-import soxr
-
-class Buffer:
-    def __init__(self, size, dtype=np.float32):
-        self.buffer = np.zeros(size, dtype=dtype)
-        self.size = size   #容量
-        self.write_ptr = 0
-        self.read_ptr = 0
-        self.available = 0  #当前可读样本数
-        self.dtype = dtype
-
-    def write(self, data: np.ndarray):
-        n = len(data)
-        if n > self.size:
-            data = data[-self.size:]  # 只保留最新
-            n = self.size
-        end = (self.write_ptr + n) % self.size
-        if self.write_ptr < end:
-            self.buffer[self.write_ptr:end] = data
-        else:
-            part = self.size - self.write_ptr
-            self.buffer[self.write_ptr:] = data[:part]
-            self.buffer[:end] = data[part:]
-        self.write_ptr = end
-        self.available = min(self.available + n, self.size)
-
-    def read(self, n):
-        if n > self.available:
-            return None  # 数据不足
-        end = (self.read_ptr + n) % self.size
-        if self.read_ptr < end:
-            out = self.buffer[self.read_ptr:end].copy()
-        else:
-            part = self.size - self.read_ptr
-            out = np.concatenate([
-                self.buffer[self.read_ptr:],
-                self.buffer[:end]
-            ])
-        self.read_ptr = end
-        self.available -= n
-        return out
-
-audio_buffer = Buffer(10240)
-
-def low_pass_filter(input_data, target_sample_rate = 16000,sample_rate = 44100):
-    cutoff = target_sample_rate / 2
-    rc = 1 / (2 * np.pi * cutoff)
-    dt = 1 / sample_rate
-    alpha = dt / (rc + dt)
-
-    filtered = np.zeros_like(input_data, dtype=np.float32)
-    filtered[0] = input_data[0]
-
-    for i in range(1, len(input_data)):
-        filtered[i] = alpha * input_data[i] + (1 - alpha) * filtered[i - 1]
-    return filtered
-
-def resample_audio(input_data, target_sample_rate = 16000,sample_rate = 44100):
-    ratio = sample_rate / target_sample_rate
-    new_length = int(round(len(input_data) / ratio))
-    output = np.zeros(new_length, dtype=np.float32)
-
-    for i in range(new_length):
-        index = i * ratio
-        left = int(np.floor(index))
-        right = int(np.ceil(index))
-        fraction = index - left
-
-        if right >= len(input_data):
-            output[i] = input_data[left]
-        else:
-            output[i] = input_data[left] * (1 - fraction) + input_data[right] * fraction
-
-    return output
+from resampler import create_resampler
+from audio_encoder import PCMEncoder
+from ring_buffer import RingBuffer
+
+audio_buffer = RingBuffer(10240)
+send_frame = np.empty(640, dtype=np.float32)  # 预分配的发送帧
+pcm_encoder = PCMEncoder(capacity=640)
 
 def send_data_if_ready():
-    if audio_buffer.available >= 640:
-        send_buffer = audio_buffer.read(640)
-        data = encode_wav(send_buffer)
+    if audio_buffer.read_into(send_frame):
+        data = encode_wav(send_frame)
 
         # 模拟postMessage发送
         print(f"Sending data chunk: {len(data)} bytes")
@@ -292,21 +223,14 @@ def send_data_if_ready():
         return None
 
 def encode_wav(buffer):
-    # # 转换为16位PCM
-    pcm_data = (buffer * 0x7fff).astype(np.int16)
-
-    # 创建WAV数据
-    wav_data = bytearray(len(buffer) * 2)
-
-    # 仅填充音频数据
-    for i in range(len(pcm_data)):
-        struct.pack_into('<h', wav_data, i * 2, pcm_data[i])
-
-    return bytes(wav_data)
+    # 向量化转换为16位PCM，直接写入预分配缓冲区（返回视图，发送前有效）
+    return pcm_encoder.encode(buffer)
 
 
 SAMPLE_RATE = 44100
 CHANNELS = 1
+RESAMPLE_QUALITY = 'HQ'
+RESAMPLER_BACKEND = 'auto'  # soxr / polyphase / linear
 ws_url = None
 streaming = False
 
@@ -371,27 +295,27 @@ async def stream_audio_from_mic():
         mic = sc.default_microphone()
         print(f"使用麦克风: {mic.name}")
         
+        # 有状态重采样器，块边界连续
+        resampler = create_resampler(SAMPLE_RATE, 16000, quality=RESAMPLE_QUALITY, backend=RESAMPLER_BACKEND)
+        
         # 使用麦克风录制，而不是环回录制
         with mic.recorder(samplerate=SAMPLE_RATE, channels=CHANNELS) as rec:
             print("开始录制麦克风音频...")
             while streaming:
                 # 录制音频数据
                 data = await asyncio.to_thread(rec.record, 1764)  # 1764 samples = 40ms at 44.1kHz
-                data = data.reshape(-1)  # 转换为1D数组
                 
-                # 使用soxr进行高质量重采样
-                data = soxr.resample(
-                    data,
-                    SAMPLE_RATE,  # 原始采样率
-                    16000,        # 目标采样率 (ASR常用)
-                    quality=soxr.HQ
-                )
+                # 重采样到16kHz (ASR常用)
+                data = resampler.process(data)
                 
                 # 写入缓冲区
                 audio_buffer.write(data)
                 
                 # 添加小延迟以避免过度占用CPU
                 await asyncio.sleep(0.01)
+            
+            # 停止时取出重采样器中剩余的样本
+            audio_buffer.write(resampler.flush())
                 
     except Exception as e:
         print(f"[麦克风录制错误] {e}")
@@ -403,12 +327,12 @@ async def push_asr():
         async with websockets.connect(ws_url, ping_interval=None, ping_timeout=None) as websocket:
             print(f"[推流开始] 麦克风声音 → {ws_url}")
             while streaming:
+                # 挂起直到采集端写满一帧，不再轮询；超时后重新检查 streaming 标志
+                if not await audio_buffer.wait_available(640, timeout=0.5):
+                    continue
                 data = send_data_if_ready()
                 if data is not None:
                     await websocket.send(data)
-                else:
-                    # 如果没有数据，短暂休眠避免过度占用CPU
-                    await asyncio.sleep(0.001)
     except Exception as e:
         print(f"[WebSocket推送错误] {e}")
         streaming = False
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+识别准入控制基准测试 - 多路流突发送入语音段，比较不限流与三种准入策略
+
+用法: python benchmarks/bench_admission.py [--streams 20] [--seconds 10] [--quota 8]
+模拟识别服务每秒最多接受 quota 个请求，超出返回 429。每路流以突发方式产生 1~3 秒的语音段
+（稳态平均速率约为配额的 1.5 倍，所有流同时开始，起始阶段为集中突发），准入控制限制为配额的 90%，
+输出成功率（不含被合并的语音段）、服务端 429 次数、实际请求数、合并 / 丢弃 / 拒绝数与排队时长分位数。
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+LOCAL_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'realtime-asr-system-local')
+sys.path.insert(0, LOCAL_ROOT)
+
+import logging  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+from backend.admission import AdmissionRecognizer  # noqa: E402
+from backend.recognizer import Recognizer  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+class QuotaRecognizer(Recognizer):
+    """模拟按滑动一秒窗口限流的识别服务，延迟 = 0.1s + 0.05s × 音频秒数"""
+
+    name = 'fake'
+
+    def __init__(self, quota: int):
+        super().__init__(SAMPLE_RATE)
+        self.quota = quota
+        self.recent = []
+        self.requests = 0
+        self.throttled = 0
+
+    async def recognize(self, audio, on_partial=None, stream=None):
+        now = time.monotonic()
+        self.recent = [t for t in self.recent if now - t < 1.0]
+        self.requests += 1
+        if len(self.recent) >= self.quota:
+            self.throttled += 1
+            await asyncio.sleep(0.02)
+            return {"success": False, "error": "429 rate limited"}
+        self.recent.append(now)
+        await asyncio.sleep(0.1 + 0.05 * len(audio) / SAMPLE_RATE)
+        return {"success": True, "text": "ok", "processing_time": 0.1}
+
+
+async def run(policy, streams, seconds, quota, seed):
+    rng = random.Random(seed)
+    backend = QuotaRecognizer(quota)
+    if policy is None:
+        recognizer = backend
+    else:
+        recognizer = AdmissionRecognizer(backend, requests_per_second=quota * 0.9, request_burst=quota * 0.9,
+                                         policy=policy, max_wait=2.0, max_queue=streams * 2)
+    rate = quota * 1.5 / streams  # 每路流平均每秒语音段数
+
+    async def one_stream(index):
+        results = []
+        tasks = []
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            # 突发：连续几个短语音段，之后停顿
+            burst = rng.randint(1, 4)
+            for _ in range(burst):
+                audio = np.zeros(int(rng.uniform(1.0, 3.0) * SAMPLE_RATE), np.float32)
+                tasks.append(asyncio.create_task(recognizer.recognize(audio, stream=f'stream-{index}')))
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(rng.expovariate(rate / burst))
+        for task in tasks:
+            results.append(await task)
+        return results
+
+    results = [r for rs in await asyncio.gather(*(one_stream(i) for i in range(streams))) for r in rs]
+    merged = sum(1 for r in results if r.get('merged'))
+    delivered = [r for r in results if not r.get('merged')]
+    ok = sum(1 for r in delivered if r['success'])
+    admission = recognizer.metrics().get('admission', {}) if policy else {}
+    return (len(results), ok * 100 / len(delivered), backend.throttled, backend.requests, merged,
+            admission.get('dropped', 0), admission.get('rejected', 0),
+            admission.get('wait_p50', 0.0) * 1000, admission.get('wait_p95', 0.0) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--streams', type=int, default=20, help='并发音频流数')
+    parser.add_argument('--seconds', type=float, default=10.0, help='每种配置运行时长（秒）')
+    parser.add_argument('--quota', type=int, default=8, help='模拟服务每秒请求配额')
+    args = parser.parse_args()
+
+    print(f"{'策略':<14}{'语音段':>7}{'成功 %':>8}{'429':>6}{'请求数':>7}{'合并':>6}{'丢弃':>6}{'拒绝':>6}"
+          f"{'等待P50 ms':>12}{'等待P95 ms':>12}")
+    for policy in (None, 'queue', 'merge', 'drop_oldest'):
+        row = asyncio.run(run(policy, args.streams, args.seconds, args.quota, seed=1))
+        print(f"{policy or '不限流':<14}{row[0]:>7}{row[1]:>8.1f}{row[2]:>6}{row[3]:>7}{row[4]:>6}{row[5]:>6}"
+              f"{row[6]:>6}{row[7]:>12.0f}{row[8]:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+上传音频编码基准测试 - 各编码的上传字节数与端到端延迟
+
+用法: python benchmarks/bench_asr_codecs.py [--segments 40] [--uplink 2.0]
+启动本地 /v1/chat/completions 模拟服务，按 --uplink（Mbit/s）模拟上行带宽：
+服务在收到请求体后按 请求体字节数 / 带宽 额外等待，再加上与音频时长成正比的处理延迟。
+用 realtime-asr-system-local 的 QwenASRService 依次以 wav / flac / opus / mp3 发送同一批
+语音段（谐波 + 音节包络 + 底噪的合成语音），输出每秒音频的编码字节数、请求体字节数、
+编码耗时与端到端延迟。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+LOCAL_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'realtime-asr-system-local')
+sys.path.insert(0, LOCAL_ROOT)
+os.environ.setdefault('DASHSCOPE_API_KEY', 'fake-key')
+os.chdir(tempfile.mkdtemp())  # 配置模块会在当前目录创建日志文件
+
+import logging  # noqa: E402
+from config.config import Config  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+from backend import asr_service  # noqa: E402
+from backend.audio_codecs import PAYLOAD_CODECS  # noqa: E402
+from backend.audio_encoder import encode_wav  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_speech(duration, rng):
+    """合成类语音信号: 基频缓慢变化的谐波、4Hz 音节包络与 -40dB 底噪"""
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, 6))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, 6)), 0, None) ** 2
+    return (0.15 * voice * envelope + rng.normal(0, 0.01, len(t))).astype(np.float32)
+
+
+class FakeEndpoint:
+    """模拟 ASR 接口: 延迟 = 请求体字节数 / 上行带宽 + base + per_second × 音频时长"""
+
+    def __init__(self, uplink_bytes_per_second, base=0.05, per_second=0.03):
+        self.uplink = uplink_bytes_per_second
+        self.base = base
+        self.per_second = per_second
+        self.body_bytes = 0
+        self.duration = 0.0  # 当前请求的音频时长（请求按顺序发送，由调用方设置）
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in header.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':')[1])
+                body = await reader.readexactly(length)
+                self.body_bytes += length
+                await asyncio.sleep(length / self.uplink + self.base + self.per_second * self.duration)
+                data = json.dumps({
+                    'id': 'fake', 'object': 'chat.completion', 'created': 0, 'model': 'fake',
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': 'ok'}}]
+                }).encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\n\r\n' % len(data) + data)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run(codec, segments, uplink):
+    endpoint = FakeEndpoint(uplink)
+    server = await asyncio.start_server(endpoint.handle, '127.0.0.1', 0)
+    Config.ASR_BASE_URL = f'http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1'
+    Config.ASR_AUDIO_CODEC = codec
+    Config.ASR_HEDGE = False
+    Config.TRANSCRIPT_CACHE_ENABLED = False
+    service = asr_service.QwenASRService()
+
+    # 测量编码耗时：包装 encode_payload
+    encode_times = []
+    encode_payload = service.encode_payload
+
+    def timed_encode(audio_data):
+        start = time.perf_counter()
+        result = encode_payload(audio_data)
+        encode_times.append(time.perf_counter() - start)
+        return result
+    service.encode_payload = timed_encode
+
+    latencies, audio_seconds = [], 0.0
+    for wav in segments:
+        duration = (len(wav) - 44) / (SAMPLE_RATE * 2)
+        audio_seconds += duration
+        endpoint.duration = duration
+        start = time.perf_counter()
+        result = await service.recognize_speech(wav, duration)
+        assert result['success'], result
+        latencies.append(time.perf_counter() - start)
+    await service.close()
+    server.close()
+
+    latencies = np.array(latencies) * 1000
+    return (service.payload_bytes / audio_seconds, endpoint.body_bytes / audio_seconds,
+            np.mean(encode_times) * 1000, np.percentile(latencies, 50), np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--segments', type=int, default=40, help='语音段数（每段 1-5 秒）')
+    parser.add_argument('--uplink', type=float, default=2.0, help='模拟上行带宽（Mbit/s）')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    segments = [encode_wav(synthetic_speech(rng.uniform(1.0, 5.0), rng), SAMPLE_RATE)
+                for _ in range(args.segments)]
+
+    print(f"上行带宽 {args.uplink} Mbit/s，{args.segments} 个语音段")
+    print(f"{'编码':<8}{'编码字节/秒':>12}{'请求体字节/秒':>14}{'编码 ms':>10}{'P50 ms':>9}{'P95 ms':>9}")
+    for codec in PAYLOAD_CODECS:
+        try:
+            row = asyncio.run(run(codec, segments, args.uplink * 1e6 / 8))
+        except ImportError as e:
+            print(f"{codec:<8}跳过: {e}")
+            continue
+        print(f"{codec:<8}{row[0]:>12.0f}{row[1]:>14.0f}{row[2]:>10.2f}{row[3]:>9.0f}{row[4]:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
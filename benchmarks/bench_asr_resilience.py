@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+识别请求容错基准测试 - 本地模拟 OpenAI 兼容接口，注入延迟与错误
+
+用法: python benchmarks/bench_asr_resilience.py [--segments 300] [--rate 60]
+启动一个本地 /v1/chat/completions 模拟服务（延迟与音频时长成正比、带长尾，
+可注入 5xx / 429 错误与整段故障期），用 realtime-asr-system-local 的 QwenASRService
+分别以"单次请求"和"重试 + 对冲 + 熔断"两种配置发送同一批语音段，
+输出成功率、成功请求的延迟分位数、失败请求的平均耗时、请求次数、对冲次数与熔断拒绝次数。
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+LOCAL_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'realtime-asr-system-local')
+sys.path.insert(0, LOCAL_ROOT)
+os.environ.setdefault('DASHSCOPE_API_KEY', 'fake-key')
+os.chdir(tempfile.mkdtemp())  # 配置模块会在当前目录创建日志文件
+
+import logging  # noqa: E402
+from config.config import Config  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+from backend import asr_service  # noqa: E402
+
+
+class FakeEndpoint:
+    """模拟 ASR 接口: 延迟 = base + per_second × 音频时长，tail_rate 的请求慢 tail_factor 倍"""
+
+    def __init__(self, base=0.05, per_second=0.03, tail_rate=0.05, tail_factor=8.0,
+                 error_rate=0.0, throttle_rate=0.0, outage=None):
+        self.base = base
+        self.per_second = per_second
+        self.tail_rate = tail_rate
+        self.tail_factor = tail_factor
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.outage = outage  # (开始秒, 结束秒)，期间全部返回 503
+        self.started = None
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in header.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':')[1])
+                body = json.loads(await reader.readexactly(length))
+                status, payload = await self.respond(body)
+                data = json.dumps(payload).encode()
+                writer.write(b'HTTP/1.1 %d X\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\n\r\n' % (status, len(data)) + data)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, body):
+        self.requests += 1
+        audio = body['messages'][0]['content'][0]['input_audio']['data']
+        duration = len(base64.b64decode(audio.split(',', 1)[1])) / 32000
+        elapsed = time.perf_counter() - self.started
+        if self.outage and self.outage[0] <= elapsed < self.outage[1]:
+            await asyncio.sleep(self.base)
+            return 503, {'error': {'message': 'service unavailable'}}
+
+        latency = self.base + self.per_second * duration
+        if random.random() < self.tail_rate:
+            latency *= self.tail_factor
+        await asyncio.sleep(latency)
+        roll = random.random()
+        if roll < self.error_rate:
+            return 500, {'error': {'message': 'internal error'}}
+        if roll < self.error_rate + self.throttle_rate:
+            return 429, {'error': {'message': 'rate limited'}}
+        return 200, {
+            'id': 'fake', 'object': 'chat.completion', 'created': 0, 'model': 'fake',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': f'{duration:.2f}s'}}]
+        }
+
+
+def configure(resilient):
+    Config.ASR_BASE_TIMEOUT = 0.5
+    Config.ASR_TIMEOUT_PER_SECOND = 0.1
+    Config.ASR_MAX_ATTEMPTS = 3 if resilient else 1
+    Config.ASR_HEDGE = resilient
+    Config.ASR_BREAKER_FAILURES = 5 if resilient else 10 ** 9
+    Config.ASR_BREAKER_RESET = 1.0
+
+
+async def run(endpoint, resilient, segments, rate, seed):
+    random.seed(seed)
+    server = await asyncio.start_server(endpoint.handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    Config.ASR_BASE_URL = f'http://127.0.0.1:{port}/v1'
+    configure(resilient)
+    service = asr_service.QwenASRService()
+
+    async def one(duration):
+        start = time.perf_counter()
+        result = await service.recognize_speech(bytes(int(duration * 32000)), duration)
+        return result['success'], time.perf_counter() - start
+
+    endpoint.started = time.perf_counter()
+    tasks = []
+    for _ in range(segments):
+        tasks.append(asyncio.create_task(one(random.uniform(1.0, 5.0))))
+        await asyncio.sleep(1 / rate)
+    results = await asyncio.gather(*tasks)
+    await service.close()
+    server.close()
+
+    ok = np.array([r[0] for r in results])
+    latency = np.array([r[1] for r in results]) * 1000
+    failed = latency[~ok].mean() if (~ok).any() else 0.0
+    stats = service.resilience.stats
+    return (ok.mean() * 100, *np.percentile(latency[ok], [50, 95, 99]), failed, endpoint.requests,
+            stats['hedges'], stats['rejected'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--segments', type=int, default=300, help='每个场景发送的语音段数')
+    parser.add_argument('--rate', type=float, default=60.0, help='每秒发送的语音段数')
+    args = parser.parse_args()
+    duration = args.segments / args.rate
+
+    scenarios = (
+        ('长尾延迟', dict(tail_rate=0.05)),
+        ('20% 5xx + 5% 429', dict(error_rate=0.2, throttle_rate=0.05)),
+        ('中段故障期', dict(outage=(duration * 0.3, duration * 0.6))),
+    )
+    print(f"{'场景':<18}{'配置':<10}{'成功率 %':>9}{'P50 ms':>9}{'P95 ms':>9}{'P99 ms':>9}"
+          f"{'失败耗时 ms':>12}{'请求数':>8}{'对冲':>6}{'熔断拒绝':>9}")
+    for name, options in scenarios:
+        for label, resilient in (('单次请求', False), ('容错', True)):
+            row = asyncio.run(run(FakeEndpoint(**options), resilient, args.segments, args.rate, seed=1))
+            print(f"{name:<18}{label:<10}{row[0]:>9.1f}{row[1]:>9.0f}{row[2]:>9.0f}{row[3]:>9.0f}"
+                  f"{row[4]:>12.0f}{row[5]:>8}{row[6]:>6}{row[7]:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+多接口路由基准测试 - 本地启动三个模拟 OpenAI 兼容接口（快 / 慢 / 中段故障），比较路由策略
+
+用法: python benchmarks/bench_asr_router.py [--segments 400] [--rate 80]
+用 realtime-asr-system-local 的 QwenASRService 发送同一批语音段，分别只使用故障接口、
+以及三个接口按 least_outstanding / ewma 策略路由，输出成功率、延迟分位数与各接口的请求占比。
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+LOCAL_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'realtime-asr-system-local')
+sys.path.insert(0, LOCAL_ROOT)
+os.environ.setdefault('DASHSCOPE_API_KEY', 'fake-key')
+os.chdir(tempfile.mkdtemp())  # 配置模块会在当前目录创建日志文件
+
+import logging  # noqa: E402
+from config.config import Config  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+from backend import asr_service  # noqa: E402
+
+
+class FakeEndpoint:
+    """模拟 ASR 接口: 延迟 = (base + per_second × 音频时长) × slowdown，outage 期间返回 503"""
+
+    def __init__(self, name, slowdown=1.0, base=0.05, per_second=0.03, outage=None):
+        self.name = name
+        self.slowdown = slowdown
+        self.base = base
+        self.per_second = per_second
+        self.outage = outage  # (开始秒, 结束秒)
+        self.started = None
+        self.requests = 0
+        self.port = None
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in header.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':')[1])
+                body = await reader.readexactly(length)
+                status, payload = await self.respond(header.split(b' ')[0], body)
+                data = json.dumps(payload).encode()
+                writer.write(b'HTTP/1.1 %d X\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\n\r\n' % (status, len(data)) + data)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def down(self):
+        elapsed = time.perf_counter() - self.started
+        return self.outage is not None and self.outage[0] <= elapsed < self.outage[1]
+
+    async def respond(self, method, body):
+        if method == b'GET':  # 健康检查
+            return (503, {'error': {'message': 'down'}}) if self.down() else (200, {'object': 'list', 'data': []})
+        self.requests += 1
+        body = json.loads(body)
+        audio = body['messages'][0]['content'][0]['input_audio']['data']
+        duration = len(base64.b64decode(audio.split(',', 1)[1])) / 32000
+        if self.down():
+            await asyncio.sleep(self.base)
+            return 503, {'error': {'message': 'service unavailable'}}
+        await asyncio.sleep((self.base + self.per_second * duration) * self.slowdown * random.uniform(0.8, 1.2))
+        return 200, {
+            'id': 'fake', 'object': 'chat.completion', 'created': 0, 'model': 'fake',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': self.name}}]
+        }
+
+
+async def run(routing, use, segments, rate, seed):
+    random.seed(seed)
+    duration = segments / rate
+    endpoints = [FakeEndpoint('fast'), FakeEndpoint('slow', slowdown=3.0),
+                 FakeEndpoint('flaky', outage=(duration * 0.2, duration * 0.6))]
+    servers = []
+    for endpoint in endpoints:
+        server = await asyncio.start_server(endpoint.handle, '127.0.0.1', 0)
+        endpoint.port = server.sockets[0].getsockname()[1]
+        servers.append(server)
+
+    Config.TRANSCRIPT_CACHE_ENABLED = False
+    Config.ASR_STREAMING = False
+    Config.ASR_HEDGE = False
+    Config.ASR_BASE_TIMEOUT = 0.5
+    Config.ASR_TIMEOUT_PER_SECOND = 0.1
+    Config.ASR_BREAKER_FAILURES = 10 ** 9
+    Config.ASR_ROUTING = routing
+    Config.ASR_EJECT_TIME = 0.5
+    Config.ASR_HEALTH_INTERVAL = 0.2
+    Config.ASR_ENDPOINTS = [{'name': e.name, 'base_url': f'http://127.0.0.1:{e.port}/v1'}
+                            for e in endpoints if e.name in use]
+    service = asr_service.QwenASRService()
+
+    async def one(seconds):
+        start = time.perf_counter()
+        result = await service.recognize_speech(bytes(int(seconds * 32000)), seconds)
+        return result['success'], time.perf_counter() - start
+
+    for endpoint in endpoints:
+        endpoint.started = time.perf_counter()
+    tasks = []
+    for _ in range(segments):
+        tasks.append(asyncio.create_task(one(random.uniform(1.0, 5.0))))
+        await asyncio.sleep(1 / rate)
+    results = await asyncio.gather(*tasks)
+    await service.close()
+    for server in servers:
+        server.close()
+
+    ok = np.array([r[0] for r in results])
+    latency = np.array([r[1] for r in results]) * 1000
+    total = sum(e.requests for e in endpoints)
+    share = '/'.join(f'{e.requests * 100 / total:.0f}' for e in endpoints)
+    return ok.mean() * 100, *np.percentile(latency[ok], [50, 95]), total, share
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--segments', type=int, default=400, help='每种配置发送的语音段数')
+    parser.add_argument('--rate', type=float, default=80.0, help='每秒发送的语音段数')
+    args = parser.parse_args()
+
+    configs = (
+        ('单接口 (flaky)', 'least_outstanding', ('flaky',)),
+        ('least_outstanding', 'least_outstanding', ('fast', 'slow', 'flaky')),
+        ('ewma', 'ewma', ('fast', 'slow', 'flaky')),
+    )
+    print(f"{'配置':<22}{'成功率 %':>9}{'P50 ms':>9}{'P95 ms':>9}{'请求数':>8}  {'占比 % fast/slow/flaky':>22}")
+    for label, routing, use in configs:
+        row = asyncio.run(run(routing, use, args.segments, args.rate, seed=1))
+        print(f"{label:<22}{row[0]:>9.1f}{row[1]:>9.0f}{row[2]:>9.0f}{row[3]:>8}  {row[4]:>22}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+本地识别后端基准测试 - 用占用 CPU 的假模型测量 ProcessPoolRecognizer 的吞吐
+
+用法: python benchmarks/bench_local_recognizer.py [--workers 4] [--segments 64]
+假模型加载耗时 0.5 秒，识别耗时与音频时长成正比（CPU 计算）。预热全部工作进程后并发识别
+segments 个 1~5 秒的语音段，输出单进程与多进程的总耗时、实时倍数与推理占比（受本机 CPU 核数限制）。
+行为检查（结果顺序、异常与崩溃恢复、关闭）见 realtime-asr-system-local/tests/test_recognizer.py。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+LOCAL_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'realtime-asr-system-local')
+sys.path.insert(0, LOCAL_ROOT)
+
+import logging  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+from backend.recognizer import create_recognizer  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+class BusyModel:
+    """假模型：每秒音频消耗 cost_per_second 秒 CPU"""
+
+    def __init__(self, load_time: float = 0.5, cost_per_second: float = 0.02):
+        time.sleep(load_time)  # 模拟加载权重
+        self.cost_per_second = cost_per_second
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int) -> str:
+        deadline = time.perf_counter() + self.cost_per_second * len(audio) / sample_rate
+        while time.perf_counter() < deadline:  # 占用 CPU
+            np.fft.rfft(audio[:4096])
+        return f"{len(audio) / sample_rate:.2f}s"
+
+
+async def run(workers: int, segments: int):
+    recognizer = create_recognizer('local', SAMPLE_RATE, model_factory=BusyModel, workers=workers)
+    recognizer.start()
+    # 预热：等待全部工作进程加载完成
+    await asyncio.gather(*(recognizer.recognize(np.zeros(SAMPLE_RATE, np.float32)) for _ in range(workers * 2)))
+    inference_before = recognizer.metrics()['inference_time']
+
+    rng = np.random.default_rng(0)
+    durations = rng.uniform(1.0, 5.0, segments)
+    audios = [rng.standard_normal(int(d * SAMPLE_RATE)).astype(np.float32) for d in durations]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(recognizer.recognize(audio) for audio in audios))
+    elapsed = time.perf_counter() - start
+    inference = recognizer.metrics()['inference_time'] - inference_before
+    await recognizer.close()
+    failures = sum(1 for result in results if not result['success'])
+    return elapsed, float(durations.sum()), inference, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='多进程时的工作进程数')
+    parser.add_argument('--segments', type=int, default=64, help='语音段数')
+    args = parser.parse_args()
+
+    print(f"{'工作进程':>8}{'总耗时 s':>10}{'音频 s':>10}{'实时倍数':>10}{'推理占比 %':>12}{'失败':>6}")
+    for workers in sorted({1, args.workers}):
+        elapsed, audio_seconds, inference, failures = asyncio.run(run(workers, args.segments))
+        print(f"{workers:>8}{elapsed:>10.2f}{audio_seconds:>10.1f}{audio_seconds / elapsed:>10.0f}"
+              f"{inference / workers / elapsed * 100:>12.0f}{failures:>6}")
+
+
+if __name__ == '__main__':
+    main()
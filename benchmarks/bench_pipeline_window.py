@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+识别窗口基准测试 - 单个客户端按实时速率上传音频段，比较分离式服务器不同窗口深度下的结果延迟
+
+用法: python benchmarks/bench_pipeline_window.py [--segments 40] [--interval 0.2] [--latency 0.5]
+模拟识别服务每个请求耗时 latency 秒（±30% 抖动），客户端每 interval 秒上传一个音频段
+（相当于 2 秒缓冲区按 10 倍速播放）。检查结果按上传顺序返回，输出每段从上传到收到结果的
+延迟分位数、最后一段的延迟与窗口内的最大并发数。窗口为 1 即逐段等待识别完成的旧行为。
+行为检查（结果顺序、窗口深度）见 realtime-asr-system-split/server/tests/test_pipeline_window.py。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SERVER_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'realtime-asr-system-split', 'server')
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault('DASHSCOPE_API_KEY', 'fake-key')
+os.chdir(tempfile.mkdtemp())  # 配置模块会在当前目录创建日志文件
+
+import logging  # noqa: E402
+
+from config.config import Config  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+import websockets  # noqa: E402
+
+from backend.recognizer import Recognizer  # noqa: E402
+from backend.websocket_server import ServerWebSocketASR  # noqa: E402
+
+
+class SlowRecognizer(Recognizer):
+    """模拟识别服务：固定延迟加抖动，记录最大并发数"""
+
+    def __init__(self, latency: float):
+        super().__init__(Config.SAMPLE_RATE)
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+
+    async def recognize(self, audio, on_partial=None, stream=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency * random.uniform(0.7, 1.3))
+        finally:
+            self.in_flight -= 1
+        return {"success": True, "text": f"{len(audio)}", "processing_time": self.latency}
+
+
+async def run(window, segments, interval, latency):
+    random.seed(1)
+    Config.PIPELINE_WINDOW = window
+    server = ServerWebSocketASR()
+    server.recognizer = SlowRecognizer(latency)
+    async with websockets.serve(server.handle_client, '127.0.0.1', 0) as ws_server:
+        port = list(ws_server.sockets)[0].getsockname()[1]
+        async with websockets.connect(f'ws://127.0.0.1:{port}') as client:
+            await client.recv()  # 连接状态消息
+            sent = {}
+
+            async def produce():
+                for sequence in range(segments):
+                    await asyncio.sleep(interval)
+                    sent[sequence] = time.perf_counter()
+                    await client.send(bytes(int(2 * Config.SAMPLE_RATE) * 2))
+
+            producer = asyncio.create_task(produce())
+            latencies = []
+            for expected in range(segments):
+                message = json.loads(await client.recv())
+                assert message['type'] == 'transcript' and message['sequence'] == expected, message
+                latencies.append(time.perf_counter() - sent[expected])
+            await producer
+    latencies = np.array(latencies) * 1000
+    return (*np.percentile(latencies, [50, 95]), latencies[-1], server.recognizer.peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--segments', type=int, default=40, help='上传的音频段数')
+    parser.add_argument('--interval', type=float, default=0.2, help='上传间隔（秒）')
+    parser.add_argument('--latency', type=float, default=0.5, help='模拟识别延迟（秒）')
+    args = parser.parse_args()
+
+    print(f"{'窗口':>6}{'P50 ms':>10}{'P95 ms':>10}{'最后一段 ms':>13}{'最大并发':>10}")
+    for window in (1, 2, 4, 8):
+        row = asyncio.run(run(window, args.segments, args.interval, args.latency))
+        print(f"{window:>6}{row[0]:>10.0f}{row[1]:>10.0f}{row[2]:>13.0f}{row[3]:>10}")
+    print("结果均按上传顺序返回")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+推流等待方式基准测试 - sleep(0) 忙轮询 / sleep(0.001) 轮询 / RingBuffer.wait_available 事件唤醒
+
+用法: python benchmarks/bench_push_idle.py [--seconds 5]
+采集线程每 40ms 写入 640 个样本（模拟 16kHz 环回录音），推流协程每凑满一帧就读出。
+输出进程 CPU 占用（单核百分比）以及从写入到读出的延迟。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ring_buffer import RingBuffer
+
+FRAME = 640
+INTERVAL = 0.04
+
+
+def capture_thread(buffer, write_times, stop):
+    """模拟采集线程：每帧首样本写入帧序号，并记录写入时刻"""
+    index = 0
+    next_time = time.perf_counter()
+    while not stop.is_set():
+        frame = np.full(FRAME, index, dtype=np.float64)
+        write_times.append(time.perf_counter())
+        buffer.write(frame)
+        index += 1
+        next_time += INTERVAL
+        time.sleep(max(0.0, next_time - time.perf_counter()))
+
+
+async def consume(mode, buffer, write_times, deadline, latencies):
+    frame = np.empty(FRAME, dtype=np.float64)
+    while time.perf_counter() < deadline:
+        if mode == 'event':
+            if not await buffer.wait_available(FRAME, timeout=0.5):
+                continue
+        if buffer.read_into(frame):
+            latencies.append(time.perf_counter() - write_times[int(frame[0])])
+        elif mode == 'sleep0':
+            await asyncio.sleep(0)
+        elif mode == 'sleep1ms':
+            await asyncio.sleep(0.001)
+
+
+def run(mode, seconds):
+    buffer = RingBuffer(10240, dtype=np.float64)
+    write_times, latencies = [], []
+    stop = threading.Event()
+    producer = threading.Thread(target=capture_thread, args=(buffer, write_times, stop), daemon=True)
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    producer.start()
+    asyncio.run(consume(mode, buffer, write_times, wall_start + seconds, latencies))
+    stop.set()
+    producer.join()
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    latencies = np.array(latencies) * 1000
+    return cpu / wall * 100, np.mean(latencies), np.percentile(latencies, 99), len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=5.0, help='每种方式的运行时长（秒）')
+    args = parser.parse_args()
+
+    print(f"{'方式':<28}{'CPU %':>8}{'平均延迟 ms':>14}{'P99 延迟 ms':>14}{'帧数':>8}")
+    for name, mode in (('asyncio.sleep(0) 忙轮询', 'sleep0'),
+                       ('asyncio.sleep(0.001) 轮询', 'sleep1ms'),
+                       ('wait_available 事件唤醒', 'event')):
+        cpu, mean, p99, frames = run(mode, args.seconds)
+        print(f"{name:<28}{cpu:>8.1f}{mean:>14.3f}{p99:>14.3f}{frames:>8}")
+
+
+if __name__ == '__main__':
+    main()
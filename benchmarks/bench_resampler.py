@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+重采样基准测试 - 逐块 soxr.resample vs 各有状态重采样后端
+
+用法: python benchmarks/bench_resampler.py [--seconds 60] [--chunk 882]
+按各质量等级输出折算为每小时音频的 CPU 秒数，以及与同后端整段处理结果的最大误差
+（有状态实现应为 0，逐块 soxr.resample 在块边界处不连续）。
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import soxr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resampler import QUALITY_LEVELS, RESAMPLER_BACKENDS, create_resampler
+
+IN_RATE = 44100
+OUT_RATE = 16000
+
+
+def cpu_seconds_per_hour(run, chunks, chunk_size):
+    """运行全部块，返回折算到一小时音频的 CPU 秒数"""
+    start = time.process_time()
+    out = run(chunks)
+    elapsed = time.process_time() - start
+    audio_seconds = len(chunks) * chunk_size / IN_RATE
+    return elapsed * 3600 / audio_seconds, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=60.0, help='测试音频时长（秒）')
+    parser.add_argument('--chunk', type=int, default=882, help='每块样本数（882 = 20ms，1764 = 40ms）')
+    args = parser.parse_args()
+
+    # 440Hz 正弦波，便于观察块边界处的不连续
+    n_chunks = int(args.seconds * IN_RATE / args.chunk)
+    t = np.arange(n_chunks * args.chunk) / IN_RATE
+    signal = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    chunks = np.split(signal, n_chunks)
+
+    print(f"块大小 {args.chunk} 样本 ({args.chunk / IN_RATE * 1000:.0f}ms)，音频 {args.seconds:.0f}s")
+    print(f"{'质量':<6}{'实现':<24}{'CPU 秒 / 音频小时':>18}{'与整段处理最大误差':>22}")
+    for quality in QUALITY_LEVELS:
+        def one_shot(chunks):
+            return np.concatenate([soxr.resample(c, IN_RATE, OUT_RATE, quality=quality) for c in chunks])
+
+        def streaming(backend):
+            def run(chunks):
+                resampler = create_resampler(IN_RATE, OUT_RATE, quality=quality, backend=backend)
+                return np.concatenate([resampler.process(c) for c in chunks] + [resampler.flush()])
+            return run
+
+        def whole(backend):
+            resampler = create_resampler(IN_RATE, OUT_RATE, quality=quality, backend=backend)
+            return np.concatenate([resampler.process(signal), resampler.flush()])
+
+        cases = [('soxr.resample 逐块', one_shot, soxr.resample(signal, IN_RATE, OUT_RATE, quality=quality))]
+        cases += [(f'{backend} 流式', streaming(backend), whole(backend)) for backend in RESAMPLER_BACKENDS]
+        for name, run, reference in cases:
+            cost, out = cpu_seconds_per_hour(run, chunks, args.chunk)
+            n = min(len(out), len(reference))
+            error = np.max(np.abs(out[:n] - reference[:n]))
+            print(f"{quality:<6}{name:<24}{cost:>18.2f}{error:>22.2e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+会话恢复基准测试 - 客户端上传过程中多次断线重连，比较有无会话时的识别请求数
+
+用法: python benchmarks/bench_session_resume.py [--segments 40] [--drops 4] [--latency 0.3]
+客户端以 asr.binary.v1 二进制帧每 0.05 秒上传一个 2 秒音频段，每上传 segments / (drops + 1) 段后
+直接中断 TCP 连接（模拟网络抖动）并立即重连：
+  - 无会话：服务器断线即取消进行中的识别，客户端重发全部未收到结果的音频段（旧行为）
+  - 有会话：客户端带上会话编号与已确认序号，服务器重发断线期间完成的结果，客户端只重发服务器未收到的音频段
+检查每个音频段恰好收到一个结果，输出识别请求数与重复请求数（模拟识别服务每个请求耗时 latency 秒）。
+行为检查（只重发未确认的结果、非二进制子协议拒绝会话、流式接入恢复）见
+realtime-asr-system-split/server/tests/test_session_resume.py。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+SERVER_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'realtime-asr-system-split', 'server')
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault('DASHSCOPE_API_KEY', 'fake-key')
+os.chdir(tempfile.mkdtemp())  # 配置模块会在当前目录创建日志文件
+
+import logging  # noqa: E402
+
+from config.config import Config  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+import websockets  # noqa: E402
+
+from backend.recognizer import Recognizer  # noqa: E402
+from backend.websocket_server import ServerWebSocketASR  # noqa: E402
+from backend.wire_protocol import SUBPROTOCOL_BINARY, decode_message, encode_audio  # noqa: E402
+
+SEGMENT = int(2 * Config.SAMPLE_RATE)
+
+
+class CountingRecognizer(Recognizer):
+    """模拟识别服务：固定延迟，记录请求数（被取消的请求同样计入）"""
+
+    def __init__(self, latency: float):
+        super().__init__(Config.SAMPLE_RATE)
+        self.latency = latency
+        self.requests = 0
+
+    async def recognize(self, audio, on_partial=None, stream=None):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return {"success": True, "text": "ok", "processing_time": self.latency}
+
+
+class ResumingClient:
+    """按分离式客户端的方式上传：未收到结果的音频段留在 unacked 中，重连后重发"""
+
+    def __init__(self, url: str, use_session: bool):
+        self.url = url
+        self.use_session = use_session
+        self.session_id = None
+        self.unacked = {}    # 序号 -> 音频帧
+        self.results = {}    # 序号 -> 收到结果的次数
+        self.websocket = None
+        self.receiver = None
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.url, subprotocols=[SUBPROTOCOL_BINARY])
+        await self.websocket.recv()  # 连接状态消息
+        received = None
+        if self.use_session:
+            acked = max(self.results, default=-1)
+            await self.websocket.send(json.dumps({"type": "session", "session_id": self.session_id,
+                                                  "acked": {"0": acked}}))
+            reply = json.loads(await self.websocket.recv())
+            self.session_id = reply['session_id']
+            if reply['resumed']:
+                received = int(reply['received'].get('0', -1))
+        for sequence, frame in sorted(self.unacked.items()):
+            if received is None or sequence > received:
+                await self.websocket.send(frame)
+        self.receiver = asyncio.create_task(self.receive(self.websocket))
+
+    async def receive(self, websocket):
+        try:
+            async for message in websocket:
+                if isinstance(message, bytes):
+                    message = decode_message(message)
+                    self.results[message['sequence']] = self.results.get(message['sequence'], 0) + 1
+                    self.unacked.pop(message['sequence'], None)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def send(self, sequence: int):
+        frame = encode_audio(bytes(SEGMENT * 2), 0, sequence, sequence * SEGMENT)
+        self.unacked[sequence] = frame
+        await self.websocket.send(frame)
+
+    async def drop(self):
+        """中断 TCP 连接，不发送关闭帧"""
+        self.websocket.transport.abort()
+        await self.receiver
+
+
+async def run(use_session, segments, drops, latency):
+    Config.SESSION_TTL = 5.0
+    server = ServerWebSocketASR()
+    server.recognizer = CountingRecognizer(latency)
+    async with websockets.serve(server.handle_client, '127.0.0.1', 0, subprotocols=[SUBPROTOCOL_BINARY]) as ws:
+        port = list(ws.sockets)[0].getsockname()[1]
+        client = ResumingClient(f'ws://127.0.0.1:{port}', use_session)
+        await client.connect()
+        drop_every = max(1, segments // (drops + 1))
+        for sequence in range(segments):
+            await client.send(sequence)
+            await asyncio.sleep(0.05)
+            if (sequence + 1) % drop_every == 0 and sequence + 1 < segments:
+                await client.drop()
+                await client.connect()
+        for _ in range(int(10 * (latency + 1) * segments)):
+            if len(client.results) == segments:
+                break
+            await asyncio.sleep(0.1)
+        await client.websocket.close()
+    assert sorted(client.results) == list(range(segments)), sorted(client.results)
+    assert all(count == 1 for count in client.results.values()), client.results
+    return server.recognizer.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--segments', type=int, default=40, help='上传的音频段数')
+    parser.add_argument('--drops', type=int, default=4, help='断线次数')
+    parser.add_argument('--latency', type=float, default=0.3, help='模拟识别延迟（秒）')
+    args = parser.parse_args()
+
+    print(f"{args.segments} 个音频段，断线 {args.drops} 次")
+    print(f"{'模式':<10}{'识别请求':>10}{'重复请求':>10}")
+    for label, use_session in (('无会话', False), ('会话恢复', True)):
+        requests = asyncio.run(run(use_session, args.segments, args.drops, args.latency))
+        print(f"{label:<10}{requests:>10}{requests - args.segments:>10}")
+    print("每个音频段恰好收到一个结果")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+流式接入基准测试 - 瘦客户端每 40ms 推送 640 样本的裸 PCM 帧，比较逐帧识别与服务器端 VAD 分段
+
+用法: python benchmarks/bench_stream_ingest.py [--seconds 60]
+生成 seconds 秒的合成音频（1.5~4 秒的谐波“语音”与 0.5~2 秒的静音交替），按 push_stream.py 的方式
+以 640 样本（16kHz 16位）的无头帧推送给分离式服务器（加速发送），分别不声明流（每帧一次识别）与
+先发送 start_stream 声明。另以 44.1kHz float32 双声道声明检验格式解码与重采样。
+输出识别请求数、送去识别的音频秒数与语音段边界误差（VAD 使用 energy 后端）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+SERVER_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'realtime-asr-system-split', 'server')
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault('DASHSCOPE_API_KEY', 'fake-key')
+os.chdir(tempfile.mkdtemp())  # 配置模块会在当前目录创建日志文件
+
+import logging  # noqa: E402
+
+from config.config import Config  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+import websockets  # noqa: E402
+
+from backend.recognizer import Recognizer  # noqa: E402
+from backend.resampler import create_resampler  # noqa: E402
+from backend.websocket_server import ServerWebSocketASR  # noqa: E402
+
+SAMPLE_RATE = 16000
+FRAME = 640
+
+
+class CountingRecognizer(Recognizer):
+    """记录每次识别的音频时长，立即返回"""
+
+    def __init__(self):
+        super().__init__(SAMPLE_RATE)
+        self.durations = []
+
+    async def recognize(self, audio, on_partial=None, stream=None):
+        self.durations.append(len(audio) / SAMPLE_RATE)
+        return {"success": True, "text": "ok", "processing_time": 0.0}
+
+
+def synthesize(seconds, seed):
+    """交替的谐波语音与低噪声静音，返回 (float32 音频, 语音区间列表)"""
+    rng = random.Random(seed)
+    parts, spans, position = [], [], 0
+    while position < seconds * SAMPLE_RATE:
+        silence = int(rng.uniform(0.5, 2.0) * SAMPLE_RATE)
+        parts.append(np.random.default_rng(position).normal(0, 0.002, silence))
+        position += silence
+        speech = int(rng.uniform(1.5, 4.0) * SAMPLE_RATE)
+        t = np.arange(speech) / SAMPLE_RATE
+        pitch = rng.uniform(100, 220)
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 8))
+        envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t))  # 音节起伏
+        parts.append(0.15 * voice * envelope)
+        spans.append((position, position + speech))
+        position += speech
+    return np.concatenate(parts).astype(np.float32), spans
+
+
+async def run(audio, declaration, encode, frame_size):
+    server = ServerWebSocketASR()
+    server.recognizer = CountingRecognizer()
+    async with websockets.serve(server.handle_client, '127.0.0.1', 0, max_size=None) as ws_server:
+        port = list(ws_server.sockets)[0].getsockname()[1]
+        async with websockets.connect(f'ws://127.0.0.1:{port}') as client:
+            await client.recv()  # 连接状态消息
+            if declaration is not None:
+                await client.send(json.dumps({"type": "start_stream", **declaration}))
+                assert json.loads(await client.recv())['message'] == '音频流已开始'
+            for start in range(0, len(audio), frame_size):
+                await client.send(encode(audio[start:start + frame_size]))
+            if declaration is not None:
+                await client.send(json.dumps({"type": "end_stream"}))
+            # 未声明时每帧一个结果；声明时收到“音频流已结束”后，已送入识别窗口的语音段数即结果数
+            expected = -(-len(audio) // frame_size) if declaration is None else None
+            connection = next(iter(server.connections.values()))
+            results = []
+            while expected is None or len(results) < expected:
+                message = json.loads(await asyncio.wait_for(client.recv(), 30))
+                if message['type'] == 'transcript':
+                    results.append(message)
+                elif message.get('message') == '音频流已结束':
+                    expected = connection['next_slot']
+    return server.recognizer.durations, results
+
+
+def boundary_error(results, spans):
+    """每个真实语音区间与覆盖它的识别结果区间的起止误差中位数（毫秒）"""
+    errors = []
+    for start, end in spans:
+        covering = [r for r in results if r['start_sample'] < end and r['end_sample'] > start]
+        if covering:
+            errors.append(abs(covering[0]['start_sample'] - start))
+            errors.append(abs(covering[-1]['end_sample'] - end))
+    return float(np.median(errors)) * 1000 / SAMPLE_RATE if errors else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=60.0, help='合成音频时长（秒）')
+    args = parser.parse_args()
+    Config.VAD_BACKEND = 'energy'
+    Config.VAD_OPTIONS = {}
+
+    audio, spans = synthesize(args.seconds, seed=1)
+    pcm16 = lambda chunk: (chunk * 32767).astype('<i2').tobytes()  # noqa: E731
+    resampler = create_resampler(SAMPLE_RATE, 44100)
+    stereo44k = resampler.process(audio)
+    stereo44k = np.concatenate([stereo44k, resampler.flush()])
+    stereo44k = np.repeat(stereo44k, 2).astype('<f4')
+
+    print(f"合成音频 {len(audio) / SAMPLE_RATE:.1f}s，其中语音 {len(spans)} 段 "
+          f"{sum(e - s for s, e in spans) / SAMPLE_RATE:.1f}s")
+    print(f"{'模式':<28}{'识别请求':>8}{'识别音频 s':>12}{'平均段长 s':>12}{'边界误差 ms':>13}")
+    cases = (
+        ('逐帧识别（未声明）', audio, None, pcm16, FRAME),
+        ('流式接入 16kHz s16le', audio, {"sample_rate": 16000, "format": "pcm_s16le"}, pcm16, FRAME),
+        ('流式接入 44.1kHz f32 双声道', stereo44k,
+         {"sample_rate": 44100, "format": "pcm_f32le", "channels": 2},
+         lambda chunk: chunk.tobytes(), 1764 * 2 + 3),  # 帧长故意不对齐采样帧
+    )
+    for label, data, declaration, encode, frame_size in cases:
+        durations, results = asyncio.run(run(data, declaration, encode, frame_size))
+        error = boundary_error(results, spans) if declaration else float('nan')
+        print(f"{label:<28}{len(durations):>8}{sum(durations):>12.1f}{np.mean(durations):>12.2f}{error:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+传输协议基准测试 - 比较 JSON 文本消息与 asr.binary.v1 二进制帧的消息大小与编解码耗时
+
+用法: python benchmarks/bench_wire_protocol.py [--messages 20000]
+识别结果（transcript / partial_transcript）分别以 JSON 与二进制帧编码后再解码，
+音频比较 2 秒 16kHz PCM 以 base64 放入 JSON 与带 24 字节帧头的二进制帧。
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+LOCAL_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'realtime-asr-system-local')
+sys.path.insert(0, LOCAL_ROOT)
+
+from backend.wire_protocol import SUBPROTOCOL_BINARY, decode_message, encode_audio, serialize  # noqa: E402
+
+
+def measure(encode, decode, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        data = encode()
+    encode_time = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for _ in range(count):
+        decode(data)
+    decode_time = (time.perf_counter() - start) / count
+    return len(data.encode('utf-8') if isinstance(data, str) else data), encode_time * 1e6, decode_time * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=20000, help='每种消息的编解码次数')
+    args = parser.parse_args()
+
+    position = {"sequence": 1234, "stream_id": 3, "start_sample": 48_000_000, "end_sample": 48_032_000}
+    transcript = {"type": "transcript", "text": "今天下午三点在会议室讨论下个季度的产品规划。",
+                  "timestamp": datetime.now().isoformat(), "processing_time": 0.42, "first_token_time": 0.18,
+                  **position}
+    partial = {"type": "partial_transcript", "text": "今天下午三点在会议室",
+               "timestamp": datetime.now().isoformat(), **position}
+    pcm = bytes(2 * 16000 * 2)
+    audio = {"type": "audio", **position}
+
+    cases = (
+        ('transcript', lambda: serialize(transcript, None), json.loads,
+         lambda: serialize(transcript, SUBPROTOCOL_BINARY), decode_message),
+        ('partial_transcript', lambda: serialize(partial, None), json.loads,
+         lambda: serialize(partial, SUBPROTOCOL_BINARY), decode_message),
+        ('audio 2s', lambda: json.dumps({**audio, "audio": base64.b64encode(pcm).decode()}),
+         lambda data: base64.b64decode(json.loads(data)["audio"]),
+         lambda: encode_audio(pcm, 3, 1234, 48_000_000), decode_message),
+    )
+    print(f"{'消息':<20}{'JSON 字节':>10}{'二进制 字节':>12}{'JSON 编/解 µs':>18}{'二进制 编/解 µs':>18}")
+    for name, json_encode, json_decode, binary_encode, binary_decode in cases:
+        count = args.messages if not name.startswith('audio') else max(1, args.messages // 20)
+        json_size, json_enc, json_dec = measure(json_encode, json_decode, count)
+        binary_size, binary_enc, binary_dec = measure(binary_encode, binary_decode, count)
+        print(f"{name:<20}{json_size:>10}{binary_size:>12}{json_enc:>10.1f}/{json_dec:<7.1f}"
+              f"{binary_enc:>10.1f}/{binary_dec:<7.1f}")
+
+
+if __name__ == '__main__':
+    main()
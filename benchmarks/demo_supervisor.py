@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+多进程监督演示 - 检验分离式服务器的监督进程模式并测量吞吐
+
+用法: python benchmarks/demo_supervisor.py [--workers 4] [--clients 16] [--segments 20]
+工作进程使用假识别后端：每个音频段在事件循环中占用 cost 秒 CPU（模拟 JSON、base64 编码与 DSP），
+多个客户端并发上传音频段。依次检查：连接分布到多个工作进程、工作进程被杀死后自动重启、
+汇总指标等于各进程之和，最后输出单进程与多进程的吞吐对比（受本机 CPU 核数限制）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+SERVER_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'realtime-asr-system-split', 'server')
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault('DASHSCOPE_API_KEY', 'fake-key')
+os.chdir(tempfile.mkdtemp())  # 配置模块会在当前目录创建日志文件
+
+import logging  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+import websockets  # noqa: E402
+
+from backend.supervisor import Supervisor, run_worker  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+def fake_worker(index, reports, report_interval):
+    """工作进程入口：换上占用 CPU 的假识别后端后按正常流程运行"""
+    logging.disable(logging.CRITICAL)
+    from config.config import Config
+    Config.WS_HOST = '127.0.0.1'
+    Config.WS_PORT = int(os.environ['DEMO_PORT'])
+    from backend.recognizer import Recognizer
+    from backend.websocket_server import server_websocket_asr
+
+    class BusyRecognizer(Recognizer):
+        def __init__(self):
+            super().__init__(SAMPLE_RATE)
+            self.requests = 0
+
+        async def recognize(self, audio, on_partial=None, stream=None):
+            self.requests += 1
+            deadline = time.perf_counter() + float(os.environ['DEMO_COST'])
+            while time.perf_counter() < deadline:  # 在事件循环中占用 CPU
+                pass
+            return {"success": True, "text": str(os.getpid()), "processing_time": 0.0}
+
+        def metrics(self):
+            return {"backend": "busy", "requests": self.requests}
+
+    server_websocket_asr.host, server_websocket_asr.port = Config.WS_HOST, Config.WS_PORT
+    server_websocket_asr.recognizer = BusyRecognizer()
+    run_worker(index, reports, report_interval)
+
+
+def fetch_metrics(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+        return json.loads(response.read())
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+async def load(port, clients, segments):
+    """clients 个连接各上传 segments 个音频段，返回 (耗时, 处理各段的工作进程 pid 集合)"""
+    async def one_client():
+        async with websockets.connect(f'ws://127.0.0.1:{port}') as client:
+            await client.recv()  # 连接状态消息
+            for _ in range(segments):
+                await client.send(bytes(SAMPLE_RATE * 2))
+            pids = set()
+            for _ in range(segments):
+                message = json.loads(await client.recv())
+                assert message['type'] == 'transcript', message
+                pids.add(message['text'])
+            return pids
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_client() for _ in range(clients)))
+    return time.perf_counter() - start, set().union(*results)
+
+
+def run(workers, clients, segments, check):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        os.environ['DEMO_PORT'] = str(probe.getsockname()[1])
+    port = int(os.environ['DEMO_PORT'])
+    supervisor = Supervisor(workers, restart_delay=0.2, report_interval=0.2, metrics_port=0,
+                            worker_target=fake_worker)
+    thread = threading.Thread(target=supervisor.run, daemon=True)
+    thread.start()
+    try:
+        assert wait_for(lambda: supervisor.http_server is not None and len(supervisor.latest) == workers)
+        metrics_port = supervisor.http_server.server_port
+
+        elapsed, pids = asyncio.run(load(port, clients, segments))
+        if check:
+            # 连接分布到多个工作进程
+            assert len(pids) > 1, pids
+            # 汇总指标等于各进程之和
+            assert wait_for(lambda: fetch_metrics(metrics_port)['combined']['recognizer']['requests']
+                            == clients * segments)
+            metrics = fetch_metrics(metrics_port)
+            assert sum(r['recognizer']['requests'] for r in metrics['per_worker'].values()) == clients * segments
+
+            # 杀死一个工作进程：监督进程重启它，服务不中断
+            victim = supervisor.processes[0].pid
+            os.kill(victim, signal.SIGKILL)
+            assert wait_for(lambda: supervisor.stats['restarts'] == 1 and len(supervisor.latest) == workers), \
+                supervisor.stats
+            assert supervisor.processes[0].pid != victim
+            asyncio.run(load(port, clients, 2))
+            metrics = fetch_metrics(metrics_port)
+            assert metrics['alive'] == workers and metrics['supervisor']['crashes'] == 1, metrics
+        return elapsed
+    finally:
+        supervisor.stop()
+        thread.join(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=max(2, min(4, os.cpu_count() or 1)), help='工作进程数')
+    parser.add_argument('--clients', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--segments', type=int, default=20, help='每个客户端上传的音频段数')
+    parser.add_argument('--cost', type=float, default=0.005, help='每个音频段占用的 CPU 秒数')
+    args = parser.parse_args()
+    os.environ['DEMO_COST'] = str(args.cost)
+
+    total = args.clients * args.segments
+    print(f"CPU 核数 {os.cpu_count()}，{args.clients} 个客户端共 {total} 个音频段，每段 {args.cost * 1000:.0f}ms CPU")
+    print(f"{'工作进程':>8}{'耗时 s':>10}{'段/秒':>10}")
+    for workers in (1, args.workers):
+        elapsed = run(workers, args.clients, args.segments, check=workers > 1)
+        print(f"{workers:>8}{elapsed:>10.2f}{total / elapsed:>10.0f}")
+    print("全部检查通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,86 +6,18 @@ import asyncio
 import soundcard as sc
 import numpy as np
 import websockets
-import struct
 from time import sleep
-import soxr
-
-class Buffer:
-    def __init__(self, size, dtype=np.float32):
-        self.buffer = np.zeros(size, dtype=dtype)
-        self.size = size   #容量
-        self.write_ptr = 0
-        self.read_ptr = 0
-        self.available = 0  #当前可读样本数
-        self.dtype = dtype
-
-    def write(self, data: np.ndarray):
-        n = len(data)
-        if n > self.size:
-            data = data[-self.size:]  # 只保留最新
-            n = self.size
-        end = (self.write_ptr + n) % self.size
-        if self.write_ptr < end:
-            self.buffer[self.write_ptr:end] = data
-        else:
-            part = self.size - self.write_ptr
-            self.buffer[self.write_ptr:] = data[:part]
-            self.buffer[:end] = data[part:]
-        self.write_ptr = end
-        self.available = min(self.available + n, self.size)
-
-    def read(self, n):
-        if n > self.available:
-            return None  # 数据不足
-        end = (self.read_ptr + n) % self.size
-        if self.read_ptr < end:
-            out = self.buffer[self.read_ptr:end].copy()
-        else:
-            part = self.size - self.read_ptr
-            out = np.concatenate([
-                self.buffer[self.read_ptr:],
-                self.buffer[:end]
-            ])
-        self.read_ptr = end
-        self.available -= n
-        return out
-audio_buffer = Buffer(10240)
-
-def low_pass_filter(input_data, target_sample_rate = 16000,sample_rate = 44100):
-    cutoff = target_sample_rate / 2
-    rc = 1 / (2 * np.pi * cutoff)
-    dt = 1 / sample_rate
-    alpha = dt / (rc + dt)
-
-    filtered = np.zeros_like(input_data, dtype=np.float32)
-    filtered[0] = input_data[0]
-
-    for i in range(1, len(input_data)):
-        filtered[i] = alpha * input_data[i] + (1 - alpha) * filtered[i - 1]
-    return filtered
-
-def resample_audio(input_data, target_sample_rate = 16000,sample_rate = 44100):
-    ratio = sample_rate / target_sample_rate
-    new_length = int(round(len(input_data) / ratio))
-    output = np.zeros(new_length, dtype=np.float32)
-
-    for i in range(new_length):
-        index = i * ratio
-        left = int(np.floor(index))
-        right = int(np.ceil(index))
-        fraction = index - left
-
-        if right >= len(input_data):
-            output[i] = input_data[left]
-        else:
-            output[i] = input_data[left] * (1 - fraction) + input_data[right] * fraction
-
-    return output
+from resampler import create_resampler
+from audio_encoder import PCMEncoder
+from ring_buffer import RingBuffer
+
+audio_buffer = RingBuffer(10240)
+send_frame = np.empty(640, dtype=np.float32)  # 预分配的发送帧
+pcm_encoder = PCMEncoder(capacity=640)
 
 def send_data_if_ready():
-    if audio_buffer.available >= 640:
-        send_buffer = audio_buffer.read(640)
-        data = encode_wav(send_buffer)
+    if audio_buffer.read_into(send_frame):
+        data = encode_wav(send_frame)
 
         # 模拟postMessage发送
         print(f"Sending data chunk: {len(data)} bytes")
@@ -94,22 +26,15 @@ def send_data_if_ready():
         return None
 
 def encode_wav(buffer):
-    # # 转换为16位PCM
-    pcm_data = (buffer * 0x7fff).astype(np.int16)
-
-    # 创建WAV数据
-    wav_data = bytearray(len(buffer) * 2)
-
-    # 仅填充音频数据
-    for i in range(len(pcm_data)):
-        struct.pack_into('<h', wav_data, i * 2, pcm_data[i])
-
-    return bytes(wav_data)
+    # 向量化转换为16位PCM，直接写入预分配缓冲区（返回视图，发送前有效）
+    return pcm_encoder.encode(buffer)
 
 
 
 SAMPLE_RATE = 44100
 CHANNELS = 1
+RESAMPLE_QUALITY = 'HQ'
+RESAMPLER_BACKEND = 'auto'  # soxr / polyphase / linear
 ws_url = None
 streaming = False
 
@@ -154,17 +79,12 @@ async def stream_audio():
     try:
         speaker = sc.default_speaker()
         mic = sc.get_microphone(id=str(speaker.name), include_loopback=True)
+        # 每路流一个有状态重采样器，质量预设：LQ / MQ / HQ / VHQ
+        resampler = create_resampler(SAMPLE_RATE, 16000, quality=RESAMPLE_QUALITY, backend=RESAMPLER_BACKEND)
         with mic.recorder(samplerate=SAMPLE_RATE, channels=CHANNELS) as rec:
             while True:
                 data = await asyncio.to_thread(rec.record, 1764)
-                data = data.reshape(-1)
-
-                data = soxr.resample(
-                    data,  # 输入音频数据（numpy数组）
-                    44100,  # 原始采样率（如96000）
-                    16000,  # 目标采样率（如44100）
-                    quality=soxr.HQ  # 质量预设：HQ（高）、MQ（中）、LQ（低）
-                )
+                data = resampler.process(data)
                 print("data: ", data.shape)
                 # data = low_pass_filter(data)
                 # data = resample_audio(data)
@@ -177,11 +97,11 @@ async def push_asr():
     async with websockets.connect(ws_url, ping_interval=None, ping_timeout=None) as websocket:
         print(f"[推流开始] 系统声音 → {ws_url}")
         while True:
+            # 挂起直到采集端写满一帧，而不是忙轮询
+            await audio_buffer.wait_available(640)
             data = send_data_if_ready()
             if data is not None:
                 await websocket.send(data)
-            else:
-                await asyncio.sleep(0)
 
 
 
@@ -1,9 +1,37 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import uvicorn
+"""
+Qwen3 ASR 模拟服务 - OpenAI 兼容的 /v1/chat/completions（input_audio），用于无网络环境下的压测与基准测试
+
+用法: python qwen3_asr_adapter.py [--port 8000] [--latency lognormal] [--per-second 0.1] [--error-rate 0.05] ...
+然后将服务端配置中的 ASR_BASE_URL 指向 http://localhost:8000/v1 即可。
+
+- 延迟 = base_latency + per_second × 音频时长，按所选分布（fixed / uniform / normal / lognormal）抖动，
+  tail_rate 的请求再慢 tail_factor 倍
+- 支持 stream=True：首个片段在 first_token_ratio × 延迟后返回，其余片段均匀分布在剩余时间内；
+  stream_options.include_usage 时最后发送 usage
+- 可注入 5xx 错误、随机 429、按请求速率与并发数限流的 429，以及流式输出中途断开
+- 每个请求输出一行日志，可选写入 JSONL 文件；运行中可通过 /mock/config 修改参数，/mock/stats 查看统计
+"""
+import argparse
+import asyncio
 import base64
 import io
+import json
 import logging
+import random
+import struct
+import time
+import uuid
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+try:
+    import soundfile
+except ImportError:  # 未安装 soundfile 时压缩音频按 16kHz 16位 PCM 估算时长
+    soundfile = None
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -11,55 +39,345 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+
 # 请求模型
 class ASRRequest(BaseModel):
     audio_data: str  # base64编码的音频数据
 
-# 这里应该导入Qwen3模型的相关模块
-# 由于我无法查看qwen3_omin_captioner_api.py的具体内容，
-# 以下代码是基于假设的Qwen3模型接口进行编写的
-# 您需要根据实际的Qwen3模型接口进行修改
-
-# 假设的Qwen3模型初始化
-class Qwen3ASRModel:
-    def __init__(self):
-        # 初始化Qwen3模型
-        # 这里应该包含实际的模型加载代码
-        logger.info("Qwen3 ASR模型已初始化")
-    
-    def recognize(self, base64_audio):
-        # 这里应该包含调用Qwen3模型进行语音识别的代码
-        # 由于无法查看实际的API，这里仅作示例
-        logger.info("正在使用Qwen3模型进行语音识别")
-        
-        # 假设的处理过程
-        # 1. 解码base64音频数据
-        # 2. 调用Qwen3模型进行识别
-        # 3. 返回识别结果
-        
-        # 示例返回结果
-        return "这是一段示例识别结果"
-
-# 初始化Qwen3模型实例
-qwen3_model = Qwen3ASRModel()
+
+class MockSettings(BaseModel):
+    """模拟服务参数（可在运行中通过 /mock/config 修改）"""
+    latency: str = 'lognormal'  # fixed / uniform / normal / lognormal
+    base_latency: float = 0.2  # 固定开销（秒）
+    per_second: float = 0.1  # 每秒音频增加的延迟（秒）
+    jitter: float = 0.3  # 相对抖动（uniform 半宽 / normal 与 lognormal 的标准差）
+    tail_rate: float = 0.0  # 长尾请求比例
+    tail_factor: float = 5.0  # 长尾请求的延迟倍数
+    first_token_ratio: float = 0.3  # 流式输出首个片段出现在总延迟的比例处
+    chars_per_second: float = 4.0  # 每秒音频对应的识别文本字数
+    chunk_chars: int = 2  # 流式输出每个片段的字数
+    text: str = '这是一段示例识别结果'  # 识别文本（按时长截取或重复）
+    error_rate: float = 0.0  # 返回 500 的比例
+    throttle_rate: float = 0.0  # 随机返回 429 的比例
+    rate_limit: float = 0.0  # 每秒请求数上限，超出返回 429（0 表示不限）
+    max_concurrency: int = 0  # 同时处理的请求上限，超出返回 429（0 表示不限）
+    abort_rate: float = 0.0  # 流式输出中途断开的比例
+    request_log: Optional[str] = None  # 每个请求追加一行 JSON 的日志文件
+
+
+class TokenBucket:
+    """令牌桶限流：每秒补充 rate 个令牌，最多积攒 burst 个"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class MockError(Exception):
+    """以 OpenAI 错误格式返回的 HTTP 错误"""
+
+    def __init__(self, status: int, message: str, error_type: str, headers: Optional[dict] = None):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+        self.headers = headers
+
+    def response(self) -> JSONResponse:
+        return JSONResponse(status_code=self.status, headers=self.headers, content={
+            "error": {"message": str(self), "type": self.error_type, "code": self.status}
+        })
+
+
+def audio_duration(data_uri: str) -> float:
+    """从 data URI 计算音频时长（秒）：WAV 解析文件头，其他格式用 soundfile 读取"""
+    payload = base64.b64decode(data_uri.split(',', 1)[-1], validate=False)
+    if payload[:4] == b'RIFF' and payload[8:12] == b'WAVE':
+        byte_rate, data_size = 0, 0
+        offset = 12
+        while offset + 8 <= len(payload):
+            chunk_id, chunk_size = struct.unpack('<4sI', payload[offset:offset + 8])
+            if chunk_id == b'fmt ':
+                byte_rate = struct.unpack('<I', payload[offset + 16:offset + 20])[0]
+            elif chunk_id == b'data':
+                # 流式写出的 WAV 可能不填 data 大小，以实际长度为准
+                data_size = min(chunk_size, len(payload) - offset - 8)
+                break
+            offset += 8 + chunk_size
+        if byte_rate:
+            return data_size / byte_rate
+    if soundfile is not None:
+        try:
+            return soundfile.info(io.BytesIO(payload)).duration
+        except Exception:
+            pass
+    return len(payload) / 32000
+
+
+class MockQwen3ASR:
+    """模拟的 Qwen3 ASR 模型：按音频时长产生延迟与文本，并按设置注入错误"""
+
+    def __init__(self, settings: Optional[MockSettings] = None):
+        self.settings = settings or MockSettings()
+        self.bucket = None
+        self.in_flight = 0
+        self.stats = {"requests": 0, "ok": 0, "aborted": 0, "status": {}}
+        self.configure()
+
+    def configure(self, **changes):
+        for key, value in changes.items():
+            setattr(self.settings, key, value)
+        rate = self.settings.rate_limit
+        self.bucket = TokenBucket(rate, max(1.0, rate)) if rate > 0 else None
+
+    def sample_latency(self, duration: float) -> float:
+        s = self.settings
+        mean = s.base_latency + s.per_second * duration
+        if s.latency == 'uniform':
+            latency = random.uniform(mean * (1 - s.jitter), mean * (1 + s.jitter))
+        elif s.latency == 'normal':
+            latency = random.gauss(mean, mean * s.jitter)
+        elif s.latency == 'lognormal':
+            # 均值保持为 mean 的对数正态分布
+            latency = mean * random.lognormvariate(-s.jitter ** 2 / 2, s.jitter)
+        else:
+            latency = mean
+        if random.random() < s.tail_rate:
+            latency *= s.tail_factor
+        return max(0.0, latency)
+
+    def transcript(self, duration: float) -> str:
+        """按音频时长生成识别文本"""
+        text = self.settings.text or '示例'
+        size = max(1, round(self.settings.chars_per_second * duration))
+        return (text * (size // len(text) + 1))[:size]
+
+    def admit(self) -> Optional[MockError]:
+        """限流与错误注入：429 直接抛出 MockError；注入的 500 作为返回值，在模拟延迟之后返回"""
+        s = self.settings
+        if s.max_concurrency and self.in_flight >= s.max_concurrency:
+            raise MockError(429, "Too many concurrent requests", "rate_limit_error", {"Retry-After": "1"})
+        if self.bucket is not None and not self.bucket.try_acquire():
+            raise MockError(429, "Requests rate limit exceeded", "rate_limit_error", {"Retry-After": "1"})
+        roll = random.random()
+        if roll < s.throttle_rate:
+            raise MockError(429, "Requests rate limit exceeded (injected)", "rate_limit_error",
+                            {"Retry-After": "1"})
+        if roll < s.throttle_rate + s.error_rate:
+            return MockError(500, "Internal server error (injected)", "server_error")
+        return None
+
+    def parse_audio(self, body: dict) -> float:
+        """取出 input_audio 并返回音频时长，格式不对时抛出 400"""
+        try:
+            for message in body["messages"]:
+                content = message.get("content")
+                if not isinstance(content, list):
+                    continue
+                for part in content:
+                    if part.get("type") == "input_audio":
+                        return audio_duration(part["input_audio"]["data"])
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            raise MockError(400, f"Invalid request: {e!r}", "invalid_request_error")
+        raise MockError(400, "No input_audio in messages", "invalid_request_error")
+
+    def usage(self, duration: float, text: str) -> dict:
+        # 按 Qwen 音频计费粒度粗略估算：每秒音频 25 个 token
+        prompt_tokens = int(duration * 25) + 10
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": len(text),
+                "total_tokens": prompt_tokens + len(text)}
+
+    def log_request(self, entry: dict):
+        """每个请求一行日志，设置 request_log 时同时追加到 JSONL 文件"""
+        self.stats["requests"] += 1
+        status = str(entry["status"])
+        self.stats["status"][status] = self.stats["status"].get(status, 0) + 1
+        if entry.get("aborted"):
+            self.stats["aborted"] += 1
+        elif entry["status"] == 200:
+            self.stats["ok"] += 1
+        logger.info(f"[{entry['id']}] {entry['status']} 音频 {entry['audio_seconds']:.2f}s "
+                    f"延迟 {entry['latency']:.3f}s 流式 {entry['stream']} 文本 {entry['chars']} 字"
+                    f"{' (中途断开)' if entry.get('aborted') else ''}")
+        if self.settings.request_log:
+            with open(self.settings.request_log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    async def chat_completion(self, body: dict):
+        """处理一个 /chat/completions 请求"""
+        request_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        started = time.time()
+        stream = bool(body.get("stream"))
+        entry = {"id": request_id, "time": started, "model": body.get("model"), "stream": stream,
+                 "audio_seconds": 0.0, "latency": 0.0, "chars": 0, "status": 200}
+        try:
+            duration = self.parse_audio(body)
+            entry["audio_seconds"] = round(duration, 3)
+            injected = self.admit()
+        except MockError as e:
+            entry["status"] = e.status
+            self.log_request(entry)
+            return e.response()
+
+        latency = self.sample_latency(duration)
+        text = self.transcript(duration)
+        if stream and injected is None:
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(self.stream_chunks(body, text, duration, latency, include_usage, entry),
+                                     media_type="text/event-stream")
+
+        # 注入的错误在首个片段应出现的时刻返回
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(latency if injected is None else latency * self.settings.first_token_ratio)
+        finally:
+            self.in_flight -= 1
+        entry["latency"] = round(time.time() - started, 4)
+        if injected is not None:
+            entry["status"] = injected.status
+            self.log_request(entry)
+            return injected.response()
+        entry["chars"] = len(text)
+        self.log_request(entry)
+        return JSONResponse({
+            "id": request_id, "object": "chat.completion", "created": int(started),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": self.usage(duration, text)
+        })
+
+    async def stream_chunks(self, body: dict, text: str, duration: float, latency: float,
+                            include_usage: bool, entry: dict):
+        """流式输出 SSE 片段；abort_rate 的请求在输出一半后断开连接"""
+        s = self.settings
+        pieces = [text[i:i + s.chunk_chars] for i in range(0, len(text), max(1, s.chunk_chars))]
+        first = latency * s.first_token_ratio
+        gap = (latency - first) / max(1, len(pieces) - 1)
+        abort_at = len(pieces) // 2 if random.random() < s.abort_rate else None
+
+        def chunk(delta: dict, finish_reason=None, **extra) -> str:
+            data = {"id": entry["id"], "object": "chat.completion.chunk", "created": int(entry["time"]),
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(first)
+            for index, piece in enumerate(pieces):
+                if index:
+                    await asyncio.sleep(gap)
+                if index == abort_at:
+                    entry["aborted"] = True
+                    raise ConnectionAbortedError("injected stream abort")
+                delta = {"role": "assistant", "content": piece} if index == 0 else {"content": piece}
+                entry["chars"] += len(piece)
+                yield chunk(delta)
+            yield chunk({}, "stop")
+            if include_usage:
+                usage = {"id": entry["id"], "object": "chat.completion.chunk", "created": int(entry["time"]),
+                         "model": body.get("model"), "choices": [], "usage": self.usage(duration, text)}
+                yield f"data: {json.dumps(usage)}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            self.in_flight -= 1
+            entry["latency"] = round(time.time() - entry["time"], 4)
+            self.log_request(entry)
+
+
+# 初始化模拟模型实例
+qwen3_model = MockQwen3ASR()
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    """OpenAI 兼容接口（input_audio），支持 stream=True"""
+    try:
+        body = await request.json()
+    except ValueError:
+        return MockError(400, "Request body is not valid JSON", "invalid_request_error").response()
+    return await qwen3_model.chat_completion(body)
+
+
+@app.get("/v1/models")
+@app.get("/models")
+async def list_models():
+    """模型列表（供客户端健康检查）"""
+    return {"object": "list", "data": [{"id": "qwen3-omni-mock", "object": "model", "created": 0,
+                                        "owned_by": "mock"}]}
+
 
 @app.post("/recognize")
 async def recognize_speech(request: ASRRequest):
+    """旧版接口：返回 {"text": ...}"""
     try:
         logger.info("接收到语音识别请求")
-        
-        # 调用Qwen3模型进行识别
-        recognized_text = qwen3_model.recognize(request.audio_data)
-        
-        # 返回识别结果
-        return {"text": recognized_text}
+        response = await qwen3_model.chat_completion({"messages": [{"role": "user", "content": [
+            {"type": "input_audio", "input_audio": {"data": request.audio_data}}]}]})
+        body = json.loads(response.body)
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=body["error"]["message"])
+        return {"text": body["choices"][0]["message"]["content"]}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"语音识别出错: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.get("/mock/config")
+async def get_mock_config():
+    return qwen3_model.settings.model_dump()
+
+
+@app.post("/mock/config")
+async def update_mock_config(request: Request):
+    """运行中修改模拟参数，如 {"error_rate": 0.2, "latency": "fixed"}"""
+    changes = await request.json()
+    unknown = set(changes) - set(MockSettings.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知参数: {sorted(unknown)}")
+    qwen3_model.configure(**changes)
+    logger.info(f"模拟参数已更新: {changes}")
+    return qwen3_model.settings.model_dump()
+
+
+@app.get("/mock/stats")
+async def get_mock_stats():
+    return {**qwen3_model.stats, "in_flight": qwen3_model.in_flight}
+
+
 @app.get("/")
 async def root():
-    return {"message": "Qwen3 ASR服务已启动"}
+    return {"message": "Qwen3 ASR模拟服务已启动"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8000)
+    defaults = MockSettings()
+    for name, field in MockSettings.model_fields.items():
+        value = getattr(defaults, name)
+        kind = type(value) if value is not None else str
+        parser.add_argument(f"--{name.replace('_', '-')}", type=kind, default=value, help=field.description)
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="localhost", port=8000)
\ No newline at end of file
+    args = parse_args()
+    qwen3_model.configure(**{name: getattr(args, name) for name in MockSettings.model_fields})
+    logger.info(f"模拟参数: {qwen3_model.settings.model_dump()}")
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,236 @@
+"""
+识别准入控制 - 全局令牌桶限制每秒请求数与每分钟音频秒数，预算用尽时按策略排队、合并或丢弃
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from backend.recognizer import Recognizer
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """令牌足够 amount 还需等待的秒数"""
+        self.refill(now)
+        amount = min(amount, self.capacity)  # 超过桶容量的请求只需等满桶
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class AdmissionRecognizer(Recognizer):
+    """在识别后端前做全局准入控制
+
+    requests_per_second / audio_seconds_per_minute 为 0 时不限制对应维度。
+    预算不足时请求进入 FIFO 队列，按 policy 处理：
+      queue        排队等待，超过 max_wait 秒或队列已满（max_queue）时返回错误；
+      merge        同 queue，放行时把队列中同一路流（stream）的语音段合并为一次请求，
+                   合并进来的语音段返回 {"merged": True}，文本随最早的语音段返回；
+      drop_oldest  队列已满或等待超过 max_wait 时丢弃最早的语音段（返回 {"dropped": True}），
+                   新语音段总能入队。
+    """
+
+    POLICIES = ('queue', 'merge', 'drop_oldest')
+
+    def __init__(self, recognizer: Recognizer, requests_per_second: float = 0.0, request_burst: float = 10.0,
+                 audio_seconds_per_minute: float = 0.0, audio_burst: float = 30.0, policy: str = 'queue',
+                 max_wait: float = 5.0, max_queue: int = 64, join_silence: float = 0.1):
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的准入策略: {policy}，可选 {list(self.POLICIES)}")
+        super().__init__(recognizer.sample_rate)
+        self.recognizer = recognizer
+        self.name = recognizer.name
+        self.request_bucket = TokenBucket(requests_per_second, request_burst) if requests_per_second > 0 else None
+        self.audio_bucket = (TokenBucket(audio_seconds_per_minute / 60.0, audio_burst)
+                             if audio_seconds_per_minute > 0 else None)
+        self.policy = policy
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.join_silence = join_silence
+        self.queue: Deque[dict] = deque()
+        self.dispatcher = None
+        self.waits: Deque[float] = deque(maxlen=200)  # 最近放行请求的排队时长
+        self.stats = {'admitted': 0, 'queued': 0, 'merged': 0, 'dropped': 0, 'rejected': 0}
+
+    def delay(self, audio_seconds: float, now: float) -> float:
+        """一个请求（audio_seconds 秒音频）还需等待的秒数"""
+        delay = 0.0
+        if self.request_bucket is not None:
+            delay = self.request_bucket.delay(1, now)
+        if self.audio_bucket is not None:
+            delay = max(delay, self.audio_bucket.delay(audio_seconds, now))
+        return delay
+
+    def estimated_wait(self, queued_audio: float, now: float) -> float:
+        """新的 1 秒语音段排在当前队列之后预计需要等待的秒数"""
+        wait = 0.0
+        if self.request_bucket is not None:
+            self.request_bucket.refill(now)
+            wait = (len(self.queue) + 1 - self.request_bucket.tokens) / self.request_bucket.rate
+        if self.audio_bucket is not None:
+            self.audio_bucket.refill(now)
+            wait = max(wait, (queued_audio + 1.0 - self.audio_bucket.tokens) / self.audio_bucket.rate)
+        return max(0.0, wait)
+
+    def take(self, audio_seconds: float):
+        if self.request_bucket is not None:
+            self.request_bucket.take(1)
+        if self.audio_bucket is not None:
+            self.audio_bucket.take(audio_seconds)
+
+    async def recognize(self, audio: np.ndarray, on_partial: Optional[Callable[[str], Awaitable]] = None,
+                        stream: Optional[str] = None) -> Dict[str, Any]:
+        duration = len(audio) / self.sample_rate
+        now = time.monotonic()
+        if not self.queue and self.delay(duration, now) == 0:
+            # 预算充足且无人排队，直接放行
+            self.take(duration)
+            self.admitted(0.0)
+            return await self.recognizer.recognize(audio, on_partial=on_partial, stream=stream)
+
+        entry = {'audio': audio, 'stream': stream, 'enqueued': now,
+                 'future': asyncio.get_running_loop().create_future()}
+        if len(self.queue) >= self.max_queue:
+            if self.policy != 'drop_oldest':
+                self.stats['rejected'] += 1
+                return {"success": False, "error": "识别请求过多，请稍后重试"}
+            self.drop(self.queue.popleft())
+        self.queue.append(entry)
+        self.stats['queued'] += 1
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.get_running_loop().create_task(self.dispatch())
+
+        try:
+            outcome = await entry['future']
+        except asyncio.CancelledError:
+            self.remove([entry])
+            raise
+        if isinstance(outcome, dict):  # 合并、丢弃或超时
+            return outcome
+        result = await self.recognizer.recognize(outcome, on_partial=on_partial, stream=stream)
+        result["queue_wait"] = time.monotonic() - entry['enqueued']
+        return result
+
+    async def dispatch(self):
+        """按令牌桶放行队首请求，处理超时与合并"""
+        try:
+            await self.dispatch_queue()
+        except Exception as e:
+            logger.error(f"准入控制调度失败: {e!r}")
+            while self.queue:
+                entry = self.queue.popleft()
+                if not entry['future'].done():
+                    entry['future'].set_result({"success": False, "error": f"准入控制调度失败: {e}"})
+
+    async def dispatch_queue(self):
+        while self.queue:
+            now = time.monotonic()
+            self.expire(now)
+            if not self.queue:
+                break
+            head = self.queue[0]
+            batch = [head]
+            if self.policy == 'merge' and head['stream'] is not None:
+                batch += [e for e in list(self.queue)[1:] if e['stream'] == head['stream']]
+            duration = sum(len(e['audio']) for e in batch) / self.sample_rate
+            delay = self.delay(duration, now)
+            if delay > 0:
+                # 最早的请求超时前醒来处理超时
+                await asyncio.sleep(min(delay, max(0.0, head['enqueued'] + self.max_wait - now)) + 1e-3)
+                continue
+
+            self.take(duration)
+            self.remove(batch)
+            self.admitted(now - head['enqueued'])
+            audio = head['audio']
+            if len(batch) > 1:
+                audio = self.merge([e['audio'] for e in batch])
+                for entry in batch[1:]:
+                    self.stats['merged'] += 1
+                    if not entry['future'].done():
+                        entry['future'].set_result({"success": True, "text": "", "merged": True})
+            if not head['future'].done():
+                head['future'].set_result(audio)
+
+    def remove(self, entries: List[dict]):
+        # 按对象身份移除（条目含 NumPy 数组，不能用 == 比较）
+        ids = {id(e) for e in entries}
+        self.queue = deque(e for e in self.queue if id(e) not in ids)
+
+    def expire(self, now: float):
+        """等待超过 max_wait 的请求：drop_oldest 策略下丢弃，其余策略返回超时错误"""
+        if any(e['future'].done() for e in self.queue):  # 调用方已取消
+            self.queue = deque(e for e in self.queue if not e['future'].done())
+        while self.queue and now - self.queue[0]['enqueued'] >= self.max_wait:
+            entry = self.queue.popleft()
+            if self.policy == 'drop_oldest':
+                self.drop(entry)
+            else:
+                self.stats['rejected'] += 1
+                if not entry['future'].done():
+                    entry['future'].set_result({"success": False, "error": "识别繁忙，排队超时"})
+
+    def drop(self, entry: dict):
+        self.stats['dropped'] += 1
+        logger.warning(f"识别预算不足，丢弃流 {entry['stream']} 排队 "
+                       f"{time.monotonic() - entry['enqueued']:.1f}s 的语音段")
+        if not entry['future'].done():
+            entry['future'].set_result({"success": False, "dropped": True,
+                                        "error": "识别请求过多，已丢弃较早的语音段"})
+
+    def merge(self, audios: List[np.ndarray]) -> np.ndarray:
+        gap = np.zeros(int(self.join_silence * self.sample_rate), dtype=audios[0].dtype)
+        parts = [audios[0]]
+        for audio in audios[1:]:
+            parts.append(gap)
+            parts.append(audio.astype(audios[0].dtype, copy=False))
+        return np.concatenate(parts)
+
+    def admitted(self, wait: float):
+        self.stats['admitted'] += 1
+        self.waits.append(wait)
+
+    def start(self):
+        self.recognizer.start()
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        queued_audio = sum(len(e['audio']) for e in self.queue) / self.sample_rate
+        waits = np.array(self.waits) if self.waits else np.zeros(1)
+        return {
+            **self.recognizer.metrics(),
+            "admission": {
+                "policy": self.policy,
+                "queue_length": len(self.queue),
+                "queued_audio_seconds": round(queued_audio, 2),
+                "oldest_wait": round(now - self.queue[0]['enqueued'], 3) if self.queue else 0.0,
+                "estimated_wait": round(self.estimated_wait(queued_audio, now), 3),
+                "wait_p50": round(float(np.percentile(waits, 50)), 3),
+                "wait_p95": round(float(np.percentile(waits, 95)), 3),
+                **self.stats,
+            }
+        }
+
+    async def close(self):
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+        await self.recognizer.close()
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify
 import logging
 from config.config import Config
 
@@ -19,6 +19,12 @@ def index():
     """主页面"""
     return render_template('index.html')
 
+@app.route('/metrics')
+def metrics():
+    """识别后端运行指标（缓存命中率、容错统计等）"""
+    from backend.system_audio_service import system_audio_service
+    return jsonify(system_audio_service.recognizer.metrics())
+
 if __name__ == '__main__':
     logger.info("启动 Flask 应用...")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+识别接口路由 - 在多个 OpenAI 兼容接口之间分配请求（最少进行中请求 / EWMA 延迟），
+连续失败或健康检查失败的接口被摘除，健康检查恢复后重新加入
+"""
+import asyncio
+import logging
+import random
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """一个识别接口及其负载、延迟与健康状态
+
+    client 为调用方创建的接口客户端（如 AsyncOpenAI），路由器本身不使用。
+    """
+
+    def __init__(self, name: str, client: Any, model: str):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.outstanding = 0      # 进行中的请求数
+        self.ewma = None          # 成功请求延迟的指数加权平均（秒）
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected = False
+        self.ejected_at = 0.0
+        self.ejections = 0        # 连续被摘除的次数，摘除时长随之加倍
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'model': self.model,
+            'outstanding': self.outstanding,
+            'ewma_ms': round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'ejected': self.ejected,
+        }
+
+
+class EndpointRouter:
+    """多接口负载均衡
+
+    policy 为 'least_outstanding' 时选择进行中请求最少的接口（相同时取 EWMA 延迟较低者）；
+    为 'ewma' 时选择 EWMA 延迟 ×（进行中请求数 + 1）最小的接口，尚无延迟样本的接口按全部接口
+    EWMA 的中位数计分（都没有样本时按进行中请求数选择），打分相同时取进行中请求较少者。
+    连续失败 eject_failures 次的接口被摘除至少 eject_time 秒（重复摘除时加倍，最多 8 倍），
+    之后由健康检查 probe(endpoint) 确认恢复再加入；未配置健康检查时到时自动加入。
+    健康检查每 health_interval 秒检查全部接口，失败计入连续失败次数。
+    全部接口被摘除时仍选择最早被摘除的接口，避免完全不可用。
+    """
+
+    POLICIES = ('least_outstanding', 'ewma')
+
+    def __init__(self, endpoints: List[Endpoint], policy: str = 'least_outstanding', ewma_alpha: float = 0.3,
+                 eject_failures: int = 3, eject_time: float = 10.0, health_interval: float = 5.0,
+                 probe: Optional[Callable[[Endpoint], Awaitable[bool]]] = None):
+        if not endpoints:
+            raise ValueError("至少需要一个识别接口")
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的路由策略: {policy}，可选 {list(self.POLICIES)}")
+        self.endpoints = endpoints
+        self.policy = policy
+        self.ewma_alpha = ewma_alpha
+        self.eject_failures = eject_failures
+        self.eject_time = eject_time
+        self.health_interval = health_interval
+        self.probe = probe
+        self.health_checks = probe is not None and health_interval > 0
+        self.health_task = None
+
+    def select(self, exclude: Collection[Endpoint] = ()) -> Endpoint:
+        """选择一个接口，优先不在 exclude 中的（同一语音段的重试与对冲尽量换接口）"""
+        self.start()
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if (endpoint.ejected and not self.health_checks
+                    and now - endpoint.ejected_at >= self.ejection_time(endpoint)):
+                self.readmit(endpoint)
+
+        available = [e for e in self.endpoints if not e.ejected]
+        if not available:
+            return min(self.endpoints, key=lambda e: e.ejected_at)
+        candidates = [e for e in available if e not in exclude] or available
+        random.shuffle(candidates)  # 打分相同时随机选择
+        if self.policy == 'ewma':
+            # 尚无样本的接口以中位数代替，避免其得分为 0 而承接全部请求
+            samples = [e.ewma for e in self.endpoints if e.ewma is not None]
+            default = statistics.median(samples) if samples else 0.0
+            return min(candidates, key=lambda e: ((default if e.ewma is None else e.ewma) * (e.outstanding + 1),
+                                                  e.outstanding))
+        return min(candidates, key=lambda e: (e.outstanding, e.ewma or 0.0))
+
+    def acquire(self, endpoint: Endpoint):
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+
+    def release(self, endpoint: Endpoint, latency: Optional[float] = None, failed: bool = False):
+        """请求结束：latency 为成功请求的耗时；failed 为接口侧失败（超时、5xx、429 等）"""
+        endpoint.outstanding -= 1
+        if failed:
+            endpoint.failures += 1
+            self.record_failure(endpoint)
+        elif latency is not None:
+            endpoint.ewma = latency if endpoint.ewma is None else \
+                self.ewma_alpha * latency + (1 - self.ewma_alpha) * endpoint.ewma
+            endpoint.consecutive_failures = 0
+            endpoint.ejections = 0
+
+    def record_failure(self, endpoint: Endpoint):
+        endpoint.consecutive_failures += 1
+        if not endpoint.ejected and endpoint.consecutive_failures >= self.eject_failures:
+            endpoint.ejected = True
+            endpoint.ejected_at = time.monotonic()
+            endpoint.ejections += 1
+            logger.warning(f"识别接口 {endpoint.name} 连续失败 {endpoint.consecutive_failures} 次，"
+                           f"摘除 {self.ejection_time(endpoint):.0f}s")
+
+    def readmit(self, endpoint: Endpoint):
+        endpoint.ejected = False
+        endpoint.consecutive_failures = 0
+        logger.info(f"识别接口 {endpoint.name} 恢复，重新加入")
+
+    def ejection_time(self, endpoint: Endpoint) -> float:
+        return self.eject_time * 2 ** min(3, max(0, endpoint.ejections - 1))
+
+    def start(self):
+        """在当前事件循环中启动健康检查（首次选择接口时调用）"""
+        if not self.health_checks:
+            return
+        if self.health_task is None or self.health_task.done():
+            self.health_task = asyncio.get_running_loop().create_task(self.health_loop())
+
+    async def health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await asyncio.gather(*(self.check(endpoint) for endpoint in self.endpoints))
+
+    async def check(self, endpoint: Endpoint):
+        try:
+            healthy = await self.probe(endpoint)
+        except Exception as e:
+            logger.debug(f"识别接口 {endpoint.name} 健康检查异常: {e!r}")
+            healthy = False
+        if not healthy:
+            self.record_failure(endpoint)
+        elif endpoint.ejected and time.monotonic() - endpoint.ejected_at >= self.ejection_time(endpoint):
+            self.readmit(endpoint)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    async def close(self):
+        if self.health_task is not None:
+            self.health_task.cancel()
+            self.health_task = None
@@ -0,0 +1,242 @@
+"""
+识别后端接口 - 统一 HTTP 接口识别与本进程 CPU 模型识别
+
+Recognizer.recognize 接收一维 NumPy 音频（float32 取值 [-1, 1]，或 int16 PCM），
+返回 {"success", "text", "processing_time"} 或 {"success": False, "error"}。
+"""
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WAV_HEADER_SIZE = 44
+
+
+def pcm_to_array(audio_data: bytes) -> np.ndarray:
+    """16位单声道 PCM（可带44字节WAV文件头）转为 int16 数组（不复制）"""
+    if audio_data[:4] == b'RIFF':
+        audio_data = audio_data[WAV_HEADER_SIZE:]
+    return np.frombuffer(audio_data, dtype='<i2', count=len(audio_data) // 2)
+
+
+def to_float32(audio: np.ndarray) -> np.ndarray:
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768.0
+    return np.asarray(audio, dtype=np.float32)
+
+
+def to_pcm16(audio: np.ndarray) -> bytes:
+    if audio.dtype == np.int16:
+        return audio.tobytes()
+    return (np.clip(audio, -1.0, 1.0) * 0x7fff).astype('<i2').tobytes()
+
+
+class Recognizer:
+    """识别后端接口"""
+
+    name = ''
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+
+    async def recognize(self, audio: np.ndarray, on_partial: Optional[Callable[[str], Awaitable]] = None,
+                        stream: Optional[str] = None) -> Dict[str, Any]:
+        """识别一个语音段（协程，可被取消）
+
+        支持流式的后端以累计文本调用 on_partial；stream 标识语音段所属的音频流（设备或连接），
+        供准入控制合并同一路流的语音段。
+        """
+        raise NotImplementedError
+
+    def start(self):
+        """服务启动时调用，用于预先加载模型"""
+
+    def metrics(self) -> Dict[str, Any]:
+        return {}
+
+    async def close(self):
+        pass
+
+
+class HTTPRecognizer(Recognizer):
+    """通过 OpenAI 兼容接口识别（QwenASRService）
+
+    encode 将音频数组转为16位 PCM / WAV 字节，缺省时直接转换（WAV 文件头由请求编码器补上）。
+    """
+
+    name = 'http'
+
+    def __init__(self, sample_rate: int = 16000, encode: Optional[Callable[[np.ndarray], bytes]] = None,
+                 service=None):
+        super().__init__(sample_rate)
+        if service is None:
+            from backend.asr_service import qwen_asr_service as service
+        self.service = service
+        self.encode = encode or to_pcm16
+
+    async def recognize(self, audio: np.ndarray, on_partial: Optional[Callable[[str], Awaitable]] = None,
+                        stream: Optional[str] = None) -> Dict[str, Any]:
+        return await self.service.recognize_speech(self.encode(audio), len(audio) / self.sample_rate,
+                                                   on_partial=on_partial)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.service.metrics()}
+
+    async def close(self):
+        await self.service.close()
+
+
+# 进程池工作进程内的模型实例（每个进程加载一次）
+_worker_model = None
+
+
+def load_factory(factory: Union[str, Callable]) -> Callable:
+    """'package.module:callable' 形式的路径或可调用对象"""
+    if callable(factory):
+        return factory
+    module_name, _, attr = factory.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _init_worker(factory: Union[str, Callable], options: dict):
+    global _worker_model
+    start = time.perf_counter()
+    _worker_model = load_factory(factory)(**options)
+    logger.info(f"进程 {os.getpid()} 模型加载完成，耗时 {time.perf_counter() - start:.2f}s")
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _worker_transcribe(audio: np.ndarray, sample_rate: int):
+    start = time.perf_counter()
+    text = _worker_model.transcribe(audio, sample_rate)
+    return text, time.perf_counter() - start
+
+
+class ProcessPoolRecognizer(Recognizer):
+    """本机 CPU 模型识别：进程池中每个工作进程加载一次模型，直接传入 float32 NumPy 数组
+
+    model_factory 为 'package.module:callable' 或可调用对象，以 model_options 调用后返回的模型
+    需提供 transcribe(audio: np.ndarray, sample_rate: int) -> str。
+    工作进程以 spawn 方式启动（不继承事件循环与连接池），进程池在 start() 或首次识别时创建，
+    避免工作进程导入主模块时再次创建；识别任务一旦进入工作进程，取消调用方协程不会中断该次推理。
+    工作进程崩溃时重建进程池；连续 max_restarts 次重建后仍没有一次识别成功（如模型加载失败）时
+    停止重建，restart_backoff 秒内的请求直接返回错误，之后再尝试创建一次。
+    """
+
+    name = 'local'
+
+    def __init__(self, sample_rate: int = 16000, model_factory: Union[str, Callable] = None,
+                 model_options: Optional[dict] = None, workers: int = 2, max_restarts: int = 3,
+                 restart_backoff: float = 30.0):
+        super().__init__(sample_rate)
+        if model_factory is None:
+            raise ValueError("本地识别需要指定 model_factory")
+        self.model_factory = model_factory
+        self.model_options = model_options or {}
+        self.workers = workers
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.consecutive_restarts = 0  # 上次识别成功以来进程池异常退出的次数
+        self.retry_at = 0.0            # 停止重建时，下次尝试创建进程池的时间（monotonic）
+        self.in_flight = 0
+        self.stats = {'requests': 0, 'failures': 0, 'restarts': 0, 'inference_time': 0.0}
+        self.pool = None
+
+    def start(self):
+        if self.pool is None:
+            self.pool = self.create_pool()
+
+    def create_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(self.model_factory, self.model_options))
+        pool.submit(_worker_ready)  # 立即启动工作进程并加载模型
+        return pool
+
+    async def recognize(self, audio: np.ndarray, on_partial: Optional[Callable[[str], Awaitable]] = None,
+                        stream: Optional[str] = None) -> Dict[str, Any]:
+        start = time.time()
+        self.stats['requests'] += 1
+        if self.pool is None and time.monotonic() < self.retry_at:
+            self.stats['failures'] += 1
+            return {
+                "success": False,
+                "error": f"本地识别模型不可用（进程池连续 {self.consecutive_restarts} 次异常退出），"
+                         f"{self.retry_at - time.monotonic():.0f} 秒后重试"
+            }
+        self.in_flight += 1
+        self.start()
+        pool = self.pool
+        try:
+            loop = asyncio.get_running_loop()
+            text, inference_time = await loop.run_in_executor(pool, _worker_transcribe,
+                                                              to_float32(audio), self.sample_rate)
+            self.stats['inference_time'] += inference_time
+            self.consecutive_restarts = 0
+            processing_time = time.time() - start
+            logger.info(f"本地模型识别成功，耗时: {processing_time:.2f}s 「{text}」")
+            return {
+                "success": True,
+                "text": text,
+                "processing_time": processing_time
+            }
+        except BrokenProcessPool as e:
+            self.stats['failures'] += 1
+            if pool is self.pool:
+                pool.shutdown(wait=False)
+                self.consecutive_restarts += 1
+                if self.consecutive_restarts >= self.max_restarts:
+                    logger.error(f"本地识别进程池连续 {self.consecutive_restarts} 次异常退出，"
+                                 f"{self.restart_backoff:.0f} 秒内不再重建: {e}")
+                    self.pool = None
+                    self.retry_at = time.monotonic() + self.restart_backoff
+                else:
+                    logger.error(f"本地识别进程池异常退出，重建进程池: {e}")
+                    self.stats['restarts'] += 1
+                    self.pool = self.create_pool()
+            return {
+                "success": False,
+                "error": "识别进程异常退出，请稍后重试"
+            }
+        except Exception as e:
+            self.stats['failures'] += 1
+            logger.error(f"本地模型识别失败: {e!r}")
+            return {
+                "success": False,
+                "error": f"识别失败: {str(e) or type(e).__name__}"
+            }
+        finally:
+            self.in_flight -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": self.name, "workers": self.workers, "in_flight": self.in_flight,
+                "available": self.pool is not None or time.monotonic() >= self.retry_at, **self.stats}
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+RECOGNIZER_BACKENDS = {
+    'http': HTTPRecognizer,
+    'local': ProcessPoolRecognizer,
+}
+
+
+def create_recognizer(name: str, sample_rate: int = 16000, **options) -> Recognizer:
+    """按名称创建识别后端"""
+    if name not in RECOGNIZER_BACKENDS:
+        raise ValueError(f"未知的识别后端: {name}，可选 {list(RECOGNIZER_BACKENDS)}")
+    return RECOGNIZER_BACKENDS[name](sample_rate, **options)
@@ -0,0 +1,233 @@
+"""
+识别请求容错 - 按音频时长缩放的超时、截止时间内的指数退避重试、
+超过滚动 P95 延迟后的对冲请求，以及熔断器
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+
+ATTEMPT_TIMEOUT = 'attempt timeout'  # 单次请求超时被取消时 CancelledError 携带的消息
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求被直接拒绝"""
+
+
+def is_attempt_timeout(error: BaseException) -> bool:
+    """请求是否因单次超时被 ResilientCaller 取消（对冲落败、调用方取消时为 False）"""
+    return isinstance(error, asyncio.CancelledError) and error.args[:1] == (ATTEMPT_TIMEOUT,)
+
+
+async def wait_attempt(awaitable: Awaitable, timeout: float):
+    """与 asyncio.wait_for 相同，但超时取消时附带 ATTEMPT_TIMEOUT 消息，
+
+    被取消的请求可用 is_attempt_timeout() 区分超时与其他取消。
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        await asyncio.wait({task})  # 与 wait_for 一样等待请求处理完取消
+        raise
+    if not done:
+        task.cancel(ATTEMPT_TIMEOUT)
+        await asyncio.wait({task})
+        if task.cancelled():
+            raise asyncio.TimeoutError()
+    return task.result()
+
+
+class LatencyTracker:
+    """滚动窗口延迟统计（秒）"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        return float(np.percentile(self.samples, p))
+
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒内直接拒绝请求；
+    之后进入半开状态，放行 half_open_max 个探测请求，成功则关闭，失败则重新打开。
+    探测请求没有结果（被取消、不可重试的错误）时调用 abandon() 按失败处理；半开状态超过
+    half_open_timeout 秒仍无结论时重新打开，避免探测名额泄漏后永久拒绝请求。
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0, half_open_max: int = 1,
+                 half_open_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self.half_open_timeout = half_open_timeout
+        self.state = self.CLOSED
+        self.failures = 0      # 连续失败次数
+        self.opened_at = 0.0
+        self.half_opened_at = 0.0
+        self.probes = 0        # 半开状态已放行的探测请求数
+
+    def allow(self) -> bool:
+        """是否放行一个请求"""
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self.half_opened_at = now
+            self.probes = 0
+        if self.state == self.HALF_OPEN:
+            if self.probes >= self.half_open_max:
+                if now - self.half_opened_at >= self.half_open_timeout:
+                    self.state = self.OPEN
+                    self.opened_at = now
+                return False
+            self.probes += 1
+        return True
+
+    def abandon(self):
+        """放行的探测请求没有结果（取消或不可重试的错误），按失败处理以释放探测名额"""
+        if self.state == self.HALF_OPEN:
+            self.record_failure()
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class ResilientCaller:
+    """带重试、对冲与熔断的异步调用
+
+    call(func, duration) 中 func(timeout) 为一次请求的协程工厂，失败时抛出异常。
+    单次请求超时 = base_timeout + timeout_per_second × 音频时长（不超过 max_timeout），
+    整个语音段的截止时间 = 单次超时 × deadline_factor，所有重试都在截止时间内完成。
+    延迟样本足够后，请求超过滚动 P{hedge_percentile} 延迟仍未返回时发出一个对冲请求，
+    取先成功的结果并取消另一个。retryable(exc) 为 False 的错误（如参数错误）不重试、
+    也不计入熔断；但作为半开状态的探测请求时与被取消一样按失败处理。
+    """
+
+    def __init__(self, base_timeout: float = 5.0, timeout_per_second: float = 1.0, max_timeout: float = 30.0,
+                 deadline_factor: float = 2.5, max_attempts: int = 3, backoff_base: float = 0.2,
+                 backoff_max: float = 2.0, hedge: bool = True, hedge_percentile: float = 95.0,
+                 hedge_min_samples: int = 20, breaker: Optional[CircuitBreaker] = None,
+                 latency: Optional[LatencyTracker] = None,
+                 retryable: Callable[[BaseException], bool] = lambda e: True):
+        self.base_timeout = base_timeout
+        self.timeout_per_second = timeout_per_second
+        self.max_timeout = max_timeout
+        self.deadline_factor = deadline_factor
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = latency or LatencyTracker()
+        self.retryable = retryable
+        self.stats = {'calls': 0, 'attempts': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0,
+                      'rejected': 0, 'failures': 0}
+
+    def attempt_timeout(self, duration: float) -> float:
+        """单次请求超时（秒）"""
+        return min(self.max_timeout, self.base_timeout + self.timeout_per_second * duration)
+
+    def hedge_delay(self) -> Optional[float]:
+        """发出对冲请求前等待的时长，样本不足或未启用时返回 None"""
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def call(self, func: Callable[[float], Awaitable], duration: float):
+        self.stats['calls'] += 1
+        if not self.breaker.allow():
+            self.stats['rejected'] += 1
+            raise CircuitOpenError("识别服务熔断中，暂时拒绝请求")
+
+        loop = asyncio.get_running_loop()
+        timeout = self.attempt_timeout(duration)
+        deadline = loop.time() + timeout * self.deadline_factor
+        attempt = 0
+        probing = self.breaker.state == CircuitBreaker.HALF_OPEN  # 本次请求占用了半开状态的探测名额
+        try:
+            while True:
+                attempt += 1
+                self.stats['attempts'] += 1
+                try:
+                    result = await self._hedged(func, min(timeout, deadline - loop.time()))
+                    probing = False
+                    self.breaker.record_success()
+                    return result
+                except Exception as e:
+                    if not self.retryable(e):
+                        raise
+                    probing = False
+                    self.breaker.record_failure()
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                    # 次数用尽、剩余时间不够再试一次、或熔断器已打开时放弃
+                    if (attempt >= self.max_attempts or loop.time() + delay >= deadline
+                            or not self.breaker.allow()):
+                        self.stats['failures'] += 1
+                        raise
+                    probing = self.breaker.state == CircuitBreaker.HALF_OPEN
+                    self.stats['retries'] += 1
+                    await asyncio.sleep(delay)
+        finally:
+            # 探测请求被取消或以不可重试的错误结束时释放探测名额
+            if probing:
+                self.breaker.abandon()
+
+    async def _hedged(self, func: Callable[[float], Awaitable], timeout: float):
+        """发出一次请求，超过对冲延迟仍未返回时再发一个，取先成功者"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        primary = asyncio.ensure_future(wait_attempt(func(timeout), timeout))
+        pending = {primary}
+        backup = None
+        try:
+            hedge_delay = self.hedge_delay()
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    self.stats['hedges'] += 1
+                    remaining = timeout - (loop.time() - start)
+                    backup = asyncio.ensure_future(wait_attempt(func(remaining), remaining))
+                    pending.add(backup)
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.latency.record(loop.time() - start)
+                        if task is backup:
+                            self.stats['hedge_wins'] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
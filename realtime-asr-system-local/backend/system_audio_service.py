@@ -1,18 +1,26 @@
 """
 系统音频捕获服务 - 专用于捕获系统扬声器声音
+
+每个物理设备只运行一条 采集 → 重采样 → VAD → ASR 管线，按订阅者引用计数，
+识别结果广播给所有订阅该设备的 WebSocket 客户端。
 """
 import asyncio
 import json
 import logging
+import threading
 import soundcard as sc
 import numpy as np
-import soxr
-import struct
-import webrtcvad
-from collections import deque
 from datetime import datetime
 from typing import Dict, Optional, List
 from config.config import Config
+from backend.audio_encoder import PCMEncoder
+from backend.resampler import create_resampler
+from backend.vad import VADEngine, create_vad_backend
+from backend.segmenter import Segment, SpeechSegmenter
+from backend.coalescer import SegmentCoalescer
+from backend.recognizer import create_recognizer
+from backend.admission import AdmissionRecognizer
+from backend.wire_protocol import serialize
 
 logger = logging.getLogger(__name__)
 
@@ -20,14 +28,16 @@ class SystemAudioService:
     """系统音频服务"""
     
     def __init__(self):
-        self.active_streams: Dict[str, dict] = {}  # client_id -> stream_info
+        self.device_streams: Dict[str, dict] = {}  # 设备名 -> stream_info（每个设备一条管线）
+        self.active_streams: Dict[str, str] = {}   # client_id -> 订阅的设备名
+        self.draining_streams: List[dict] = []     # 已停止采集、正在识别剩余语音段的设备管线
+        self.next_stream_id = 0  # 设备管线的流编号（写入二进制协议帧头）
         self.sample_rate = Config.SAMPLE_RATE  # 16000Hz
         self.sample_original = Config.SAMPLE_ORIGINAL  # 44100Hz
         self.frame_duration = 0.02 # 每帧 0.02s
         self.frame_size = int(self.frame_duration * self.sample_original)  # 每帧样本数
         
         # VAD 配置
-        self.vad = webrtcvad.Vad(2)  # 中等敏感度 (0-3, 3最严格)
         self.vad_sample_rate = self.sample_rate  # 使用ASR采样率 16000Hz
         self.vad_frame_duration = 0.02  # 20ms帧，VAD要求10, 20 or 30ms
         self.vad_frame_size = int(self.vad_sample_rate * self.vad_frame_duration)  # 320 samples
@@ -36,60 +46,75 @@ class SystemAudioService:
         # self.speech_threshold = 0.6  # 语音检测阈值 语音能量阈值
         self.silence_threshold = 0.5  # 静音检测阈值（秒）
         self.min_speech_duration = 0.01  # 最小语音持续时间（秒）
+        self.vad_pre_roll = Config.VAD_PRE_ROLL  # 语音起点前保留时长（秒）
+        self.vad_hangover = Config.VAD_HANGOVER  # 语音结束后保留时长（秒）
+        self.max_segment_duration = Config.MAX_SEGMENT_DURATION  # 最大语音段时长（秒）
         
-    def encode_wav(self, audio_data: np.ndarray) -> bytes:
-        """生成完整的WAV文件（包含文件头）"""
-        pcm_data = (audio_data * 0x7fff).astype(np.int16)
+        # 识别任务配置：语音段放入有界队列，由每路流的工作协程并发识别
+        self.segment_queue_size = Config.SEGMENT_QUEUE_SIZE
+        self.asr_concurrency = Config.ASR_CONCURRENCY
         
-        # WAV文件头
-        riff_chunk = b'RIFF'
-        file_size = len(pcm_data) * 2 + 36  # 数据大小 + 头部大小
-        wave_format = b'WAVE'
-        fmt_chunk = b'fmt '
-        fmt_size = 16
-        audio_format = 1  # PCM
-        num_channels = 1   # 单声道
-        sample_rate = self.sample_rate
-        byte_rate = sample_rate * num_channels * 2  # 每秒字节数
-        block_align = num_channels * 2
-        bits_per_sample = 16
-        data_chunk = b'data'
-        data_size = len(pcm_data) * 2
+        # WAV编码器（预分配缓冲区，按需扩容）：缓冲区不能共享，每个线程各用一个
+        self.wav_encoders = threading.local()
         
-        # 构建完整的WAV文件
-        wav_header = struct.pack(
-            '<4sI4s4sIHHIIHH4sI',
-            riff_chunk, file_size, wave_format,
-            fmt_chunk, fmt_size, audio_format, num_channels,
-            sample_rate, byte_rate, block_align, bits_per_sample,
-            data_chunk, data_size
-        )
+        # 识别后端：HTTP 接口或本机模型进程池
+        if Config.RECOGNIZER_BACKEND == 'local':
+            recognizer_options = {'model_factory': Config.LOCAL_MODEL_FACTORY,
+                                  'model_options': Config.LOCAL_MODEL_OPTIONS,
+                                  'workers': Config.LOCAL_MODEL_WORKERS,
+                                  'max_restarts': Config.LOCAL_MODEL_MAX_RESTARTS,
+                                  'restart_backoff': Config.LOCAL_MODEL_RESTART_BACKOFF}
+        else:
+            recognizer_options = {'encode': self.encode_wav}
+        self.recognizer = create_recognizer(Config.RECOGNIZER_BACKEND, self.sample_rate, **recognizer_options)
+        # 所有设备共用的准入控制
+        if Config.ADMISSION_REQUESTS_PER_SECOND > 0 or Config.ADMISSION_AUDIO_SECONDS_PER_MINUTE > 0:
+            self.recognizer = AdmissionRecognizer(
+                self.recognizer,
+                requests_per_second=Config.ADMISSION_REQUESTS_PER_SECOND,
+                request_burst=Config.ADMISSION_REQUEST_BURST,
+                audio_seconds_per_minute=Config.ADMISSION_AUDIO_SECONDS_PER_MINUTE,
+                audio_burst=Config.ADMISSION_AUDIO_BURST,
+                policy=Config.ADMISSION_POLICY,
+                max_wait=Config.ADMISSION_MAX_WAIT,
+                max_queue=Config.ADMISSION_MAX_QUEUE
+            )
         
-        return wav_header + pcm_data.tobytes()
+    def encode_wav(self, audio_data: np.ndarray) -> bytes:
+        """生成完整的WAV文件（包含文件头），可在任意线程调用"""
+        encoder = getattr(self.wav_encoders, 'encoder', None)
+        if encoder is None:
+            encoder = self.wav_encoders.encoder = PCMEncoder(
+                self.sample_rate, with_header=True, capacity=int(Config.CHUNK_DURATION * self.sample_rate))
+        # 缓存的WAV头模板 + 向量化PCM转换，返回独立副本供ASR线程使用
+        return encoder.encode_bytes(audio_data)
     
     async def start_streaming(self, websocket, client_id: str):
-        """开始系统音频流"""
+        """开始系统音频流：订阅默认扬声器的采集管线，不存在时创建"""
         if client_id in self.active_streams:
             logger.warning(f"客户端 {client_id} 的系统音频流已在运行中")
             return
             
-        # 创建流信息
-        stream_info = {
-            'websocket': websocket,
-            'client_id': client_id,
-            'is_streaming': True,
-            'audio_queue': deque(),  # 音频数据队列
-            'is_speaking': False,    # 是否在说话状态
-            'speech_start_time': None,  # 语音开始时间
-            'silence_start_time': None, # 静音开始时间
-            'current_audio_chunk': [],  # 当前音频块
-            'vad_buffer': np.array([], dtype=np.float32)  # VAD处理缓冲区
-        }
-        
-        self.active_streams[client_id] = stream_info
-        
         try:
-            logger.info(f"系统音频推流开始 → 客户端 {client_id}")
+            # 获取默认扬声器作为环回设备
+            speaker = sc.default_speaker()
+            device = str(speaker.name)
+            
+            stream_info = self.device_streams.get(device)
+            if stream_info is None:
+                stream_info = self.create_device_stream(device)
+                self.device_streams[device] = stream_info
+                self.recognizer.start()
+                # 启动识别工作协程，再开始音频捕获
+                stream_info['asr_workers'] = [
+                    asyncio.create_task(self.asr_worker(stream_info)) for _ in range(self.asr_concurrency)
+                ]
+                asyncio.create_task(self.capture_audio(stream_info))
+                logger.info(f"设备 {device} 的采集管线已启动")
+            
+            stream_info['subscribers'][client_id] = websocket
+            self.active_streams[client_id] = device
+            logger.info(f"系统音频推流开始 → 客户端 {client_id}（设备 {device}，订阅者 {len(stream_info['subscribers'])}）")
             
             # 发送开始信号
             await websocket.send(json.dumps({
@@ -98,177 +123,270 @@ class SystemAudioService:
                 "timestamp": datetime.now().isoformat()
             }))
             
-            # 开始音频捕获
-            asyncio.create_task(self.capture_audio(client_id))
-            
         except Exception as e:
             logger.error(f"启动系统音频流错误: {e}")
-            if client_id in self.active_streams:
-                del self.active_streams[client_id]
+            await self.stop_streaming(client_id)
     
-    async def stop_streaming(self, client_id: str):
-        """停止系统音频流"""
-        if client_id in self.active_streams:
-            self.active_streams[client_id]['is_streaming'] = False
-            del self.active_streams[client_id]
-            logger.info(f"客户端 {client_id} 的系统音频流已停止")
+    def create_device_stream(self, device: str) -> dict:
+        """为一个物理设备创建管线状态（重采样器、VAD、分段器、识别队列）"""
+        vad_backend = create_vad_backend(Config.VAD_BACKEND, self.vad_sample_rate, **Config.VAD_OPTIONS)
+        
+        stream_id = self.next_stream_id
+        self.next_stream_id = (self.next_stream_id + 1) % 0x10000
+        
+        return {
+            'device': device,
+            'stream_id': stream_id,
+            'subscribers': {},    # client_id -> websocket
+            'is_streaming': True,
+            'segment_queue': asyncio.Queue(maxsize=self.segment_queue_size),  # 待识别语音段 (序号, 语音段)
+            'next_sequence': 0,   # 下一个语音段的序号
+            'next_delivery': 0,   # 下一个应发送结果的序号
+            'results': {},        # 已完成但尚未按序发送的结果，序号 -> 响应（None 表示已丢弃）
+            'send_lock': asyncio.Lock(),
+            'vad': VADEngine(  # 批量VAD（后端由配置选择）
+                vad_backend, self.vad_sample_rate, self.vad_frame_duration
+            ),
+            'segmenter': SpeechSegmenter(  # 语音分段（前导环 + 拖尾）
+                self.vad_sample_rate, self.vad_frame_size, self.silence_threshold,
+                pre_roll=self.vad_pre_roll if self.vad_pre_roll is not None else vad_backend.DEFAULT_PRE_ROLL,
+                hangover=self.vad_hangover if self.vad_hangover is not None else vad_backend.DEFAULT_HANGOVER,
+                max_duration=self.max_segment_duration, cut_window=Config.SEGMENT_CUT_WINDOW,
+                overlap=Config.SEGMENT_OVERLAP
+            ),
+            'coalescer': SegmentCoalescer(  # 短语音段合并
+                self.vad_sample_rate, target_duration=Config.COALESCE_TARGET_DURATION,
+                max_delay=Config.COALESCE_MAX_DELAY, join_silence=Config.COALESCE_JOIN_SILENCE
+            ),
+            'resampler': create_resampler(  # 有状态重采样器 44100Hz → 16000Hz
+                self.sample_original, self.vad_sample_rate, quality=Config.RESAMPLE_QUALITY,
+                backend=Config.RESAMPLER_BACKEND
+            )
+        }
     
-    def prepare_vad_frame(self, audio_data: np.ndarray) -> bytes:
-        """准备VAD帧数据（16kHz, 16bit PCM）"""
-        # 转换为16位PCM
-        pcm_data = (audio_data * 0x7fff).astype(np.int16)
-        return pcm_data.tobytes()
+    async def stop_streaming(self, client_id: str, drain: bool = True):
+        """停止系统音频流：取消订阅，设备的最后一个订阅者离开时停止该设备管线
+
+        drain 为 True（客户端主动停止）时，采集循环送出进行中的语音段，识别完队列中剩余的语音段
+        并把结果发给最后的订阅者后再结束；连接断开（drain 为 False）时直接取消进行中的ASR请求。
+        """
+        device = self.active_streams.pop(client_id, None)
+        if device is None:
+            if not drain:
+                # 连接在剩余语音段识别完成前断开，不再等待
+                for stream_info in self.draining_streams:
+                    if stream_info['subscribers'].pop(client_id, None) is not None:
+                        self.cancel_asr_workers(stream_info)
+            return
+        
+        stream_info = self.device_streams.get(device)
+        if stream_info is not None:
+            websocket = stream_info['subscribers'].pop(client_id, None)
+            if not stream_info['subscribers']:
+                stream_info['is_streaming'] = False
+                del self.device_streams[device]
+                if drain and websocket is not None:
+                    # 保留最后的订阅者接收剩余语音段的结果，由采集循环结束时移除
+                    stream_info['subscribers'][client_id] = websocket
+                else:
+                    # 没有订阅者接收结果，取消进行中的ASR请求
+                    self.cancel_asr_workers(stream_info)
+                logger.info(f"设备 {device} 已无订阅者，采集管线停止")
+        logger.info(f"客户端 {client_id} 的系统音频流已停止")
     
-    def detect_speech_activity(self, stream_info: dict, audio_data: np.ndarray) -> bool:
-        """检测语音活动"""
+    async def broadcast(self, stream_info: dict, message: dict):
+        """将消息发送给设备的所有订阅者（每种子协议只序列化一次，并发发送）"""
+        targets = list(stream_info['subscribers'].items())
+        if not targets:
+            return
+        payloads = {}
+        for _, websocket in targets:
+            subprotocol = getattr(websocket, 'subprotocol', None)
+            if subprotocol not in payloads:
+                payloads[subprotocol] = serialize(message, subprotocol)
+        results = await asyncio.gather(
+            *(websocket.send(payloads[getattr(websocket, 'subprotocol', None)]) for _, websocket in targets),
+            return_exceptions=True
+        )
+        for (client_id, _), result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.error(f"向客户端 {client_id} 发送消息失败: {result}")
+    
+    def detect_speech_activity(self, stream_info: dict, audio_data: np.ndarray):
+        """检测语音活动，返回 (frames, decisions, start_sample)，对所有完整帧逐帧判定"""
         try:
-            # 添加到VAD缓冲区
-            stream_info['vad_buffer'] = np.concatenate([stream_info['vad_buffer'], audio_data])
-            
-            # 如果缓冲区足够处理一帧VAD
-            if len(stream_info['vad_buffer']) >= self.vad_frame_size:
-                # 取一帧数据进行VAD检测
-                frame = stream_info['vad_buffer'][:self.vad_frame_size]
-                stream_info['vad_buffer'] = stream_info['vad_buffer'][self.vad_frame_size:]
-                
-                # 准备VAD帧
-                vad_frame = self.prepare_vad_frame(frame)
-                
-                # 使用VAD检测语音
-                is_speech = self.vad.is_speech(vad_frame, self.vad_sample_rate)
-                return is_speech
-                
+            return stream_info['vad'].process(audio_data)
         except Exception as e:
             logger.error(f"VAD检测错误: {e}")
-            
-        return False
+            empty = np.zeros((0, self.vad_frame_size), dtype=np.float32)
+            return empty, np.zeros(0, dtype=bool), stream_info['vad'].sample_clock
     
-    async def capture_audio(self, client_id: str):
-        """为特定客户端捕获系统音频（带VAD检测）"""
-        if client_id not in self.active_streams:
-            return
-            
-        stream_info = self.active_streams[client_id]
-        websocket = stream_info['websocket']
+    async def capture_audio(self, stream_info: dict):
+        """捕获一个设备的系统音频（带VAD检测），所有订阅者共享"""
+        device = stream_info['device']
         
         try:
-            # 获取默认扬声器作为环回设备
-            speaker = sc.default_speaker()
-            logger.info(f"客户端 {client_id} 使用扬声器: {speaker.name}")
+            logger.info(f"使用扬声器: {device}")
             
             # 创建环回录音器
-            with sc.get_microphone(id=str(speaker.name), include_loopback=True).recorder(
+            with sc.get_microphone(id=device, include_loopback=True).recorder(
                 samplerate=self.sample_original, channels=1
             ) as recorder:
                 
                 chunk_size = self.frame_size  # 20ms at 44100Hz
                 
-                while (client_id in self.active_streams and 
-                       stream_info['is_streaming']):
+                while stream_info['is_streaming']:
                     
                     # 捕获音频数据
                     data = await asyncio.to_thread(recorder.record, chunk_size)
-                    data = data.reshape(-1)
                     
                     # 重采样到16kHz（用于ASR和VAD）
-                    data_resampled = soxr.resample(
-                        data,
-                        self.sample_original,  # 原始采样率 44100Hz
-                        self.vad_sample_rate,  # 目标采样率 16000Hz
-                        quality=soxr.HQ
-                    )
+                    data_resampled = stream_info['resampler'].process(data)
                     
-                    # 检测语音活动
-                    is_speech = self.detect_speech_activity(stream_info, data_resampled)
-                    current_time = datetime.now()
+                    # 检测语音活动（一次判定所有完整帧）
+                    frames, decisions, start_sample = self.detect_speech_activity(stream_info, data_resampled)
                     
-                    if is_speech:
-                        # 检测到语音
-                        if not stream_info['is_speaking']:
-                            # 语音开始
-                            stream_info['is_speaking'] = True
-                            stream_info['speech_start_time'] = current_time
-                            stream_info['silence_start_time'] = None
-                            logger.debug(f"客户端 {client_id} 检测到语音开始")
-                        
-                        # 将音频数据添加到当前块
-                        stream_info['current_audio_chunk'].append(data_resampled)
-                        
-                    else:
-                        # 没有检测到语音
-                        if stream_info['is_speaking']:
-                            # 在说话状态但当前帧没有语音
-                            if stream_info['silence_start_time'] is None:
-                                stream_info['silence_start_time'] = current_time
-                            
-                            # 计算静音持续时间
-                            silence_duration = (current_time - stream_info['silence_start_time']).total_seconds()
-                            
-                            if silence_duration >= self.silence_threshold:
-                                # 静音时间达到阈值，结束当前语音段
-                                await self.finalize_audio_chunk(stream_info)
-                            else:
-                                # 仍在静音检测期内，继续收集音频
-                                stream_info['current_audio_chunk'].append(data_resampled)
-                        else:
-                            # 不在说话状态，忽略静音帧
-                            pass
+                    # 分段（前导环 + 拖尾），短语音段合并后送去识别
+                    now_sample = stream_info['vad'].sample_clock
+                    for segment in stream_info['segmenter'].push(frames, decisions, start_sample):
+                        for batch in stream_info['coalescer'].push(segment, now_sample):
+                            self.finalize_audio_chunk(stream_info, batch)
+                    for batch in stream_info['coalescer'].poll(now_sample):
+                        self.finalize_audio_chunk(stream_info, batch)
+                
+                # 停止时取出重采样器剩余样本，送出进行中与暂存待合并的语音段
+                self.flush_pipeline(stream_info)
+            
+            await self.drain_asr_workers(stream_info)
                             
         except Exception as e:
-            logger.error(f"客户端 {client_id} 音频捕获错误: {e}")
-            if client_id in self.active_streams:
-                stream_info['is_streaming'] = False
-                # 发送错误消息
-                try:
-                    await websocket.send(json.dumps({
-                        "type": "error",
-                        "message": f"音频捕获错误: {str(e)}",
-                        "timestamp": datetime.now().isoformat()
-                    }))
-                except:
-                    pass
+            logger.error(f"设备 {device} 音频捕获错误: {e}")
+            stream_info['is_streaming'] = False
+            # 发送错误消息，并移除该设备的所有订阅者
+            await self.broadcast(stream_info, {
+                "type": "error",
+                "message": f"音频捕获错误: {str(e)}",
+                "timestamp": datetime.now().isoformat()
+            })
+            for client_id in list(stream_info['subscribers']):
+                self.active_streams.pop(client_id, None)
+            if self.device_streams.get(device) is stream_info:
+                del self.device_streams[device]
+            self.cancel_asr_workers(stream_info)
     
-    async def finalize_audio_chunk(self, stream_info: dict):
-        """完成当前音频块的处理"""
-        if not stream_info['current_audio_chunk']:
-            return
-            
-        # 合并所有音频数据
-        combined_audio = np.concatenate(stream_info['current_audio_chunk'])
-        
+    def flush_pipeline(self, stream_info: dict):
+        """采集停止时清空重采样器、VAD、分段器与合并器中的剩余音频，送入识别队列"""
+        frames, decisions, start_sample = self.detect_speech_activity(stream_info, stream_info['resampler'].flush())
+        now_sample = stream_info['vad'].sample_clock
+        segments = []
+        for segment in stream_info['segmenter'].push(frames, decisions, start_sample):
+            segments += stream_info['coalescer'].push(segment, now_sample)
+        tail = stream_info['vad'].accumulator[:stream_info['vad'].pending]  # 不足一帧的剩余样本
+        segment = stream_info['segmenter'].flush(tail)
+        if segment is not None:
+            segments += stream_info['coalescer'].push(segment, now_sample)
+        segments += stream_info['coalescer'].flush()
+        for segment in segments:
+            self.finalize_audio_chunk(stream_info, segment)
+    
+    async def drain_asr_workers(self, stream_info: dict):
+        """等待识别队列中的语音段识别完成并发出结果，再结束识别工作协程
+
+        订阅者在等待期间断开时（stop_streaming 取消工作协程）立即结束。
+        """
+        workers = stream_info.get('asr_workers', [])
+        self.draining_streams.append(stream_info)
+        try:
+            if stream_info['subscribers'] and workers:
+                drained = asyncio.create_task(stream_info['segment_queue'].join())
+                await asyncio.wait([drained, *workers], return_when=asyncio.FIRST_COMPLETED)
+                drained.cancel()
+        finally:
+            self.draining_streams.remove(stream_info)
+            self.cancel_asr_workers(stream_info)
+            stream_info['subscribers'].clear()
+        logger.info(f"设备 {stream_info['device']} 的识别工作协程已结束")
+    
+    def finalize_audio_chunk(self, stream_info: dict, segment: Segment):
+        """完成一个语音段：分配序号并放入识别队列，不等待识别结果"""
         # 检查音频持续时间是否满足最小要求
-        audio_duration = len(combined_audio) / self.vad_sample_rate
-        if audio_duration >= self.min_speech_duration:
-            # 发送音频数据进行ASR处理
-            await self.process_audio_with_asr(stream_info, combined_audio)
-        else:
+        audio_duration = len(segment.audio) / self.vad_sample_rate
+        if audio_duration < self.min_speech_duration:
             logger.debug(f"音频段过短 ({audio_duration:.2f}s)，跳过ASR处理")
+            return
         
-        # 重置状态
-        stream_info['is_speaking'] = False
-        stream_info['speech_start_time'] = None
-        stream_info['silence_start_time'] = None
-        stream_info['current_audio_chunk'] = []
-        stream_info['vad_buffer'] = np.array([], dtype=np.float32)
+        queue = stream_info['segment_queue']
+        if queue.full():
+            # 识别跟不上采集时丢弃最旧的语音段，采集循环永不阻塞
+            dropped_sequence, _ = queue.get_nowait()
+            queue.task_done()
+            stream_info['results'][dropped_sequence] = None
+            logger.warning(f"设备 {stream_info['device']} 识别队列已满，丢弃语音段 #{dropped_sequence}")
+        
+        sequence = stream_info['next_sequence']
+        stream_info['next_sequence'] += 1
+        queue.put_nowait((sequence, segment))
+    
+    def cancel_asr_workers(self, stream_info: dict):
+        """取消识别工作协程，进行中的HTTP请求随之中止"""
+        for worker in stream_info.get('asr_workers', []):
+            worker.cancel()
     
-    async def process_audio_with_asr(self, stream_info: dict, audio_data: np.ndarray):
-        """使用ASR服务处理音频数据"""
+    async def asr_worker(self, stream_info: dict):
+        """识别工作协程：从队列取出语音段识别，按序号发送结果，直到被取消"""
+        queue = stream_info['segment_queue']
+        while True:
+            sequence, segment = await queue.get()
+            try:
+                response = await self.process_audio_with_asr(stream_info, segment, sequence)
+                await self.deliver_result(stream_info, sequence, response)
+            finally:
+                queue.task_done()
+    
+    async def deliver_result(self, stream_info: dict, sequence: int, response: Optional[dict]):
+        """按语音段序号顺序向所有订阅者广播识别结果，先完成的结果等待前面的序号"""
+        results = stream_info['results']
+        results[sequence] = response
+        async with stream_info['send_lock']:
+            while stream_info['next_delivery'] in results:
+                response = results.pop(stream_info['next_delivery'])
+                stream_info['next_delivery'] += 1
+                if response is None:
+                    continue
+                response['sequence'] = stream_info['next_delivery'] - 1
+                await self.broadcast(stream_info, response)
+    
+    async def process_audio_with_asr(self, stream_info: dict, segment: Segment,
+                                     sequence: int) -> Optional[dict]:
+        """使用识别后端处理语音段，返回发送给前端的响应（语音段被合并时返回 None）
+
+        识别过程中的部分结果（partial_transcript）立即广播，不经过按序发送的结果缓冲区；
+        前端按 sequence 将其与最终结果对应。响应带有流编号与语音段的样本区间。
+        """
+        audio_data = segment.audio
+        position = {
+            "stream_id": stream_info['stream_id'],
+            "start_sample": segment.start_sample,
+            "end_sample": segment.end_sample
+        }
         try:
             logger.debug(f"调用ASR服务处理音频，数据长度: {len(audio_data)} 样本，持续时间: {len(audio_data)/self.sample_rate:.2f}s")
             
-            # 编码音频数据
-            wav_data = self.encode_wav(audio_data)
-            
-            # 导入ASR服务
-            from backend.asr_service import qwen_asr_service
-            
-            # 在线程池中调用ASR服务（避免阻塞事件循环）
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,  # 使用默认线程池
-                qwen_asr_service.recognize_speech,
-                wav_data
-            )
+            async def send_partial(text: str):
+                await self.broadcast(stream_info, {
+                    "type": "partial_transcript",
+                    "text": text,
+                    "sequence": sequence,
+                    **position,
+                    "timestamp": datetime.now().isoformat()
+                })
+
+            # 异步调用识别后端（HTTP 后端在内部编码为WAV，任务取消时请求随之中止）
+            result = await self.recognizer.recognize(audio_data, on_partial=send_partial,
+                                                     stream=stream_info['device'])
+            if result.get("merged"):
+                # 已合并到更早的语音段一起识别，不单独发送结果
+                return None
             
             logger.debug(f"ASR服务返回结果: {result}")
             
@@ -278,27 +396,30 @@ class SystemAudioService:
                     "type": "transcript",
                     "text": result["text"],
                     "timestamp": datetime.now().isoformat(),
-                    "processing_time": result.get("processing_time", 0)
+                    "processing_time": result.get("processing_time", 0),
+                    "first_token_time": result.get("first_token_time"),
+                    **position
                 }
                 logger.info(f"ASR识别成功: 「{result['text']}」, 耗时: {result.get('processing_time', 0):.2f}s")
             else:
                 response = {
                     "type": "error",
                     "message": result.get("error", "识别失败"),
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": datetime.now().isoformat(),
+                    **position
                 }
                 logger.warning(f"ASR识别失败: {result.get('error')}")
             
-            await stream_info['websocket'].send(json.dumps(response))
+            return response
             
         except Exception as e:
             logger.error(f"调用ASR服务失败: {e}")
-            error_response = {
+            return {
                 "type": "error",
                 "message": f"ASR服务调用失败: {str(e)}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now().isoformat(),
+                **position
             }
-            await stream_info['websocket'].send(json.dumps(error_response))
 
 # 全局系统音频服务实例
 system_audio_service = SystemAudioService()
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+识别结果缓存 - 以归一化 16kHz PCM 的哈希为键，内存 LRU（TTL + 容量上限）
+加可选的 SQLite 磁盘层（重启后仍有效）
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+
+
+def audio_fingerprint(audio_data: bytes, silence: int = 64) -> Optional[str]:
+    """计算音频内容键
+
+    统一为不带文件头的16位单声道PCM并去掉首尾静音后哈希，
+    同一段声音前后静音长度不同（VAD切分位置不同）时得到相同的键。
+    全部为静音时返回 None（不缓存：识别接口对静音可能返回任意文本，不应被所有静音段共用）。
+    """
+    if audio_data[:4] == b'RIFF':
+        audio_data = audio_data[WAV_HEADER_SIZE:]
+    pcm = np.frombuffer(audio_data[:len(audio_data) // 2 * 2], dtype='<i2')
+    loud = (pcm > silence) | (pcm < -silence)
+    if not loud.any():
+        return None
+    start = int(loud.argmax())
+    end = len(pcm) - int(loud[::-1].argmax())
+    return hashlib.blake2b(pcm[start:end].tobytes(), digest_size=16).hexdigest()
+
+
+class TranscriptCache:
+    """两级识别结果缓存
+
+    内存层为 OrderedDict 实现的 LRU，按条目数与文本总字符数限制容量；
+    设置 db_path 时启用 SQLite 磁盘层，内存未命中时查询磁盘并回填内存。
+    磁盘层的连接只在一个专用线程中使用，查询与写入都不阻塞事件循环（写入不等待完成）。
+    两层都按 ttl 秒过期。
+    """
+
+    def __init__(self, max_entries: int = 1024, max_chars: int = 1_000_000, ttl: float = 86400.0,
+                 db_path: Optional[str] = None, max_disk_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()  # 键 -> (文本, 过期时间)
+        self.chars = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.puts = 0  # 磁盘写入次数（只在磁盘线程中修改）
+        self.lock = threading.Lock()  # 统计接口可能在其他线程读取
+        self.db = None
+        self.db_executor = None
+        if db_path:
+            self.db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='transcript-cache')
+            self.db_executor.submit(self._open_db, db_path)
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._remove(key)
+            if self.db_executor is None:
+                self.misses += 1
+                return None
+
+        loop = asyncio.get_running_loop()
+        row = await loop.run_in_executor(self.db_executor, self._disk_get, key)
+        with self.lock:
+            if row is not None and row[1] > now:
+                self._insert(key, row[0], row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str):
+        expires = time.time() + self.ttl
+        with self.lock:
+            self._insert(key, text, expires)
+        if self.db_executor is not None:
+            self.db_executor.submit(self._disk_put, key, text, expires)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'chars': self.chars,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        """等待排队的磁盘写入完成后关闭数据库"""
+        if self.db_executor is not None:
+            self.db_executor.submit(self._close_db)
+            self.db_executor.shutdown(wait=True)
+            self.db_executor = None
+
+    def _insert(self, key: str, text: str, expires: float):
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (text, expires)
+        self.chars += len(text)
+        while self.entries and (len(self.entries) > self.max_entries or self.chars > self.max_chars):
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key: str):
+        text, _ = self.entries.pop(key)
+        self.chars -= len(text)
+
+    # 以下方法只在磁盘线程中执行
+
+    def _open_db(self, db_path: str):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS transcripts "
+                        "(key TEXT PRIMARY KEY, text TEXT NOT NULL, expires REAL NOT NULL)")
+        self.db.execute("DELETE FROM transcripts WHERE expires < ?", (time.time(),))
+        self.db.commit()
+
+    def _close_db(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _disk_get(self, key: str):
+        if self.db is None:
+            return None
+        return self.db.execute("SELECT text, expires FROM transcripts WHERE key = ?", (key,)).fetchone()
+
+    def _disk_put(self, key: str, text: str, expires: float):
+        if self.db is None:
+            return
+        self.db.execute("INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?)", (key, text, expires))
+        self.puts += 1
+        if self.puts % 256 == 0:
+            self._prune_disk()
+        self.db.commit()
+
+    def _prune_disk(self):
+        """删除过期条目，超出上限时删除最早过期的条目"""
+        self.db.execute("DELETE FROM transcripts WHERE expires < ?", (time.time(),))
+        self.db.execute("DELETE FROM transcripts WHERE key IN (SELECT key FROM transcripts "
+                        "ORDER BY expires DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,))
@@ -0,0 +1,185 @@
+"""
+语音活动检测 - 预分配累加缓冲区，一次判定所有完整帧
+
+可选后端:
+    webrtc    webrtcvad（需要安装 webrtcvad）
+    energy    NumPy 向量化短时能量 + 过零率，自适应噪声底
+    spectral  NumPy 向量化频谱平坦度（语音频带内），辅以能量门限
+"""
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:  # 未安装 webrtcvad 时可使用 energy / spectral 后端
+    webrtcvad = None
+
+from backend.audio_encoder import float_to_pcm16
+
+
+class VADBackend:
+    """VAD 判定后端接口
+
+    classify() 接收 (帧数, 帧长) 的 float32 音频，返回逐帧布尔判定。
+    DEFAULT_PRE_ROLL / DEFAULT_HANGOVER 为该后端建议的前导与拖尾保留时长（秒），
+    起音检测越迟钝的后端需要越长的前导。
+    """
+
+    DEFAULT_PRE_ROLL = 0.2
+    DEFAULT_HANGOVER = 0.2
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class WebRTCVADBackend(VADBackend):
+    """webrtcvad 判定后端（帧长须为 10/20/30ms）"""
+
+    def __init__(self, sample_rate: int, aggressiveness: int = 2):
+        if webrtcvad is None:
+            raise ImportError("webrtcvad 未安装，请使用 energy 或 spectral VAD 后端")
+        super().__init__(sample_rate)
+        self.vad = webrtcvad.Vad(aggressiveness)  # 0-3, 3最严格
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        n_frames, frame_size = frames.shape
+        # 一次性转换为16位PCM，再按帧切片（memoryview 切片不复制）
+        pcm = memoryview(float_to_pcm16(frames.reshape(-1)).tobytes())
+        step = frame_size * 2
+        return np.fromiter(
+            (self.vad.is_speech(pcm[i * step:(i + 1) * step], self.sample_rate) for i in range(n_frames)),
+            dtype=bool, count=n_frames
+        )
+
+
+class EnergyVADBackend(VADBackend):
+    """短时能量 + 过零率判定后端
+
+    能量门限取固定下限与自适应噪声底倍数中的较大者；过零率过高的帧
+    （白噪声、嘶声）即使能量足够也判为非语音。
+    """
+
+    DEFAULT_PRE_ROLL = 0.3
+    DEFAULT_HANGOVER = 0.3
+
+    def __init__(self, sample_rate: int, energy_threshold: float = 0.03,
+                 noise_ratio: float = 3.0, zcr_threshold: float = 0.35, noise_adapt: float = 0.05):
+        super().__init__(sample_rate)
+        self.energy_threshold = energy_threshold  # 0.03 ≈ int16 RMS 1000
+        self.noise_ratio = noise_ratio
+        self.zcr_threshold = zcr_threshold
+        self.noise_adapt = noise_adapt
+        self.noise_floor = energy_threshold / noise_ratio
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+
+        threshold = max(self.energy_threshold, self.noise_floor * self.noise_ratio)
+        decisions = (rms > threshold) & (zcr < self.zcr_threshold)
+
+        # 用本批非语音帧更新噪声底
+        quiet = rms[~decisions]
+        if len(quiet):
+            self.noise_floor += self.noise_adapt * (float(np.median(quiet)) - self.noise_floor)
+        return decisions
+
+
+class SpectralFlatnessVADBackend(VADBackend):
+    """频谱平坦度判定后端
+
+    在语音频带内计算功率谱几何均值与算术均值之比：语音有共振峰与谐波，
+    平坦度低；噪声频谱平坦，平坦度接近 1。
+    """
+
+    DEFAULT_PRE_ROLL = 0.3
+    DEFAULT_HANGOVER = 0.25
+
+    def __init__(self, sample_rate: int, flatness_threshold: float = 0.3,
+                 energy_threshold: float = 0.005, band=(300.0, 4000.0)):
+        super().__init__(sample_rate)
+        self.flatness_threshold = flatness_threshold
+        self.energy_threshold = energy_threshold
+        self.band = band
+        self.window = None
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        frame_size = frames.shape[1]
+        if self.window is None or len(self.window) != frame_size:
+            self.window = np.hanning(frame_size).astype(np.float32)
+            freqs = np.fft.rfftfreq(frame_size, 1 / self.sample_rate)
+            self.bins = (freqs >= self.band[0]) & (freqs <= self.band[1])
+
+        power = np.abs(np.fft.rfft(frames * self.window, axis=1)[:, self.bins]) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        return (flatness < self.flatness_threshold) & (rms > self.energy_threshold)
+
+
+VAD_BACKENDS = {
+    'webrtc': WebRTCVADBackend,
+    'energy': EnergyVADBackend,
+    'spectral': SpectralFlatnessVADBackend,
+}
+
+
+def create_vad_backend(name: str, sample_rate: int, **options) -> VADBackend:
+    """按名称创建VAD后端，options 透传给后端构造函数"""
+    if name not in VAD_BACKENDS:
+        raise ValueError(f"未知的VAD后端: {name}，可选 {list(VAD_BACKENDS)}")
+    return VAD_BACKENDS[name](sample_rate, **options)
+
+
+class VADEngine:
+    """批量 VAD
+
+    输入任意长度的音频块，与上次剩余的不足一帧的样本拼接到预分配的
+    累加缓冲区中，一次判定全部完整帧；时间以样本计数表示，不依赖系统时钟。
+    """
+
+    def __init__(self, backend: VADBackend, sample_rate: int = 16000, frame_duration: float = 0.02,
+                 max_chunk_duration: float = 1.0):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_duration)
+        self.capacity = self.frame_size + int(sample_rate * max_chunk_duration)
+        self.accumulator = np.zeros(self.capacity, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """清空剩余样本并将样本时钟归零"""
+        self.pending = 0         # 累加缓冲区中尚未成帧的样本数
+        self.sample_clock = 0    # 已成帧判定的样本总数
+
+    def process(self, audio_data: np.ndarray):
+        """返回 (frames, decisions, start_sample)
+
+        frames 为 (帧数, 帧长) 的音频副本，decisions 为逐帧判定结果，
+        start_sample 为第一帧在整条流中的起始样本序号。
+        """
+        n = len(audio_data)
+        if self.pending + n > self.capacity:
+            # 输入块超过预期大小时扩容（保留剩余样本）
+            self.capacity = self.pending + n
+            grown = np.zeros(self.capacity, dtype=np.float32)
+            grown[:self.pending] = self.accumulator[:self.pending]
+            self.accumulator = grown
+
+        total = self.pending + n
+        self.accumulator[self.pending:total] = audio_data
+        n_frames = total // self.frame_size
+        used = n_frames * self.frame_size
+
+        frames = self.accumulator[:used].reshape(n_frames, self.frame_size).copy()
+        decisions = self.backend.classify(frames) if n_frames else np.zeros(0, dtype=bool)
+
+        # 不足一帧的尾部移到缓冲区开头
+        self.pending = total - used
+        self.accumulator[:self.pending] = self.accumulator[used:total]
+
+        start_sample = self.sample_clock
+        self.sample_clock += used
+        return frames, decisions, start_sample
@@ -8,8 +8,8 @@ from typing import Dict, Set
 from concurrent.futures import ThreadPoolExecutor
 
 from config.config import Config
-from backend.asr_service import qwen_asr_service
 from backend.system_audio_service import system_audio_service
+from backend.wire_protocol import SUBPROTOCOLS, select_subprotocol
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +29,8 @@ class WebSocketASRServer:
         client_id = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
         self.connected_clients[client_id] = websocket
         
-        logger.info(f"客户端连接: {client_id}, 当前连接数: {len(self.connected_clients)}")
+        logger.info(f"客户端连接: {client_id}（协议: {websocket.subprotocol or 'legacy'}）, "
+                    f"当前连接数: {len(self.connected_clients)}")
         
         try:
             # 发送连接成功消息
@@ -53,6 +54,9 @@ class WebSocketASRServer:
                 del self.connected_clients[client_id]
             if client_id in self.system_audio_clients:
                 self.system_audio_clients.remove(client_id)
+            # 取消订阅，最后一个订阅者断开时设备采集管线随之停止（不再识别剩余语音段，
+            # 包括主动停止后仍在识别的剩余语音段）
+            await system_audio_service.stop_streaming(client_id, drain=False)
             logger.info(f"客户端清理完成: {client_id}, 剩余连接数: {len(self.connected_clients)}")
     
     async def handle_message(self, websocket, client_id: str, message):
@@ -177,7 +181,10 @@ class WebSocketASRServer:
             self.port,
             ping_interval=20,
             ping_timeout=10,
-            max_size=Config.MAX_AUDIO_SIZE
+            max_size=Config.MAX_AUDIO_SIZE,
+            # 协商二进制 / JSON 子协议，未提供子协议的旧客户端按 JSON 处理
+            subprotocols=SUBPROTOCOLS,
+            select_subprotocol=select_subprotocol
         ):
             logger.info("WebSocket ASR 服务器已启动，等待连接...")
             await asyncio.Future()  # 永久运行
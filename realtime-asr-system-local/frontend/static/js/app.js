@@ -1,3 +1,8 @@
+// 传输子协议：优先二进制帧，服务器不支持时按 JSON 文本处理
+const WS_SUBPROTOCOLS = ['asr.binary.v1', 'asr.json.v1'];
+const FRAME_HEADER_SIZE = 24;
+const FRAME_TYPES = {2: 'transcript', 3: 'partial_transcript', 4: 'error', 5: 'status'};
+
 class SystemAudioASR {
     constructor() {
         this.websocket = null;
@@ -6,6 +11,7 @@ class SystemAudioASR {
         this.recordingTime = 0;
         this.timerInterval = null;
         this.resultCount = 0;
+        this.partialResults = new Map(); // 语音段序号 -> 识别中的结果元素
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
         this.wasRecordingBeforeUnload = false; // 新增：记录页面卸载前的录制状态
@@ -90,10 +96,11 @@ class SystemAudioASR {
         this.updateStatus('connecting', '连接中...');
         
         try {
-            this.websocket = new WebSocket(wsUrl);
+            this.websocket = new WebSocket(wsUrl, WS_SUBPROTOCOLS);
+            this.websocket.binaryType = 'arraybuffer';
             
             this.websocket.onopen = () => {
-                console.log('WebSocket 连接已建立');
+                console.log('WebSocket 连接已建立，协议:', this.websocket.protocol || 'legacy');
                 this.isConnected = true;
                 this.reconnectAttempts = 0;
                 this.updateStatus('connected', '已连接');
@@ -225,22 +232,24 @@ class SystemAudioASR {
         try {
             console.log('收到服务器消息，数据类型:', typeof message);
             
-            // 处理二进制消息（音频数据）- 现在由后端直接处理，前端忽略
-            if (message instanceof ArrayBuffer || message instanceof Blob) {
-                console.log('收到二进制音频数据，前端忽略处理，由后端ASR服务处理');
-                return;
+            // 处理二进制帧（asr.binary.v1 子协议下的识别结果）
+            if (message instanceof ArrayBuffer) {
+                message = this.decodeFrame(message);
+                if (!message) {
+                    return;
+                }
             }
             
             // 处理文本消息
-            if (typeof message === 'string') {
+            if (typeof message === 'string' || typeof message === 'object') {
                 // 检查消息是否为空
-                if (!message || message.trim() === '') {
+                if (!message || (typeof message === 'string' && message.trim() === '')) {
                     console.error('收到空消息');
                     this.addSystemMessage('收到空消息，连接可能有问题', '系统错误');
                     return;
                 }
                 
-                const data = JSON.parse(message);
+                const data = typeof message === 'string' ? JSON.parse(message) : message;
                 const timestamp = new Date().toLocaleTimeString();
                 
                 console.log('解析后的数据:', data);
@@ -250,6 +259,10 @@ class SystemAudioASR {
                         this.handleStatusMessage(data, timestamp);
                         break;
                         
+                    case 'partial_transcript':
+                        this.handlePartialTranscript(data, timestamp);
+                        break;
+                        
                     case 'transcript':
                         this.handleTranscriptResult(data, timestamp);
                         break;
@@ -288,6 +301,38 @@ class SystemAudioASR {
         }
     }
     
+    decodeFrame(buffer) {
+        // 24 字节小端帧头: version u8, type u8, stream u16, sequence u32, start u64, end u64
+        if (buffer.byteLength < FRAME_HEADER_SIZE) {
+            console.error('二进制帧长度不足:', buffer.byteLength);
+            return null;
+        }
+        const view = new DataView(buffer);
+        const version = view.getUint8(0);
+        const type = FRAME_TYPES[view.getUint8(1)];
+        if (version !== 1 || !type) {
+            console.log('忽略不支持的二进制帧，版本:', version, '类型:', view.getUint8(1));
+            return null;
+        }
+        const data = {
+            type: type,
+            stream_id: view.getUint16(2, true),
+            sequence: view.getUint32(4, true),
+            start_sample: Number(view.getBigUint64(8, true)),
+            end_sample: Number(view.getBigUint64(16, true))
+        };
+        let offset = FRAME_HEADER_SIZE;
+        if (type === 'transcript') {
+            data.processing_time = view.getFloat32(offset, true);
+            const firstTokenTime = view.getFloat32(offset + 4, true);
+            data.first_token_time = Number.isNaN(firstTokenTime) ? null : firstTokenTime;
+            offset += 8;
+        }
+        const text = new TextDecoder('utf-8').decode(new Uint8Array(buffer, offset));
+        data[type === 'transcript' || type === 'partial_transcript' ? 'text' : 'message'] = text;
+        return data;
+    }
+    
     handleStatusMessage(data, timestamp) {
         this.connectionStatus.textContent = data.message;
         
@@ -327,8 +372,37 @@ class SystemAudioASR {
         }
     }
     
+    handlePartialTranscript(data, timestamp) {
+        // 同一语音段的部分结果更新同一个元素，最终结果到达时替换
+        let resultElement = this.partialResults.get(data.sequence);
+        if (!resultElement) {
+            resultElement = document.createElement('div');
+            resultElement.className = 'transcript-item partial';
+            resultElement.innerHTML = `
+                <div class="transcript-header">
+                    <span class="timestamp">${timestamp}</span>
+                    <div>
+                        <span class="system-audio-indicator">系统音频</span>
+                        <span class="processing-time">识别中...</span>
+                    </div>
+                </div>
+                <div class="transcript-text"></div>
+            `;
+            this.partialResults.set(data.sequence, resultElement);
+            this.appendResult(resultElement);
+        }
+        resultElement.querySelector('.transcript-text').textContent = data.text;
+        this.scrollToLatest();
+    }
+    
+    takePartialResult(sequence) {
+        const resultElement = this.partialResults.get(sequence);
+        this.partialResults.delete(sequence);
+        return resultElement;
+    }
+    
     handleTranscriptResult(data, timestamp) {
-        this.addTranscriptResult(data.text, timestamp, data.processing_time);
+        this.addTranscriptResult(data.text, timestamp, data.processing_time, data.sequence);
         this.updateProcessingDelay(data.processing_time);
         
         // 自动滚动到最新结果
@@ -336,6 +410,11 @@ class SystemAudioASR {
     }
     
     handleErrorMessage(data, timestamp) {
+        // 识别失败时移除对应的部分结果
+        const partial = this.takePartialResult(data.sequence);
+        if (partial) {
+            partial.remove();
+        }
         this.addErrorMessage(data.message, timestamp);
         
         // 如果是严重错误，停止录制
@@ -348,7 +427,7 @@ class SystemAudioASR {
         }
     }
     
-    addTranscriptResult(text, timestamp, processingTime) {
+    addTranscriptResult(text, timestamp, processingTime, sequence) {
         this.resultCount++;
         
         const resultElement = document.createElement('div');
@@ -365,7 +444,14 @@ class SystemAudioASR {
             <div class="transcript-text">${this.escapeHtml(text)}</div>
         `;
         
-        this.appendResult(resultElement);
+        // 已显示部分结果时原位替换，保持结果顺序
+        const partial = this.takePartialResult(sequence);
+        if (partial) {
+            partial.replaceWith(resultElement);
+            this.updateResultStats();
+        } else {
+            this.appendResult(resultElement);
+        }
     }
     
     addSystemMessage(message, type = '系统消息') {
@@ -438,6 +524,7 @@ class SystemAudioASR {
             </div>
         `;
         this.resultCount = 0;
+        this.partialResults.clear();
         this.updateResultStats();
         this.processingDelay.textContent = '-';
         this.processingDelay.style.color = 'inherit';
@@ -0,0 +1,33 @@
+"""
+假识别模型 - 供 ProcessPoolRecognizer 测试在工作进程中加载
+
+识别结果包含音频时长、RMS、所在进程号与该进程加载模型的次数；
+特定时长的音频用于模拟模型异常（0.25 秒）与工作进程崩溃（0.5 秒），fail_load 模拟模型加载失败。
+"""
+import os
+import time
+
+import numpy as np
+
+
+class DummyModel:
+    loads = 0
+
+    def __init__(self, load_time: float = 0.0, delay_per_second: float = 0.0, fail_load: bool = False):
+        time.sleep(load_time)  # 模拟加载权重
+        if fail_load:
+            raise RuntimeError("模拟模型加载失败")
+        DummyModel.loads += 1
+        self.delay_per_second = delay_per_second
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int) -> str:
+        if audio.dtype != np.float32 or audio.ndim != 1:
+            raise TypeError(f"需要一维 float32 音频，收到 {audio.dtype} / {audio.ndim} 维")
+        duration = len(audio) / sample_rate
+        if duration == 0.25:
+            raise RuntimeError("模拟模型异常")
+        if duration == 0.5:
+            os._exit(1)  # 模拟工作进程崩溃
+        time.sleep(self.delay_per_second * duration)
+        rms = float(np.sqrt(np.mean(audio ** 2))) if len(audio) else 0.0
+        return f"{duration:.2f}s rms={rms:.3f} pid={os.getpid()} loads={DummyModel.loads}"
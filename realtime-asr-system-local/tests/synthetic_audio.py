@@ -0,0 +1,16 @@
+"""
+合成测试音频 - 200Hz 正弦“语音”与全零静音（16kHz float32）
+"""
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME = 320  # 20ms
+
+
+def tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(round(seconds * SAMPLE_RATE))) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(round(seconds * SAMPLE_RATE)), dtype=np.float32)
@@ -0,0 +1,22 @@
+"""
+PCMEncoder 测试 - 短帧直接转换与预分配缓冲区两条路径结果一致
+"""
+import numpy as np
+import pytest
+
+from backend.audio_encoder import DIRECT_ENCODE_SAMPLES, PCMEncoder, encode_pcm, encode_wav
+
+
+@pytest.mark.parametrize('n', [0, 1, 640, DIRECT_ENCODE_SAMPLES - 1, DIRECT_ENCODE_SAMPLES, 32000, 40000])
+def test_encode_bytes_matches_direct_conversion(n):
+    audio = np.random.default_rng(n).uniform(-1.5, 1.5, n).astype(np.float32)  # 含超出 [-1, 1] 的样本
+    assert PCMEncoder(16000, with_header=True, capacity=32000).encode_bytes(audio) == encode_wav(audio, 16000)
+    assert PCMEncoder(16000, capacity=32000).encode_bytes(audio) == encode_pcm(audio)
+
+
+def test_encode_bytes_result_is_independent_of_later_calls():
+    encoder = PCMEncoder(16000, capacity=4096)
+    first_audio = np.full(4096, 0.5, dtype=np.float32)
+    first = encoder.encode_bytes(first_audio)
+    encoder.encode_bytes(np.full(4096, -0.5, dtype=np.float32))
+    assert first == encode_pcm(first_audio)
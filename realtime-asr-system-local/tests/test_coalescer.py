@@ -0,0 +1,64 @@
+"""
+SegmentCoalescer 测试 - 短语音段合并、按延迟预算输出与长段直通
+"""
+import numpy as np
+
+from backend.coalescer import SegmentCoalescer
+from backend.segmenter import Segment
+from synthetic_audio import SAMPLE_RATE, tone
+
+
+def short_segment(start: float, seconds: float, forced: bool = False) -> Segment:
+    audio = tone(seconds)
+    start_sample = int(start * SAMPLE_RATE)
+    return Segment(audio, start_sample, start_sample + len(audio), forced)
+
+
+def make_coalescer() -> SegmentCoalescer:
+    return SegmentCoalescer(SAMPLE_RATE, target_duration=1.5, max_delay=0.6, join_silence=0.1)
+
+
+def test_short_segments_merge_until_target_with_join_silence():
+    coalescer = make_coalescer()
+    first, second, third = short_segment(0.0, 0.5), short_segment(0.6, 0.5), short_segment(1.2, 0.5)
+    now = first.end_sample
+    assert coalescer.push(first, now) == []
+    assert coalescer.push(second, now + int(0.3 * SAMPLE_RATE)) == []  # 仍在延迟预算内
+    merged, = coalescer.push(third, now + int(0.5 * SAMPLE_RATE))       # 累计 1.5 秒
+    gap = np.zeros(int(0.1 * SAMPLE_RATE), dtype=np.float32)
+    np.testing.assert_array_equal(merged.audio,
+                                  np.concatenate([first.audio, gap, second.audio, gap, third.audio]))
+    assert (merged.start_sample, merged.end_sample) == (first.start_sample, third.end_sample)
+    assert coalescer.pending == []
+
+
+def test_pending_segments_flush_when_delay_budget_is_spent():
+    coalescer = make_coalescer()
+    first = short_segment(0.0, 0.3)
+    now = first.end_sample
+    assert coalescer.push(first, now) == []
+    assert coalescer.poll(now + int(0.59 * SAMPLE_RATE)) == []
+    second = short_segment(0.6, 0.3)
+    # 第二段入队不重新计时：延迟从最早暂存的语音段算起
+    merged, = coalescer.push(second, now + int(0.6 * SAMPLE_RATE))
+    assert (merged.start_sample, merged.end_sample) == (first.start_sample, second.end_sample)
+    assert coalescer.poll(now + 10 * SAMPLE_RATE) == []
+
+
+def test_long_and_forced_segments_pass_through_with_pending():
+    coalescer = make_coalescer()
+    long = short_segment(0.0, 2.0)
+    assert coalescer.push(long, long.end_sample) == [long]
+
+    pending = short_segment(3.0, 0.3)
+    coalescer.push(pending, pending.end_sample)
+    forced = short_segment(3.5, 0.5, forced=True)
+    merged, = coalescer.push(forced, forced.end_sample)
+    assert merged.forced and merged.start_sample == pending.start_sample
+    assert coalescer.flush() == []
+
+
+def test_zero_target_disables_merging():
+    coalescer = SegmentCoalescer(SAMPLE_RATE, target_duration=0)
+    segment = short_segment(0.0, 0.2)
+    assert coalescer.push(segment, segment.end_sample) == [segment]
@@ -0,0 +1,51 @@
+"""
+EndpointRouter 测试 - 路由打分与尚无延迟样本的接口
+"""
+from collections import Counter
+
+from backend.endpoint_router import Endpoint, EndpointRouter
+
+
+def make_router(*names, policy='ewma'):
+    return EndpointRouter([Endpoint(name, None, 'model') for name in names], policy=policy, health_interval=0)
+
+
+def route(router, count):
+    """连续选择 count 次且不释放，返回各接口承接的请求数"""
+    chosen = Counter()
+    for _ in range(count):
+        endpoint = router.select()
+        router.acquire(endpoint)
+        chosen[endpoint.name] += 1
+    return chosen
+
+
+def test_unsampled_endpoint_does_not_take_every_request():
+    router = make_router('a', 'b', 'new')
+    a, b, new = router.endpoints
+    a.ewma, b.ewma = 0.2, 0.4
+    chosen = route(router, 12)
+    assert chosen['new'] < 12
+    # 新接口按中位数（0.3）计分：与 a、b 按 延迟 ×（进行中 + 1）分担请求
+    assert new.outstanding >= 1 and a.outstanding > b.outstanding
+
+
+def test_without_samples_requests_spread_by_outstanding():
+    router = make_router('a', 'b', 'c')
+    assert route(router, 9) == Counter(a=3, b=3, c=3)
+
+
+def test_lower_latency_endpoint_takes_more_load():
+    router = make_router('fast', 'slow')
+    fast, slow = router.endpoints
+    fast.ewma, slow.ewma = 0.1, 0.3
+    assert route(router, 8) == Counter(fast=6, slow=2)
+
+
+def test_least_outstanding_breaks_ties_on_latency():
+    router = make_router('a', 'b', policy='least_outstanding')
+    a, b = router.endpoints
+    a.ewma, b.ewma = 0.5, 0.2
+    assert router.select() is b
+    router.acquire(b)
+    assert router.select() is a
@@ -0,0 +1,135 @@
+"""
+识别后端测试 - 用假模型驱动 ProcessPoolRecognizer（结果顺序、模型加载、异常与崩溃恢复、加载失败退避、关闭）
+"""
+import asyncio
+import time
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from backend.recognizer import ProcessPoolRecognizer, create_recognizer
+
+SAMPLE_RATE = 16000
+FACTORY = 'dummy_model:DummyModel'
+
+
+def field(result: dict, name: str) -> str:
+    return result['text'].split(f'{name}=')[1].split()[0]
+
+
+def run_with(workers: int, scenario, recognizer_options: Optional[dict] = None, **options):
+    """创建进程池识别后端（options 为假模型参数），运行 scenario(recognizer) 后关闭"""
+    async def main():
+        recognizer = create_recognizer('local', SAMPLE_RATE, model_factory=FACTORY,
+                                       model_options=options, workers=workers, **(recognizer_options or {}))
+        try:
+            return await scenario(recognizer)
+        finally:
+            await recognizer.close()
+
+    return asyncio.run(main())
+
+
+def test_create_recognizer():
+    assert isinstance(create_recognizer('local', model_factory=FACTORY), ProcessPoolRecognizer)
+    with pytest.raises(ValueError):
+        create_recognizer('local')
+    with pytest.raises(ValueError):
+        create_recognizer('missing')
+
+
+def test_results_match_inputs_in_order():
+    durations = [round(3.0 - 0.15 * i, 2) for i in range(12)]
+    amplitudes = np.random.default_rng(0).uniform(0.05, 0.5, len(durations))
+    audios = [np.full(int(d * SAMPLE_RATE), a, np.float32) for d, a in zip(durations, amplitudes)]
+
+    async def scenario(recognizer):
+        # 长的语音段推理更久，后提交的短语音段先完成；gather 的结果仍与输入一一对应
+        return await asyncio.gather(*(recognizer.recognize(audio) for audio in audios))
+
+    results = run_with(2, scenario, delay_per_second=0.05)
+    for result, duration, amplitude in zip(results, durations, amplitudes):
+        assert result['success'], result
+        assert result['text'].startswith(f"{duration:.2f}s")
+        assert abs(float(field(result, 'rms')) - amplitude) < 1e-3
+    # 每个工作进程只加载一次模型，两个进程都参与识别
+    assert {field(result, 'loads') for result in results} == {'1'}
+    assert len({field(result, 'pid') for result in results}) == 2
+
+
+def test_int16_input_is_normalized():
+    async def scenario(recognizer):
+        return await recognizer.recognize(np.full(SAMPLE_RATE, 16384, np.int16))
+
+    result = run_with(1, scenario)
+    assert result['success'] and field(result, 'rms') == '0.500', result
+
+
+def test_model_error_keeps_pool():
+    async def scenario(recognizer):
+        failed = await recognizer.recognize(np.zeros(SAMPLE_RATE // 4, np.float32))
+        pool = recognizer.pool
+        recovered = await recognizer.recognize(np.zeros(SAMPLE_RATE, np.float32))
+        return failed, recovered, pool is recognizer.pool, recognizer.metrics()
+
+    failed, recovered, same_pool, metrics = run_with(1, scenario)
+    assert not failed['success'] and '模拟模型异常' in failed['error']
+    assert recovered['success'] and same_pool
+    assert metrics['failures'] == 1 and metrics['restarts'] == 0
+
+
+def test_worker_crash_rebuilds_pool():
+    async def scenario(recognizer):
+        recognizer.start()
+        pool = recognizer.pool
+        crashed = await recognizer.recognize(np.zeros(SAMPLE_RATE // 2, np.float32))
+        recovered = await recognizer.recognize(np.zeros(SAMPLE_RATE, np.float32))
+        return crashed, recovered, pool is not recognizer.pool, recognizer.metrics()
+
+    crashed, recovered, rebuilt, metrics = run_with(2, scenario)
+    assert not crashed['success'] and '异常退出' in crashed['error']
+    assert recovered['success'] and rebuilt
+    assert metrics['restarts'] == 1 and metrics['failures'] == 1 and metrics['in_flight'] == 0
+
+
+def test_failing_model_load_stops_rebuilding():
+    audio = np.zeros(SAMPLE_RATE, np.float32)
+
+    async def scenario(recognizer):
+        results = [await recognizer.recognize(audio) for _ in range(2)]
+        rejected_at = time.monotonic()
+        rejected = [await recognizer.recognize(audio) for _ in range(20)]
+        rejected_time = time.monotonic() - rejected_at
+        unavailable = recognizer.metrics()
+        await asyncio.sleep(0.6)
+        retried = await recognizer.recognize(audio)  # 退避结束后再尝试一次，仍失败则继续退避
+        return results, rejected, rejected_time, unavailable, retried, recognizer.metrics()
+
+    results, rejected, rejected_time, unavailable, retried, metrics = run_with(
+        1, scenario, {'max_restarts': 2, 'restart_backoff': 0.5}, fail_load=True)
+    assert not any(result['success'] for result in results + rejected + [retried])
+    assert all(result['error'].startswith('识别进程异常退出') for result in results)
+    # 连续 2 次异常退出后不再重建：请求直接返回错误，不再创建进程池
+    assert all(result['error'].startswith('本地识别模型不可用') for result in rejected)
+    assert rejected_time < 0.1 and not unavailable['available']
+    assert unavailable['restarts'] == 1 and metrics['restarts'] == 1
+    assert retried['error'].startswith('识别进程异常退出') and not metrics['available']
+    assert metrics['failures'] == 23 and metrics['in_flight'] == 0
+
+
+def test_close_stops_workers():
+    async def scenario(recognizer):
+        result = await recognizer.recognize(np.zeros(SAMPLE_RATE, np.float32))
+        processes = list(recognizer.pool._processes.values())
+        await recognizer.close()
+        assert recognizer.pool is None
+        for process in processes:
+            process.join(timeout=10)
+        # 关闭后再次识别时重新创建进程池
+        again = await recognizer.recognize(np.zeros(SAMPLE_RATE, np.float32))
+        return result, processes, again
+
+    result, processes, again = run_with(2, scenario)
+    assert result['success'] and again['success']
+    assert processes and not any(process.is_alive() for process in processes)
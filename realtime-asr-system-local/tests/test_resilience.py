@@ -0,0 +1,145 @@
+"""
+容错模块测试 - 熔断器半开状态的探测名额、单次超时与其他取消的区分
+"""
+import asyncio
+import time
+
+import pytest
+
+from backend.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, is_attempt_timeout
+
+
+def open_breaker(breaker: CircuitBreaker):
+    """打开熔断器并让熔断时长过期，下一个请求即为探测请求"""
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+
+
+def make_caller(breaker: CircuitBreaker, **kwargs) -> ResilientCaller:
+    return ResilientCaller(hedge=False, max_attempts=1, breaker=breaker, **kwargs)
+
+
+def test_cancelled_probe_releases_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    caller = make_caller(breaker)
+    open_breaker(breaker)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang(timeout):
+            started.set()
+            await asyncio.sleep(3600)
+
+        probe = asyncio.create_task(caller.call(hang, 1.0))
+        await started.wait()
+        assert breaker.state == CircuitBreaker.HALF_OPEN and breaker.probes == 1
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(scenario())
+    # 取消的探测按失败处理：熔断器重新打开，熔断时长过后再次放行探测请求
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.opened_at -= breaker.reset_timeout
+
+    async def succeed(timeout):
+        return 'ok'
+
+    assert asyncio.run(caller.call(succeed, 1.0)) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_retryable_probe_releases_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    caller = make_caller(breaker, retryable=lambda e: not isinstance(e, ValueError))
+    open_breaker(breaker)
+
+    async def bad_request(timeout):
+        raise ValueError("参数错误")
+
+    with pytest.raises(ValueError):
+        asyncio.run(caller.call(bad_request, 1.0))
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.probes == 1 and not breaker.allow()
+
+
+def test_non_retryable_error_not_counted_when_closed():
+    breaker = CircuitBreaker(failure_threshold=1)
+    caller = make_caller(breaker, retryable=lambda e: not isinstance(e, ValueError))
+
+    async def bad_request(timeout):
+        raise ValueError("参数错误")
+
+    with pytest.raises(ValueError):
+        asyncio.run(caller.call(bad_request, 1.0))
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_half_open_timeout_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0, half_open_timeout=5.0)
+    open_breaker(breaker)
+    assert breaker.allow()          # 占用探测名额后没有任何结果
+    assert not breaker.allow()
+    breaker.half_opened_at -= breaker.half_open_timeout
+    assert not breaker.allow()
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.opened_at -= breaker.reset_timeout
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_rejected_while_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    caller = make_caller(breaker)
+    breaker.record_failure()
+
+    async def succeed(timeout):
+        return 'ok'
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(caller.call(succeed, 1.0))
+    assert caller.stats['rejected'] == 1
+
+
+def test_attempt_timeout_is_distinguished_from_other_cancellation():
+    caller = ResilientCaller(base_timeout=0.05, timeout_per_second=0.0, max_attempts=1, hedge=False)
+    seen = []
+
+    async def hang(timeout):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError as e:
+            seen.append(is_attempt_timeout(e))
+            raise
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await caller.call(hang, 1.0)
+        task = asyncio.create_task(caller.call(hang, 1.0))
+        await asyncio.sleep(0.01)
+        task.cancel()  # 调用方取消（如客户端断开）
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert seen == [True, False]
+
+
+def test_hedge_loser_is_not_reported_as_timeout():
+    caller = ResilientCaller(base_timeout=1.0, timeout_per_second=0.0, hedge_min_samples=1)
+    caller.latency.record(0.01)
+    seen = []
+    calls = []
+
+    async def first_slow(timeout):
+        calls.append(timeout)
+        try:
+            await asyncio.sleep(3600 if len(calls) == 1 else 0.01)
+        except asyncio.CancelledError as e:
+            seen.append(is_attempt_timeout(e))
+            raise
+        return 'ok'
+
+    assert asyncio.run(caller.call(first_slow, 1.0)) == 'ok'
+    assert seen == [False] and caller.stats['hedge_wins'] == 1
@@ -0,0 +1,84 @@
+"""
+RingBuffer 测试 - 回绕读取、溢出覆盖与丢弃计数、跨线程唤醒 wait_available
+（ring_buffer.py 位于仓库根目录，供推流演示脚本使用）
+"""
+import asyncio
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from ring_buffer import RingBuffer  # noqa: E402
+
+
+def test_reads_across_wrap_around_are_contiguous():
+    buffer = RingBuffer(8)
+    buffer.write(np.arange(6, dtype=np.float32))
+    np.testing.assert_array_equal(buffer.read(5), [0, 1, 2, 3, 4])
+    buffer.write(np.arange(6, 12, dtype=np.float32))  # 写指针回绕到存储区开头
+    assert buffer.available == 7
+    view = buffer.peek(7)
+    np.testing.assert_array_equal(view, [5, 6, 7, 8, 9, 10, 11])
+    assert not view.flags.writeable
+    buffer.consume(3)
+    out = np.empty(4, dtype=np.float32)
+    assert buffer.read_into(out)
+    np.testing.assert_array_equal(out, [8, 9, 10, 11])
+    assert buffer.read(1) is None and buffer.dropped == 0
+
+
+def test_overflow_keeps_newest_samples_and_counts_dropped():
+    buffer = RingBuffer(8)
+    buffer.write(np.arange(5, dtype=np.float32))
+    buffer.write(np.arange(5, 11, dtype=np.float32))  # 超出容量 3 个样本
+    assert buffer.available == 8 and buffer.dropped == 3
+    np.testing.assert_array_equal(buffer.peek(8), np.arange(3, 11))
+
+    buffer.write(np.arange(11, 31, dtype=np.float32))  # 单次写入超过容量
+    assert buffer.available == 8 and buffer.dropped == 23
+    np.testing.assert_array_equal(buffer.read(8), np.arange(23, 31))
+    assert buffer.write_count == 31 and buffer.read_count == 31
+
+
+def test_peek_and_read_refuse_more_than_available():
+    buffer = RingBuffer(4)
+    buffer.write(np.ones(3, dtype=np.float32))
+    assert buffer.peek(4) is None
+    assert not buffer.read_into(np.empty(4, dtype=np.float32))
+    assert buffer.available == 3
+
+
+def test_wait_available_is_woken_by_producer_thread():
+    buffer = RingBuffer(1600)
+
+    def produce():
+        for _ in range(4):
+            threading.Event().wait(0.02)
+            buffer.write(np.ones(160, dtype=np.float32))
+
+    async def consume():
+        producer = threading.Thread(target=produce)
+        producer.start()
+        try:
+            ready = await buffer.wait_available(480, timeout=5)
+            return ready, buffer.available
+        finally:
+            await asyncio.to_thread(producer.join)
+
+    ready, available = asyncio.run(consume())
+    assert ready and available >= 480
+    assert buffer.waiter is None
+
+
+def test_wait_available_times_out_and_clears_waiter():
+    buffer = RingBuffer(16)
+    buffer.write(np.ones(4, dtype=np.float32))
+
+    async def consume():
+        return await buffer.wait_available(8, timeout=0.05), await buffer.wait_available(4)
+
+    assert asyncio.run(consume()) == (False, True)
+    assert buffer.waiter is None
@@ -0,0 +1,87 @@
+"""
+SpeechSegmenter 测试 - 语音段边界、前导环与拖尾长度
+"""
+import numpy as np
+
+from backend.segmenter import SpeechSegmenter
+from backend.vad import VADEngine, create_vad_backend
+from synthetic_audio import FRAME, SAMPLE_RATE, silence, tone
+
+
+def segment(audio: np.ndarray, chunk: int = 1600, **options):
+    """按采集块大小经 energy VAD 分段，返回全部语音段（含停止时 flush 的最后一段）"""
+    engine = VADEngine(create_vad_backend('energy', SAMPLE_RATE), SAMPLE_RATE)
+    segmenter = SpeechSegmenter(SAMPLE_RATE, FRAME, **options)
+    segments = []
+    for offset in range(0, len(audio), chunk):
+        segments += segmenter.push(*engine.process(audio[offset:offset + chunk]))
+    tail = segmenter.flush(engine.accumulator[:engine.pending])
+    return segments + ([tail] if tail is not None else [])
+
+
+def test_segment_boundaries_include_pre_roll_and_hangover():
+    audio = np.concatenate([silence(1.0), tone(1.0), silence(1.0)])
+    segments = segment(audio, silence_threshold=0.5, pre_roll=0.2, hangover=0.2)
+    assert len(segments) == 1
+    first = segments[0]
+    assert (first.start_sample, first.end_sample) == (int(0.8 * SAMPLE_RATE), int(2.2 * SAMPLE_RATE))
+    np.testing.assert_array_equal(first.audio, audio[first.start_sample:first.end_sample])
+    assert not first.forced
+
+
+def test_pre_roll_is_capped_and_reuses_trimmed_silence():
+    # 两段语音间隔 0.6 秒：第一段保留 0.1 秒拖尾，之后的静音进入前导环，第二段前导 0.3 秒
+    audio = np.concatenate([silence(0.1), tone(0.5), silence(0.6), tone(0.5), silence(0.8)])
+    segments = segment(audio, silence_threshold=0.4, pre_roll=0.3, hangover=0.1)
+    assert [(s.start_sample, s.end_sample) for s in segments] == [
+        (0, int(0.7 * SAMPLE_RATE)),                               # 前导只有 0.1 秒静音可用
+        (int(0.9 * SAMPLE_RATE), int(1.8 * SAMPLE_RATE)),
+    ]
+    for s in segments:
+        np.testing.assert_array_equal(s.audio, audio[s.start_sample:s.end_sample])
+
+
+def test_short_pause_does_not_split_segment():
+    audio = np.concatenate([tone(0.5), silence(0.3), tone(0.5), silence(1.0)])
+    segments = segment(audio, silence_threshold=0.5, pre_roll=0.0, hangover=0.0)
+    assert [(s.start_sample, s.end_sample) for s in segments] == [(0, int(1.3 * SAMPLE_RATE))]
+
+
+def test_flush_closes_segment_and_appends_tail():
+    audio = np.concatenate([silence(0.2), tone(0.5), tone(0.005)])  # 停止时语音未结束，尾部不足一帧
+    segments = segment(audio, silence_threshold=0.5, pre_roll=0.2, hangover=0.2)
+    assert len(segments) == 1
+    assert (segments[0].start_sample, segments[0].end_sample) == (0, len(audio))
+    np.testing.assert_array_equal(segments[0].audio, audio)
+
+
+def test_flush_when_idle_returns_nothing():
+    segmenter = SpeechSegmenter(SAMPLE_RATE, FRAME)
+    frames = silence(0.1).reshape(-1, FRAME)
+    assert segmenter.push(frames, np.zeros(len(frames), dtype=bool), 0) == []
+    assert segmenter.flush() is None and not segmenter.is_speaking
+
+
+def test_forced_cut_at_quietest_frame_within_window():
+    # 3 秒连续语音，1.7 秒处有一帧较弱（仍判为语音）
+    audio = tone(3.0)
+    audio[85 * FRAME:86 * FRAME] *= 0.3
+    segments = segment(audio, max_duration=2.0, cut_window=0.5, pre_roll=0.0)
+    assert segments[0].forced and not segments[-1].forced
+    assert (segments[0].start_sample, segments[0].end_sample) == (0, 85 * FRAME)
+    assert segments[1].start_sample == 85 * FRAME
+    assert segments[-1].end_sample == len(audio)
+    np.testing.assert_array_equal(np.concatenate([s.audio for s in segments]), audio)
+
+
+def test_forced_cuts_bound_segment_length_with_overlap():
+    audio = tone(7.0)
+    segments = segment(audio, max_duration=2.0, cut_window=0.5, overlap=0.1, pre_roll=0.0)
+    assert len(segments) > 3 and all(s.forced for s in segments[:-1])
+    assert (segments[0].start_sample, segments[-1].end_sample) == (0, len(audio))
+    assert all(len(s.audio) <= 2 * SAMPLE_RATE for s in segments)
+    for previous, current in zip(segments, segments[1:]):
+        # 下一段从切点前 0.1 秒处开始
+        assert current.start_sample == previous.end_sample - int(0.1 * SAMPLE_RATE)
+    for s in segments:
+        np.testing.assert_array_equal(s.audio, audio[s.start_sample:s.end_sample])
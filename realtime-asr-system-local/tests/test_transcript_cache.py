@@ -0,0 +1,101 @@
+"""
+识别结果缓存测试 - 内容键、LRU 淘汰、TTL 过期与 SQLite 磁盘层
+"""
+import asyncio
+import threading
+
+import numpy as np
+
+from backend import transcript_cache
+from backend.transcript_cache import TranscriptCache, audio_fingerprint
+
+
+def pcm(samples) -> bytes:
+    return np.asarray(samples, dtype='<i2').tobytes()
+
+
+def test_fingerprint_ignores_leading_and_trailing_silence():
+    voice = (np.sin(np.arange(1600) / 5) * 8000).astype('<i2')
+    padded = np.concatenate([np.zeros(800), voice, np.zeros(3200)])
+    assert audio_fingerprint(pcm(voice)) == audio_fingerprint(pcm(padded))
+    assert audio_fingerprint(pcm(voice)) != audio_fingerprint(pcm(voice[::-1]))
+
+
+def test_silent_audio_is_not_cached():
+    assert audio_fingerprint(bytes(32000)) is None
+    assert audio_fingerprint(pcm(np.full(1600, 30))) is None  # 低于静音阈值的底噪
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TranscriptCache(max_entries=2)
+
+    async def scenario():
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        assert await cache.get('a') == 'A'  # a 变为最近使用
+        cache.put('c', 'C')
+        return [await cache.get(key) for key in 'abc']
+
+    assert asyncio.run(scenario()) == ['A', None, 'C']
+    assert cache.stats()['entries'] == 2
+
+
+def test_character_limit_evicts_oldest():
+    cache = TranscriptCache(max_entries=10, max_chars=10)
+    cache.put('a', 'x' * 6)
+    cache.put('b', 'y' * 6)
+    assert asyncio.run(cache.get('a')) is None
+    assert cache.stats()['chars'] == 6
+
+
+def test_entries_expire_after_ttl(monkeypatch, tmp_path):
+    clock = [1000.0]
+    monkeypatch.setattr(transcript_cache.time, 'time', lambda: clock[0])
+    cache = TranscriptCache(ttl=60, db_path=str(tmp_path / 'cache.sqlite3'))
+    cache.put('a', 'A')
+
+    async def lookup():
+        return await cache.get('a')
+
+    clock[0] += 59
+    assert asyncio.run(lookup()) == 'A'
+    clock[0] += 2
+    assert asyncio.run(lookup()) is None  # 内存与磁盘层都已过期
+    cache.close()
+    stats = cache.stats()
+    assert (stats['hits'], stats['disk_hits'], stats['misses'], stats['entries']) == (1, 0, 1, 0)
+
+
+def test_disk_tier_survives_reopen(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = TranscriptCache(db_path=path)
+    cache.put('a', 'A')
+    cache.put('b', 'B')
+    cache.close()
+
+    reopened = TranscriptCache(db_path=path)
+
+    async def lookup():
+        return [await reopened.get(key) for key in ('a', 'b', 'c', 'a')]
+
+    assert asyncio.run(lookup()) == ['A', 'B', None, 'A']
+    reopened.close()
+    stats = reopened.stats()
+    assert (stats['hits'], stats['disk_hits'], stats['misses']) == (3, 2, 1)
+
+
+def test_disk_lookup_runs_off_the_event_loop(tmp_path):
+    cache = TranscriptCache(db_path=str(tmp_path / 'cache.sqlite3'))
+    cache.put('a', 'A')
+    cache.entries.clear()  # 只保留磁盘层
+    threads = []
+    disk_get = cache._disk_get
+
+    def recording_get(key):
+        threads.append(threading.get_ident())
+        return disk_get(key)
+
+    cache._disk_get = recording_get
+    assert asyncio.run(cache.get('a')) == 'A'
+    cache.close()
+    assert threads and threading.get_ident() not in threads
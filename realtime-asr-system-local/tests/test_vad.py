@@ -0,0 +1,64 @@
+"""
+VADEngine 测试 - 任意长度的输入块按完整帧批量判定，样本时钟连续
+"""
+import numpy as np
+import pytest
+
+from backend.vad import VADEngine, create_vad_backend
+from synthetic_audio import FRAME, SAMPLE_RATE, silence, tone
+
+
+def run_engine(engine: VADEngine, audio: np.ndarray, sizes):
+    """按 sizes 循环切块输入，返回全部帧、判定与每批的起始样本"""
+    frames, decisions, starts = [], [], []
+    offset = 0
+    i = 0
+    while offset < len(audio):
+        chunk = audio[offset:offset + sizes[i % len(sizes)]]
+        offset += len(chunk)
+        i += 1
+        batch, batch_decisions, start = engine.process(chunk)
+        frames.append(batch)
+        decisions.append(batch_decisions)
+        starts.append((start, len(batch)))
+    return np.concatenate(frames), np.concatenate(decisions), starts
+
+
+@pytest.mark.parametrize('backend', ['energy', 'spectral'])
+def test_odd_sized_chunks_are_framed_without_gaps(backend):
+    audio = np.concatenate([silence(0.5), tone(1.0), silence(0.5)])
+    engine = VADEngine(create_vad_backend(backend, SAMPLE_RATE), SAMPLE_RATE)
+    frames, decisions, starts = run_engine(engine, audio, [1000, 37, 5003, 0, 319, 2048])
+
+    n_frames = len(audio) // FRAME
+    assert frames.shape == (n_frames, FRAME)
+    np.testing.assert_array_equal(frames.reshape(-1), audio[:n_frames * FRAME])
+    assert engine.pending == len(audio) - n_frames * FRAME
+    # 每批的起始样本紧接上一批
+    clock = 0
+    for start, count in starts:
+        assert start == clock
+        clock += count * FRAME
+    assert engine.sample_clock == clock
+
+    # 0.5 秒 = 25 帧静音，之后 50 帧语音，再 25 帧静音
+    expected = np.zeros(n_frames, dtype=bool)
+    expected[25:75] = True
+    np.testing.assert_array_equal(decisions, expected)
+
+
+def test_chunk_larger_than_capacity_grows_accumulator():
+    engine = VADEngine(create_vad_backend('energy', SAMPLE_RATE), SAMPLE_RATE, max_chunk_duration=0.1)
+    engine.process(tone(0.01))  # 留下 160 个剩余样本
+    frames, decisions, start = engine.process(tone(0.5))
+    assert start == 0 and len(frames) == (160 + 8000) // FRAME
+    assert engine.capacity >= 160 + 8000
+    assert decisions.all()
+
+
+def test_reset_restarts_sample_clock():
+    engine = VADEngine(create_vad_backend('energy', SAMPLE_RATE), SAMPLE_RATE)
+    engine.process(silence(0.33))
+    engine.reset()
+    _, _, start = engine.process(silence(0.1))
+    assert start == 0 and engine.sample_clock == 5 * FRAME
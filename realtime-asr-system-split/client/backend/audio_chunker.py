@@ -0,0 +1,41 @@
+"""
+定长音频块 - 把重采样器输出的不定长样本拼接为定长音频块，块边界处不丢样本
+"""
+from typing import List, Optional
+
+import numpy as np
+
+
+class AudioChunker:
+    """把任意长度的样本序列切分为 chunk_size 个样本的 float32 音频块
+
+    流式重采样器每次输出的样本数不固定（如 0、1078、540…），写满一块后剩余的样本转入下一块。
+    """
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self.buffer = np.empty(chunk_size, dtype=np.float32)
+        self.filled = 0  # 当前块已写入的样本数
+
+    def write(self, data: np.ndarray) -> List[np.ndarray]:
+        """写入样本，返回本次写满的音频块（每块为独立数组）"""
+        chunks = []
+        offset = 0
+        while offset < len(data):
+            n = min(self.chunk_size - self.filled, len(data) - offset)
+            self.buffer[self.filled:self.filled + n] = data[offset:offset + n]
+            self.filled += n
+            offset += n
+            if self.filled == self.chunk_size:
+                chunks.append(self.buffer)
+                self.buffer = np.empty(self.chunk_size, dtype=np.float32)
+                self.filled = 0
+        return chunks
+
+    def flush(self) -> Optional[np.ndarray]:
+        """取出未写满的最后一块，没有剩余样本时返回 None"""
+        if not self.filled:
+            return None
+        chunk = self.buffer[:self.filled].copy()
+        self.filled = 0
+        return chunk
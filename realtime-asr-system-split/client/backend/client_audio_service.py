@@ -7,11 +7,15 @@ import logging
 import websockets
 import soundcard as sc
 import numpy as np
-import soxr
-import struct
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, Optional
 from config.config import ClientConfig
+from backend.audio_chunker import AudioChunker
+from backend.audio_encoder import PCMEncoder
+from backend.resampler import create_resampler
+from backend.wire_protocol import (SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON, decode_message, encode_audio, is_binary,
+                                   serialize)
 
 logger = logging.getLogger(__name__)
 
@@ -25,14 +29,31 @@ class ClientAudioService:
         self.buffer_duration = ClientConfig.BUFFER_DURATION
         self.buffer_size = int(self.buffer_duration * self.sample_rate)
         self.is_connected_to_server = False
+        self.pcm_encoder = PCMEncoder(self.sample_rate, capacity=self.buffer_size)
+        self.next_stream_id = 0  # 每路采集的流编号（写入二进制音频帧头）
+        self.session_id: Optional[str] = None  # 服务器会话编号，重连时据此恢复
+        self.acked: Dict[int, int] = {}  # 流编号 -> 已收到结果的最大序号
+        self.server_segments = False  # 服务器对音频分段识别（结果序号不对应音频块序号）
+        self.reconnecting = False
         
     async def connect_to_server(self):
-        """连接到服务器WebSocket"""
+        """连接到服务器WebSocket，建立或恢复会话后重发服务器未收到的音频"""
         try:
             server_url = f"ws://{ClientConfig.SERVER_WS_HOST}:{ClientConfig.SERVER_WS_PORT}"
-            self.server_websocket = await websockets.connect(server_url)
+            if ClientConfig.WIRE_PROTOCOL == 'binary':
+                subprotocols = [SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON]
+            else:
+                subprotocols = [SUBPROTOCOL_JSON]
+            self.server_websocket = await websockets.connect(server_url, subprotocols=subprotocols)
+            logger.info(f"已连接到服务器: {server_url}（协议: {self.server_websocket.subprotocol or 'legacy'}）")
+            
+            # 先重发缓存的音频块，再恢复发送新音频，保持音频块顺序（会话与重发仅用于二进制子协议）
+            if is_binary(self.server_websocket.subprotocol):
+                received = await self.open_session()
+                await self.resend_unacked(received)
+            else:
+                self.session_id = None
             self.is_connected_to_server = True
-            logger.info(f"已连接到服务器: {server_url}")
             
             # 启动消息接收循环
             asyncio.create_task(self.receive_server_messages())
@@ -41,29 +62,141 @@ class ClientAudioService:
             logger.error(f"连接服务器失败: {e}")
             self.is_connected_to_server = False
             
+    async def open_session(self) -> Optional[Dict[int, int]]:
+        """发送会话消息（带上次的会话编号与已确认序号），返回恢复时服务器已收到的各流最大音频序号
+
+        新会话或服务器不支持会话时返回 None，此时重发全部未确认的音频。
+        """
+        await self.server_websocket.send(json.dumps({
+            "type": "session",
+            "session_id": self.session_id,
+            "acked": {str(stream_id): sequence for stream_id, sequence in self.acked.items()}
+        }))
+        try:
+            while True:
+                message = await asyncio.wait_for(self.server_websocket.recv(),
+                                                 ClientConfig.SESSION_HANDSHAKE_TIMEOUT)
+                if isinstance(message, str):
+                    data = json.loads(message)
+                    if data.get('type') == 'session':
+                        break
+        except asyncio.TimeoutError:
+            logger.warning("服务器不支持会话，断线后无法恢复已完成的识别结果")
+            self.session_id = None
+            return None
+        
+        self.session_id = data['session_id']
+        self.server_segments = data.get('segmented', False)
+        if not data['resumed']:
+            logger.info(f"已建立会话 {self.session_id}")
+            return None
+        logger.info(f"已恢复会话 {self.session_id}，服务器重发 {data['replayed']} 个识别结果")
+        return {int(stream_id): sequence for stream_id, sequence in data.get('received', {}).items()}
+    
+    async def resend_unacked(self, received: Optional[Dict[int, int]]):
+        """重发服务器未收到的音频块（received 为 None 时重发全部未确认的音频块）
+
+        重发期间捕获的新音频块仍只进入缓存，因此反复检查直到一整轮没有新的音频块，
+        返回后调用方立即恢复直接发送（其间没有等待，不会再漏掉音频块）。
+        """
+        sent = dict(received or {})  # 流编号 -> 已发送（或服务器已收到）的最大序号
+        for stream_info in self.active_streams.values():
+            unacked = stream_info['unacked']
+            while unacked and next(iter(unacked)) <= sent.get(stream_info['stream_id'], -1):
+                unacked.popitem(last=False)
+        while True:
+            resent = False
+            for stream_info in list(self.active_streams.values()):
+                stream_id = stream_info['stream_id']
+                for sequence in [s for s in stream_info['unacked'] if s > sent.get(stream_id, -1)]:
+                    data = stream_info['unacked'].get(sequence)
+                    if data is not None:
+                        await self.server_websocket.send(data)
+                        resent = True
+                    sent[stream_id] = sequence
+            if not resent:
+                return
+    
+    def acknowledge(self, message: dict):
+        """按（流编号, 序号）记录已收到结果的音频块，并丢弃该流中不再需要重发的音频块
+
+        二进制帧的结果原样带回音频帧头中的流编号与客户端序号；合并识别的音频块没有单独的结果，
+        因此序号不大于已确认序号的音频块都可丢弃。服务器分段识别时结果序号为语音段序号，
+        只记录已确认序号（恢复会话时使用），音频块在恢复时按服务器已收到的序号丢弃。
+        """
+        if message.get('type') not in ('transcript', 'error') or 'stream_id' not in message:
+            return
+        stream_id = message['stream_id']
+        sequence = message['sequence']
+        self.acked[stream_id] = max(sequence, self.acked.get(stream_id, -1))
+        if self.server_segments:
+            return
+        for stream_info in self.active_streams.values():
+            if stream_info['stream_id'] == stream_id:
+                unacked = stream_info['unacked']
+                while unacked and next(iter(unacked)) <= sequence:
+                    unacked.popitem(last=False)
+    
+    async def reconnect(self):
+        """按指数退避重连服务器，期间音频捕获继续，音频块暂存在未确认缓冲区"""
+        self.reconnecting = True
+        delay = ClientConfig.RECONNECT_DELAY
+        try:
+            for attempt in range(1, ClientConfig.RECONNECT_ATTEMPTS + 1):
+                await asyncio.sleep(delay)
+                logger.info(f"重连服务器（第 {attempt} 次）")
+                await self.connect_to_server()
+                if self.is_connected_to_server:
+                    return
+                delay = min(delay * 2, ClientConfig.RECONNECT_MAX_DELAY)
+        finally:
+            self.reconnecting = False
+        
+        logger.error("重连服务器失败，停止全部音频流")
+        for client_id, stream_info in list(self.active_streams.items()):
+            try:
+                await stream_info['websocket'].send(json.dumps({
+                    "type": "error",
+                    "message": "与服务器的连接已断开",
+                    "timestamp": datetime.now().isoformat()
+                }))
+            except Exception:
+                pass
+            await self.stop_streaming(client_id)
+    
     async def receive_server_messages(self):
-        """接收服务器消息并转发给前端"""
+        """接收服务器消息并转发给前端
+
+        二进制帧按流编号只转发给对应的前端，并按前端协商的子协议重新编码；
+        JSON 文本消息原样转发给所有前端。连接断开且仍有音频流时自动重连。
+        """
         try:
             async for message in self.server_websocket:
-                # 将服务器消息转发给所有前端客户端
-                for client_id, stream_info in self.active_streams.items():
+                targets = list(self.active_streams.items())
+                decoded = None
+                if isinstance(message, bytes):
+                    decoded = decode_message(message)
+                    self.acknowledge(decoded)
+                    targets = [(client_id, stream_info) for client_id, stream_info in targets
+                               if stream_info['stream_id'] == decoded['stream_id']]
+                for client_id, stream_info in targets:
+                    websocket = stream_info['websocket']
                     try:
-                        await stream_info['websocket'].send(message)
+                        if decoded is None or is_binary(getattr(websocket, 'subprotocol', None)):
+                            await websocket.send(message)
+                        else:
+                            await websocket.send(serialize(decoded, websocket.subprotocol))
                     except Exception as e:
                         logger.error(f"转发消息到客户端 {client_id} 失败: {e}")
         except Exception as e:
             logger.error(f"接收服务器消息失败: {e}")
-            self.is_connected_to_server = False
+        self.is_connected_to_server = False
+        if self.active_streams and not self.reconnecting:
+            await self.reconnect()
             
     def encode_wav(self, audio_data: np.ndarray) -> bytes:
-        """将音频数据编码为WAV格式"""
-        pcm_data = (audio_data * 0x7fff).astype(np.int16)
-        wav_data = bytearray(len(pcm_data) * 2)
-        
-        for i in range(len(pcm_data)):
-            struct.pack_into('<h', wav_data, i * 2, pcm_data[i])
-            
-        return bytes(wav_data)
+        """将音频数据编码为WAV格式（仅PCM数据，不含文件头）"""
+        return self.pcm_encoder.encode_bytes(audio_data)
     
     async def start_streaming(self, websocket, client_id: str):
         """开始系统音频流"""
@@ -86,12 +219,20 @@ class ClientAudioService:
         stream_info = {
             'websocket': websocket,
             'client_id': client_id,
+            'stream_id': self.next_stream_id,
+            'next_sequence': 0,   # 下一个音频块的序号
+            'sample_clock': 0,    # 已发送的 16kHz 样本数（下一个音频块的起始样本）
             'is_streaming': True,
-            'audio_buffer': np.zeros(self.buffer_size, dtype=np.float32),
-            'buffer_ptr': 0
+            'chunker': AudioChunker(self.buffer_size),  # 拼接为 BUFFER_DURATION 秒的音频块
+            'unacked': OrderedDict(),  # 序号 -> 已发送但尚未收到结果的音频块（重连后重发）
+            'resampler': create_resampler(  # 有状态重采样器 44100Hz → 16000Hz
+                ClientConfig.SAMPLE_ORIGINAL, self.sample_rate, quality=ClientConfig.RESAMPLE_QUALITY,
+                backend=ClientConfig.RESAMPLER_BACKEND
+            )
         }
         
         self.active_streams[client_id] = stream_info
+        self.next_stream_id = (self.next_stream_id + 1) % 0x10000
         
         try:
             logger.info(f"客户端 {client_id} 系统音频推流开始")
@@ -133,33 +274,32 @@ class ClientAudioService:
             
             # 创建环回录音器
             with sc.get_microphone(id=str(speaker.name), include_loopback=True).recorder(
-                samplerate=44100, channels=1
+                samplerate=ClientConfig.SAMPLE_ORIGINAL, channels=1
             ) as recorder:
                 
                 chunk_size = ClientConfig.CHUNK_SIZE
                 
                 while (client_id in self.active_streams and 
                        stream_info['is_streaming'] and
-                       self.is_connected_to_server):
+                       (self.is_connected_to_server or self.reconnecting)):
                     
                     # 捕获音频数据
                     data = await asyncio.to_thread(recorder.record, chunk_size)
-                    data = data.reshape(-1)
                     
                     # 重采样到16kHz
-                    data = soxr.resample(
-                        data,
-                        44100,
-                        16000,
-                        quality=soxr.HQ
-                    )
+                    data = stream_info['resampler'].process(data)
                     
-                    # 写入缓冲区
-                    self.write_to_buffer(stream_info, data)
-                    
-                    # 检查是否需要发送数据到服务器
-                    if stream_info['buffer_ptr'] >= self.buffer_size:
-                        await self.send_audio_to_server(stream_info)
+                    # 写入缓冲区，每写满一块发送到服务器（溢出的样本留在下一块）
+                    for chunk in stream_info['chunker'].write(data):
+                        await self.send_audio_to_server(stream_info, chunk)
+                
+                # 停止时取出重采样器剩余样本，连同未写满的最后一块一起发送
+                chunker = stream_info['chunker']
+                for chunk in chunker.write(stream_info['resampler'].flush()):
+                    await self.send_audio_to_server(stream_info, chunk)
+                tail = chunker.flush()
+                if tail is not None:
+                    await self.send_audio_to_server(stream_info, tail)
                         
         except Exception as e:
             logger.error(f"客户端 {client_id} 音频捕获错误: {e}")
@@ -174,42 +314,41 @@ class ClientAudioService:
                 except:
                     pass
     
-    def write_to_buffer(self, stream_info: dict, data: np.ndarray):
-        """写入数据到音频缓冲区"""
-        n = len(data)
-        buffer_ptr = stream_info['buffer_ptr']
-        audio_buffer = stream_info['audio_buffer']
-        
-        if buffer_ptr + n <= self.buffer_size:
-            audio_buffer[buffer_ptr:buffer_ptr + n] = data
-            stream_info['buffer_ptr'] += n
-        else:
-            remaining = self.buffer_size - buffer_ptr
-            audio_buffer[buffer_ptr:] = data[:remaining]
-            stream_info['buffer_ptr'] = self.buffer_size
-    
-    async def send_audio_to_server(self, stream_info: dict):
-        """发送音频数据到服务器"""
-        if (stream_info['buffer_ptr'] == self.buffer_size and 
-            stream_info['is_streaming'] and
-            self.is_connected_to_server):
+    async def send_audio_to_server(self, stream_info: dict, audio: np.ndarray):
+        """发送音频数据到服务器（停止时最后一块可能不足 BUFFER_DURATION 秒）
+
+        二进制子协议下音频块先放入未确认缓冲区（最多 RESEND_BUFFER 块），收到对应结果后丢弃；
+        重连期间只缓存不发送，恢复会话后重发服务器未收到的部分。旧协议下结果没有客户端序号，不缓存重发。
+        """
+        if self.server_websocket is not None:
+            
+            # 编码音频数据
+            wav_data = self.encode_wav(audio)
+            
+            # 二进制子协议下加上流编号、序号与起始样本的帧头，并缓存到收到结果为止
+            resendable = is_binary(self.server_websocket.subprotocol)
+            if resendable:
+                wav_data = encode_audio(wav_data, stream_info['stream_id'], stream_info['next_sequence'],
+                                        stream_info['sample_clock'])
+                unacked = stream_info['unacked']
+                unacked[stream_info['next_sequence']] = wav_data
+                if len(unacked) > ClientConfig.RESEND_BUFFER:
+                    unacked.popitem(last=False)
+            stream_info['next_sequence'] += 1
+            stream_info['sample_clock'] += len(audio)
             
+            if not self.is_connected_to_server:
+                if resendable:
+                    logger.debug("等待重连，音频块已缓存")
+                else:
+                    logger.warning("等待重连，丢弃音频块（旧协议下不缓存重发）")
+                return
             try:
-                # 编码音频数据
-                wav_data = self.encode_wav(stream_info['audio_buffer'])
-                
-                # 发送到服务器
                 await self.server_websocket.send(wav_data)
-                
                 logger.debug(f"发送音频数据到服务器，长度: {len(wav_data)} 字节")
-                
-                # 重置缓冲区
-                stream_info['audio_buffer'] = np.zeros(self.buffer_size, dtype=np.float32)
-                stream_info['buffer_ptr'] = 0
-                
             except Exception as e:
+                # 连接断开由接收循环发现并重连，音频块留在未确认缓冲区
                 logger.error(f"发送音频数据到服务器失败: {e}")
-                self.is_connected_to_server = False
     
     async def handle_client_message(self, websocket, client_id: str, message):
         """处理客户端消息"""
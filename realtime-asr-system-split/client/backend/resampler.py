@@ -0,0 +1,267 @@
+"""
+流式重采样 - 每路音频流持有一个有状态的重采样器，跨块保持滤波器状态
+
+可选后端:
+    soxr       soxr.ResampleStream（默认，需要安装 soxr）
+    polyphase  纯 NumPy 多相 FIR（Kaiser 窗 sinc），无额外依赖
+    linear     scipy.signal.lfilter 低通（携带 zi 状态）+ np.interp 线性插值
+"""
+from math import gcd
+
+import numpy as np
+
+try:
+    import soxr
+except ImportError:  # 未安装 soxr 时使用 NumPy/SciPy 后端
+    soxr = None
+
+try:
+    from scipy import signal as scipy_signal
+except ImportError:
+    scipy_signal = None
+
+QUALITY_LEVELS = ('LQ', 'MQ', 'HQ', 'VHQ')
+
+
+class BaseResampler:
+    """重采样器接口: process() 逐块处理，flush() 取出剩余样本并复位"""
+
+    def __init__(self, in_rate: int, out_rate: int, quality: str = 'HQ', dtype=np.float32):
+        if quality not in QUALITY_LEVELS:
+            raise ValueError(f"不支持的重采样质量: {quality}，可选 {QUALITY_LEVELS}")
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.quality = quality
+        self.dtype = np.dtype(dtype)
+
+    def reset(self):
+        """丢弃内部状态，重新开始一段新的流"""
+        raise NotImplementedError
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """重采样一个音频块（一维单声道）"""
+        raise NotImplementedError
+
+    def flush(self) -> np.ndarray:
+        """输出滤波器中剩余的样本，并重置为初始状态"""
+        raise NotImplementedError
+
+    def _as_input(self, chunk: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(chunk.reshape(-1), dtype=self.dtype)
+
+
+class StreamResampler(BaseResampler):
+    """有状态的流式重采样器（soxr 后端）
+
+    与逐块调用 soxr.resample 不同，滤波器只初始化一次，块边界处不会
+    产生不连续；停止时调用 flush() 取出滤波器延迟中剩余的样本。
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, quality: str = 'HQ', dtype=np.float32):
+        if soxr is None:
+            raise ImportError("soxr 未安装，请使用 polyphase 或 linear 重采样后端")
+        super().__init__(in_rate, out_rate, quality, dtype)
+        self._stream = None
+        self.reset()
+
+    def reset(self):
+        if self.in_rate == self.out_rate:
+            self._stream = None
+        else:
+            self._stream = soxr.ResampleStream(
+                self.in_rate, self.out_rate, 1, dtype=self.dtype.name, quality=self.quality
+            )
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        chunk = self._as_input(chunk)
+        if self._stream is None:
+            return chunk
+        return self._stream.resample_chunk(chunk)
+
+    def flush(self) -> np.ndarray:
+        if self._stream is None:
+            return np.zeros(0, dtype=self.dtype)
+        tail = self._stream.resample_chunk(np.zeros(0, dtype=self.dtype), last=True)
+        self.reset()
+        return tail
+
+
+class PolyphaseResampler(BaseResampler):
+    """多相 FIR 重采样器（纯 NumPy）
+
+    按 L/M 有理比例重采样，每个输出样本只与对应相位的 taps 个系数做点积，
+    历史样本在块之间保留，因此分块处理与整段处理结果一致。
+    """
+
+    # 质量 → (每相位抽头数, Kaiser beta)
+    QUALITY_TAPS = {'LQ': (8, 5.0), 'MQ': (16, 6.0), 'HQ': (32, 8.0), 'VHQ': (64, 10.0)}
+
+    def __init__(self, in_rate: int, out_rate: int, quality: str = 'HQ', dtype=np.float32):
+        super().__init__(in_rate, out_rate, quality, dtype)
+        g = gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        self.taps, beta = self.QUALITY_TAPS[quality]
+
+        # Kaiser 窗 sinc 低通，截止频率为较低奈奎斯特频率的 90%；
+        # 取奇数长度使群延迟为整数，输出时按该延迟前移即可精确对齐
+        n = self.up * self.taps - 1
+        cutoff = 0.45 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, beta) * self.up
+        h = np.append(h, 0.0)
+        # phases[r, j] = h[j * up + r]，倒序后可直接与时间正序的输入窗口点积
+        self.phases = h.reshape(self.taps, self.up).T[:, ::-1].astype(self.dtype)
+        self.offset = (n - 1) // 2  # 群延迟（上采样域样本）
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros(self.taps - 1, dtype=self.dtype)
+        self.consumed = 0     # 已输入样本数
+        self.next_output = 0  # 下一个输出样本的序号
+        self.emitted = 0      # 已输出样本数
+
+    def _filter(self, chunk: np.ndarray) -> np.ndarray:
+        ext = np.concatenate([self.history, chunk])
+        total = self.consumed + len(chunk)
+        # 输出 k 需要的最新输入样本为 (k * down + offset) // up，不得超过 total - 1
+        end = max(-(-(total * self.up - self.offset) // self.down), self.next_output)
+        k = np.arange(self.next_output, end, dtype=np.int64)
+        positions = k * self.down + self.offset
+        q = positions // self.up
+        r = positions - q * self.up
+
+        windows = np.lib.stride_tricks.sliding_window_view(ext, self.taps)
+        out = np.einsum('ij,ij->i', self.phases[r], windows[q - self.consumed])
+
+        self.history = ext[len(ext) - (self.taps - 1):].copy()
+        self.consumed = total
+        self.next_output = end
+        return out
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        chunk = self._as_input(chunk)
+        if self.up == self.down or len(chunk) == 0:
+            return chunk
+        out = self._filter(chunk)
+        self.emitted += len(out)
+        return out
+
+    def flush(self) -> np.ndarray:
+        if self.up == self.down:
+            return np.zeros(0, dtype=self.dtype)
+        expected = int(round(self.consumed * self.up / self.down))
+        tail = self._filter(np.zeros(self.taps, dtype=self.dtype))
+        tail = tail[:max(expected - self.emitted, 0)]
+        self.reset()
+        return tail
+
+
+class LowPassFilter:
+    """有状态 IIR 低通滤波器（scipy.signal.lfilter，块间携带 zi）
+
+    order=1 时为原实现中的一阶 RC 低通，更高阶使用 Butterworth。
+    """
+
+    def __init__(self, cutoff: float, sample_rate: int, order: int = 1, dtype=np.float32):
+        if scipy_signal is None:
+            raise ImportError("scipy 未安装，无法使用 IIR 低通滤波")
+        if order == 1:
+            rc = 1 / (2 * np.pi * cutoff)
+            dt = 1 / sample_rate
+            alpha = dt / (rc + dt)
+            self.b, self.a = np.array([alpha]), np.array([1.0, alpha - 1.0])
+        else:
+            self.b, self.a = scipy_signal.butter(order, cutoff, fs=sample_rate)
+        self.dtype = np.dtype(dtype)
+        self.zi_unit = scipy_signal.lfilter_zi(self.b, self.a)
+        self.zi = None
+
+    def reset(self):
+        self.zi = None
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        if len(chunk) == 0:
+            return chunk.astype(self.dtype)
+        if self.zi is None:
+            # 以首样本为稳态起点，与原实现 filtered[0] = input[0] 一致
+            self.zi = self.zi_unit * chunk[0]
+        out, self.zi = scipy_signal.lfilter(self.b, self.a, chunk, zi=self.zi)
+        return out.astype(self.dtype)
+
+
+class LinearResampler(BaseResampler):
+    """IIR 低通 + np.interp 线性插值重采样器
+
+    对应原 low_pass_filter + resample_audio 两步流程的向量化有状态版本，
+    块间携带滤波器 zi、上一块末尾样本与小数相位。
+    """
+
+    # 质量 → 抗混叠低通阶数
+    QUALITY_ORDER = {'LQ': 1, 'MQ': 2, 'HQ': 4, 'VHQ': 6}
+
+    def __init__(self, in_rate: int, out_rate: int, quality: str = 'HQ', dtype=np.float32):
+        super().__init__(in_rate, out_rate, quality, dtype)
+        self.ratio = in_rate / out_rate
+        self.lowpass = None
+        if out_rate < in_rate:
+            order = self.QUALITY_ORDER[quality]
+            cutoff = out_rate / 2 if order == 1 else 0.45 * out_rate
+            self.lowpass = LowPassFilter(cutoff, in_rate, order=order, dtype=dtype)
+        self.reset()
+
+    def reset(self):
+        if self.lowpass is not None:
+            self.lowpass.reset()
+        self.last = 0.0      # 上一块最后一个样本（位置 -1）
+        self.position = 0.0  # 下一个输出样本在当前块中的位置
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        chunk = self._as_input(chunk)
+        n = len(chunk)
+        if n == 0:
+            return chunk
+        if self.lowpass is not None:
+            chunk = self.lowpass.process(chunk)
+
+        count = int(np.floor((n - 1 - self.position) / self.ratio)) + 1 if self.position <= n - 1 else 0
+        times = self.position + self.ratio * np.arange(count)
+        # 在 [last, chunk...] 上插值，索引 0 对应位置 -1
+        out = np.interp(times + 1, np.arange(n + 1), np.concatenate([[self.last], chunk]))
+
+        self.position = self.position + self.ratio * count - n
+        self.last = chunk[-1]
+        return out.astype(self.dtype)
+
+    def flush(self) -> np.ndarray:
+        self.reset()
+        return np.zeros(0, dtype=self.dtype)
+
+
+RESAMPLER_BACKENDS = {
+    'soxr': StreamResampler,
+    'polyphase': PolyphaseResampler,
+    'linear': LinearResampler,
+}
+
+
+def create_resampler(in_rate: int, out_rate: int, quality: str = 'HQ', backend: str = 'auto') -> BaseResampler:
+    """为一路音频流创建重采样器，backend='auto' 时优先使用 soxr"""
+    if backend == 'auto':
+        backend = 'soxr' if soxr is not None else 'polyphase'
+    if backend not in RESAMPLER_BACKENDS:
+        raise ValueError(f"未知的重采样后端: {backend}，可选 {list(RESAMPLER_BACKENDS)}")
+    return RESAMPLER_BACKENDS[backend](in_rate, out_rate, quality=quality)
+
+
+def low_pass_filter(input_data, target_sample_rate=16000, sample_rate=44100):
+    """一阶RC低通滤波（整段处理，结果与逐样本实现一致）"""
+    return LowPassFilter(target_sample_rate / 2, sample_rate).process(input_data)
+
+
+def resample_audio(input_data, target_sample_rate=16000, sample_rate=44100):
+    """线性插值重采样（整段处理，结果与逐样本实现一致）"""
+    ratio = sample_rate / target_sample_rate
+    new_length = int(round(len(input_data) / ratio))
+    index = np.arange(new_length) * ratio
+    return np.interp(index, np.arange(len(input_data)), input_data).astype(np.float32)
@@ -0,0 +1,143 @@
+"""
+WebSocket 传输协议 - 通过子协议（Sec-WebSocket-Protocol）协商二进制帧或 JSON 文本
+
+二进制帧（asr.binary.v1）= 24 字节小端帧头 + 负载：
+    version  uint8   协议版本（当前为 1）
+    type     uint8   帧类型（AUDIO / TRANSCRIPT / PARTIAL / ERROR / STATUS）
+    stream   uint16  音频流编号（设备管线或客户端的一路采集）
+    sequence uint32  语音段序号
+    start    uint64  起始样本序号（16kHz 样本时钟）
+    end      uint64  结束样本序号（不含）
+负载：
+    AUDIO       16位单声道小端 PCM
+    TRANSCRIPT  processing_time float32 + first_token_time float32（无则为 NaN）+ UTF-8 文本
+    PARTIAL     UTF-8 文本
+    ERROR       UTF-8 错误信息
+    STATUS      UTF-8 状态信息
+
+其余消息（控制命令、心跳、指标）在两种子协议下都以 JSON 文本帧发送。
+客户端未提供子协议时按旧协议处理：JSON 文本消息 + 裸 PCM 二进制消息。
+"""
+import json
+import math
+import struct
+from datetime import datetime
+from typing import Optional, Union
+
+PROTOCOL_VERSION = 1
+SUBPROTOCOL_BINARY = 'asr.binary.v1'
+SUBPROTOCOL_JSON = 'asr.json.v1'
+# 服务器按此顺序优先选择
+SUBPROTOCOLS = [SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON]
+
+HEADER = struct.Struct('<BBHIQQ')
+TRANSCRIPT_TIMES = struct.Struct('<ff')
+
+AUDIO = 1
+TRANSCRIPT = 2
+PARTIAL = 3
+ERROR = 4
+STATUS = 5
+
+# 帧类型 <-> JSON 消息类型
+FRAME_TYPES = {
+    TRANSCRIPT: 'transcript',
+    PARTIAL: 'partial_transcript',
+    ERROR: 'error',
+    STATUS: 'status',
+}
+MESSAGE_TYPES = {name: frame_type for frame_type, name in FRAME_TYPES.items()}
+
+
+class ProtocolError(ValueError):
+    """无法解析的二进制帧"""
+
+
+def select_subprotocol(*args) -> Optional[str]:
+    """从客户端提供的子协议中选择，客户端未提供或无共同子协议时按旧协议继续（不拒绝握手）
+
+    兼容 websockets 新旧两套服务器实现的回调签名：
+    旧版 (client_subprotocols, server_subprotocols)，新版 (connection, client_subprotocols)。
+    """
+    offered = args[0] if isinstance(args[0], (list, tuple)) else args[1]
+    for subprotocol in SUBPROTOCOLS:
+        if subprotocol in offered:
+            return subprotocol
+    return None
+
+
+def is_binary(subprotocol: Optional[str]) -> bool:
+    return subprotocol == SUBPROTOCOL_BINARY
+
+
+def encode_frame(frame_type: int, payload: bytes = b'', stream_id: int = 0, sequence: int = 0,
+                 start_sample: int = 0, end_sample: int = 0) -> bytes:
+    return HEADER.pack(PROTOCOL_VERSION, frame_type, stream_id, sequence, start_sample, end_sample) + payload
+
+
+def decode_frame(data: bytes):
+    """解析二进制帧，返回 (帧类型, stream_id, sequence, start_sample, end_sample, 负载 memoryview)"""
+    if len(data) < HEADER.size:
+        raise ProtocolError(f"帧长度 {len(data)} 小于帧头 {HEADER.size} 字节")
+    version, frame_type, stream_id, sequence, start_sample, end_sample = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"不支持的协议版本: {version}")
+    return frame_type, stream_id, sequence, start_sample, end_sample, memoryview(data)[HEADER.size:]
+
+
+def encode_audio(pcm: bytes, stream_id: int, sequence: int, start_sample: int) -> bytes:
+    """16位 PCM 音频帧，结束样本序号由数据长度得出"""
+    return encode_frame(AUDIO, pcm, stream_id, sequence, start_sample, start_sample + len(pcm) // 2)
+
+
+def encode_message(message: dict) -> Optional[bytes]:
+    """把 transcript / partial_transcript / error / status 消息编码为二进制帧，其他消息返回 None"""
+    frame_type = MESSAGE_TYPES.get(message.get('type'))
+    if frame_type is None:
+        return None
+    if frame_type in (TRANSCRIPT, PARTIAL):
+        payload = message.get('text', '').encode('utf-8')
+        if frame_type == TRANSCRIPT:
+            first_token_time = message.get('first_token_time')
+            payload = TRANSCRIPT_TIMES.pack(
+                message.get('processing_time') or 0.0,
+                math.nan if first_token_time is None else first_token_time
+            ) + payload
+    else:
+        payload = message.get('message', '').encode('utf-8')
+    return encode_frame(frame_type, payload, message.get('stream_id') or 0, message.get('sequence') or 0,
+                        message.get('start_sample') or 0, message.get('end_sample') or 0)
+
+
+def decode_message(data: bytes) -> dict:
+    """把二进制帧还原为与 JSON 协议相同字段的消息字典（音频帧的 PCM 放在 "audio" 字段）"""
+    frame_type, stream_id, sequence, start_sample, end_sample, payload = decode_frame(data)
+    message = {
+        "stream_id": stream_id,
+        "sequence": sequence,
+        "start_sample": start_sample,
+        "end_sample": end_sample,
+    }
+    if frame_type == AUDIO:
+        message.update(type='audio', audio=bytes(payload))
+        return message
+    if frame_type not in FRAME_TYPES:
+        raise ProtocolError(f"未知的帧类型: {frame_type}")
+    message['type'] = FRAME_TYPES[frame_type]
+    if frame_type == TRANSCRIPT:
+        processing_time, first_token_time = TRANSCRIPT_TIMES.unpack_from(payload)
+        message['processing_time'] = processing_time
+        message['first_token_time'] = None if math.isnan(first_token_time) else first_token_time
+        payload = payload[TRANSCRIPT_TIMES.size:]
+    message['text' if frame_type in (TRANSCRIPT, PARTIAL) else 'message'] = str(payload, 'utf-8')
+    message['timestamp'] = datetime.now().isoformat()
+    return message
+
+
+def serialize(message: dict, subprotocol: Optional[str]) -> Union[str, bytes]:
+    """按连接协商的子协议序列化消息：二进制子协议下可编码的消息发送二进制帧，其余发送 JSON"""
+    if is_binary(subprotocol):
+        frame = encode_message(message)
+        if frame is not None:
+            return frame
+    return json.dumps(message)
@@ -7,6 +7,7 @@ import asyncio
 import threading
 import logging
 from backend.client_audio_service import client_audio_service
+from backend.wire_protocol import SUBPROTOCOLS, select_subprotocol
 from config.config import ClientConfig
 import websockets
 import json
@@ -60,7 +61,10 @@ class ClientWebSocketServer:
             self.host,
             self.port,
             ping_interval=20,
-            ping_timeout=10
+            ping_timeout=10,
+            # 与前端协商二进制 / JSON 子协议，未提供子协议的前端按 JSON 处理
+            subprotocols=SUBPROTOCOLS,
+            select_subprotocol=select_subprotocol
         ):
             logger.info("客户端 WebSocket 服务器已启动，等待前端连接...")
             await asyncio.Future()  # 永久运行
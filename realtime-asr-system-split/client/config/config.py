@@ -21,6 +21,21 @@ class ClientConfig:
     SAMPLE_RATE = 16000
     BUFFER_DURATION = 2.0  # 2秒缓冲区
     CHUNK_SIZE = 1764  # 40ms at 44100Hz
+    SAMPLE_ORIGINAL = 44100  # 环回设备采样率
+    RESAMPLE_QUALITY = 'HQ'  # 重采样质量: LQ / MQ / HQ / VHQ
+    RESAMPLER_BACKEND = 'auto'  # 重采样后端: soxr / polyphase / linear（auto 优先 soxr）
+    
+    # 与服务器之间的传输协议: binary（带流编号、序号与样本区间的二进制帧）/ json
+    # 服务器不支持子协议时自动按旧协议（裸 PCM + JSON）通信
+    WIRE_PROTOCOL = 'binary'
+    
+    # 断线重连：服务器连接断开后按指数退避重连并恢复会话（服务器重发已完成的识别结果）
+    # 会话与音频重发仅用于二进制子协议，旧协议下重连后继续发送新音频
+    RECONNECT_ATTEMPTS = 5
+    RECONNECT_DELAY = 0.5  # 首次重连等待（秒），之后每次加倍
+    RECONNECT_MAX_DELAY = 8.0
+    SESSION_HANDSHAKE_TIMEOUT = 5.0  # 等待会话回复的时长，超时视为服务器不支持会话
+    RESEND_BUFFER = 16  # 每路流保留的未确认音频块数（2 秒一块），重连后重发服务器未收到的部分
     
     # 日志配置
     LOG_LEVEL = 'INFO'
@@ -0,0 +1,7 @@
+"""
+测试配置 - 把 realtime-asr-system-split/client 加入导入路径（与 run.py 的运行方式一致）
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+"""
+AudioChunker 测试 - 重采样器输出不定长时，音频块边界处不丢样本
+"""
+import numpy as np
+
+from backend.audio_chunker import AudioChunker
+from backend.resampler import create_resampler
+
+CHUNK = 32000
+
+
+def test_odd_sized_writes_keep_every_sample():
+    rng = np.random.default_rng(0)
+    sizes = [0, 1078, 540, 31999, 2, 64001, 7] * 20
+    data = rng.standard_normal(sum(sizes)).astype(np.float32)
+    chunker = AudioChunker(CHUNK)
+    chunks = []
+    offset = 0
+    for size in sizes:
+        chunks += chunker.write(data[offset:offset + size])
+        offset += size
+    assert all(len(chunk) == CHUNK for chunk in chunks)
+    tail = chunker.flush()
+    assert len(tail) == len(data) % CHUNK
+    np.testing.assert_array_equal(np.concatenate(chunks + [tail]), data)
+    assert chunker.flush() is None
+
+
+def test_chunks_are_independent_arrays():
+    chunker = AudioChunker(4)
+    first, = chunker.write(np.arange(6, dtype=np.float32))
+    second, = chunker.write(np.arange(10, 12, dtype=np.float32))
+    np.testing.assert_array_equal(first, [0, 1, 2, 3])
+    np.testing.assert_array_equal(second, [4, 5, 10, 11])
+
+
+def test_resampled_capture_loses_no_samples():
+    """按客户端采集循环的方式：48 kHz 每次 1024 个样本，重采样后拼块"""
+    resampler = create_resampler(48000, 16000)
+    chunker = AudioChunker(CHUNK)
+    total = 0
+    for _ in range(48000 * 60 // 1024):  # 约 60 秒
+        out = resampler.process(np.random.default_rng(total).standard_normal(1024).astype(np.float32))
+        total += len(out)
+        for chunk in chunker.write(out):
+            total -= len(chunk)
+    tail = resampler.flush()
+    total += len(tail)
+    chunker.write(tail)
+    rest = chunker.flush()
+    assert total == (0 if rest is None else len(rest))
@@ -1,78 +1,348 @@
 import os
+import asyncio
 import base64
+import importlib.util
 import logging
 import time
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
 from config.config import Config
+from backend.audio_codecs import WavCodec, create_codec
+from backend.endpoint_router import Endpoint, EndpointRouter
+from backend.resilience import (CircuitBreaker, CircuitOpenError, LatencyTracker, ResilientCaller,
+                                 is_attempt_timeout)
+from backend.transcript_cache import TranscriptCache, audio_fingerprint
 
 logger = logging.getLogger(__name__)
 
 class QwenASRService:
-    """Qwen3 API 的 ASR 服务"""
-    
+    """Qwen3 API 的 ASR 服务（AsyncOpenAI + 共享 httpx 连接池）
+
+    所有请求复用同一个连接池（keep-alive，安装 h2 时启用 HTTP/2 多路复用），
+    同时进行的请求数由信号量限制；每个请求只占用一个协程，取消调用方任务即可中止请求。
+    请求经过 ResilientCaller：超时按音频时长缩放，截止时间内退避重试，慢请求发对冲请求，
+    服务持续失败时熔断。识别结果按音频内容缓存，重复出现的音频不再请求接口。
+    上传音频按配置编码（wav / flac / opus / mp3），压缩编码在独立线程池中执行。
+    传入 on_partial 时以流式方式请求，每收到新的文本片段就回调当前累计文本。
+    配置多个接口（ASR_ENDPOINTS）时由 EndpointRouter 分配请求，同一语音段的重试与对冲优先换接口。
+    """
+
     def __init__(self):
+        self.model_name = Config.QWEN_MODEL
+        self.timeout = Config.ASR_TIMEOUT
+        self.semaphore = asyncio.Semaphore(Config.ASR_MAX_IN_FLIGHT)  # 同时进行的请求上限
+        self.in_flight = 0  # 当前进行中的请求数
+        self.resilience = ResilientCaller(
+            base_timeout=Config.ASR_BASE_TIMEOUT,
+            timeout_per_second=Config.ASR_TIMEOUT_PER_SECOND,
+            max_timeout=self.timeout,
+            deadline_factor=Config.ASR_DEADLINE_FACTOR,
+            max_attempts=Config.ASR_MAX_ATTEMPTS,
+            backoff_base=Config.ASR_BACKOFF_BASE,
+            backoff_max=Config.ASR_BACKOFF_MAX,
+            hedge=Config.ASR_HEDGE,
+            hedge_percentile=Config.ASR_HEDGE_PERCENTILE,
+            breaker=CircuitBreaker(Config.ASR_BREAKER_FAILURES, Config.ASR_BREAKER_RESET,
+                                   half_open_timeout=Config.ASR_BREAKER_HALF_OPEN_TIMEOUT),
+            latency=LatencyTracker(),
+            retryable=is_retryable
+        )
+        self.payload_bytes = 0  # 累计上传的音频字节数（编码后）
+        try:
+            self.codec = create_codec(Config.ASR_AUDIO_CODEC, Config.SAMPLE_RATE, **Config.ASR_AUDIO_CODEC_OPTIONS)
+        except Exception as e:
+            logger.error(f"音频编码 {Config.ASR_AUDIO_CODEC} 不可用，改用 wav: {e}")
+            self.codec = WavCodec(Config.SAMPLE_RATE)
+        self.encoder_pool = ThreadPoolExecutor(max_workers=Config.ASR_ENCODER_THREADS,
+                                               thread_name_prefix='asr-encoder')
+        self.cache = None
+        if Config.TRANSCRIPT_CACHE_ENABLED:
+            self.cache = TranscriptCache(
+                max_entries=Config.TRANSCRIPT_CACHE_SIZE,
+                max_chars=Config.TRANSCRIPT_CACHE_MAX_CHARS,
+                ttl=Config.TRANSCRIPT_CACHE_TTL,
+                db_path=Config.TRANSCRIPT_CACHE_DB
+            )
         try:
-            from openai import OpenAI
-            self.client = OpenAI(
-                api_key=Config.DASHSCOPE_API_KEY,
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+            import httpx
+            from openai import AsyncOpenAI
+
+            # HTTP/2 需要 h2，未安装时退回 HTTP/1.1 keep-alive
+            http2 = Config.ASR_HTTP2 and importlib.util.find_spec('h2') is not None
+            if Config.ASR_HTTP2 and not http2:
+                logger.warning("未安装 h2，ASR 连接池使用 HTTP/1.1")
+            self.http_client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=Config.ASR_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.ASR_MAX_KEEPALIVE,
+                    keepalive_expiry=Config.ASR_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=Config.ASR_CONNECT_TIMEOUT)
+            )
+            # 所有接口共用同一个连接池
+            endpoints = []
+            for spec in Config.ASR_ENDPOINTS or [{'name': 'default', 'base_url': Config.ASR_BASE_URL}]:
+                api_key = spec.get('api_key') or (os.getenv(spec['api_key_env']) if 'api_key_env' in spec
+                                                  else Config.DASHSCOPE_API_KEY)
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=spec['base_url'],
+                    http_client=self.http_client,
+                    max_retries=0  # 重试由 ResilientCaller 负责
+                )
+                endpoints.append(Endpoint(spec.get('name', spec['base_url']), client,
+                                          spec.get('model', self.model_name)))
+            self.router = EndpointRouter(
+                endpoints,
+                policy=Config.ASR_ROUTING,
+                ewma_alpha=Config.ASR_EWMA_ALPHA,
+                eject_failures=Config.ASR_EJECT_FAILURES,
+                eject_time=Config.ASR_EJECT_TIME,
+                health_interval=Config.ASR_HEALTH_INTERVAL if len(endpoints) > 1 else 0,
+                probe=self.probe_endpoint
             )
-            self.model_name = Config.QWEN_MODEL
             self.initialized = True
-            logger.info("Qwen ASR 服务初始化成功")
+            logger.info(f"Qwen ASR 服务初始化成功（HTTP/2: {http2}，并发上限: {Config.ASR_MAX_IN_FLIGHT}，"
+                        f"接口: {[e.name for e in endpoints]}）")
         except Exception as e:
             logger.error(f"Qwen ASR 服务初始化失败: {e}")
             self.initialized = False
-        
-    def recognize_speech(self, audio_data: bytes) -> Dict[str, Any]:
-        """识别语音"""
+
+    async def recognize_speech(self, audio_data: bytes, duration: Optional[float] = None,
+                               on_partial: Optional[Callable[[str], Awaitable]] = None) -> Dict[str, Any]:
+        """识别语音（协程，可被取消）
+
+        duration 为音频时长（秒），缺省时按16位单声道PCM估算；
+        on_partial 为异步回调，流式识别期间以累计文本调用（至多每 ASR_PARTIAL_INTERVAL 秒一次）。
+        """
         if not self.initialized:
             return {
                 "success": False,
                 "error": "ASR 服务未正确初始化"
             }
-            
+
+        if duration is None:
+            duration = len(audio_data) / (Config.SAMPLE_RATE * 2)
+
         try:
             start_time = time.time()
-            # 编码为 base64
-            base64_audio = base64.b64encode(audio_data).decode('utf-8')
-            formatted_audio = f"data:audio/wav;base64,{base64_audio}"
-            
-            # 调用 API
-            completion = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "input_audio",
-                                "input_audio": {
-                                    "data": formatted_audio,
-                                },
-                            }
-                        ],
+            # 先查缓存（按音频内容，全静音的音频不缓存）
+            cache_key = audio_fingerprint(audio_data) if self.cache is not None else None
+            if cache_key is not None:
+                cached_text = await self.cache.get(cache_key)
+                if cached_text is not None:
+                    processing_time = time.time() - start_time
+                    logger.info(f"Qwen3 识别命中缓存，耗时: {processing_time * 1e6:.0f}us 「{cached_text}」")
+                    return {
+                        "success": True,
+                        "text": cached_text,
+                        "processing_time": processing_time,
+                        "cached": True
                     }
-                ],
-                timeout=30
+
+            # 按配置编码音频并转为 base64 data URI（字节数在事件循环中累计，编码线程不写共享状态）
+            if self.codec.inline:
+                formatted_audio, payload_size = self.encode_payload(audio_data)
+            else:
+                loop = asyncio.get_running_loop()
+                formatted_audio, payload_size = await loop.run_in_executor(self.encoder_pool, self.encode_payload,
+                                                                           audio_data)
+            self.payload_bytes += payload_size
+
+            first_token = []
+            tried = set()  # 本语音段已使用的接口
+            emit = None
+            if on_partial is not None and Config.ASR_STREAMING:
+                emit = self.partial_emitter(on_partial, start_time, first_token)
+            recognized_text = await self.resilience.call(
+                lambda timeout: self.attempt(formatted_audio, timeout, emit, tried), duration
             )
-            recognized_text = completion.choices[0].message.content
             processing_time = time.time() - start_time
-            
+            if cache_key is not None:
+                self.cache.put(cache_key, recognized_text)
+
             logger.info(f"Qwen3 识别成功，耗时: {processing_time:.2f}s 「{recognized_text}」")
-            
-            return {
+
+            result = {
                 "success": True,
                 "text": recognized_text,
                 "processing_time": processing_time
             }
-            
+            if first_token:
+                result["first_token_time"] = first_token[0]
+            return result
+
+        except CircuitOpenError as e:
+            logger.warning(f"Qwen3 识别被熔断: {e}")
+            return {
+                "success": False,
+                "error": "识别服务暂时不可用，请稍后重试"
+            }
         except Exception as e:
-            logger.error(f"Qwen3 识别失败: {e}")
+            logger.error(f"Qwen3 识别失败: {e!r}")
             return {
                 "success": False,
-                "error": f"识别失败: {str(e)}"
+                "error": f"识别失败: {str(e) or type(e).__name__}"
             }
 
+    def encode_payload(self, audio_data: bytes) -> Tuple[str, int]:
+        """编码音频并生成 data URI，返回 (data URI, 编码后字节数)；可在编码线程中调用"""
+        payload = self.codec.encode(audio_data)
+        base64_audio = base64.b64encode(payload).decode('utf-8')
+        return f"data:{self.codec.mime};base64,{base64_audio}", len(payload)
+
+    def partial_emitter(self, on_partial: Callable[[str], Awaitable], start_time: float, first_token: list):
+        """生成供各次请求共用的部分结果转发函数
+
+        重试与对冲时可能有多个请求同时产生文本，只转发最先产生文本的请求（该请求失败后
+        由下一个请求接替）；转发按 ASR_PARTIAL_INTERVAL 限频，最终结果由调用方另行发送。
+        """
+        state = {'owner': None, 'last': 0.0}
+
+        async def emit(owner, text: str, failed: bool = False):
+            if failed:
+                if state['owner'] is owner:
+                    state['owner'] = None
+                return
+            if state['owner'] is None:
+                state['owner'] = owner
+            if state['owner'] is not owner:
+                return
+            now = time.time()
+            if not first_token:
+                first_token.append(now - start_time)
+            elif now - state['last'] < Config.ASR_PARTIAL_INTERVAL:
+                return
+            state['last'] = now
+            await on_partial(text)
+
+        return emit
+
+    async def attempt(self, formatted_audio: str, timeout: float, emit=None, tried=None) -> str:
+        """一次请求（流式或非流式），失败时释放部分结果转发权"""
+        if emit is None:
+            return await self.request(formatted_audio, timeout, tried=tried)
+        owner = object()
+        try:
+            return await self.request(formatted_audio, timeout, lambda text: emit(owner, text), tried)
+        except BaseException:
+            await emit(owner, '', failed=True)
+            raise
+
+    async def request(self, formatted_audio: str, timeout: float,
+                      on_text: Optional[Callable[[str], Awaitable]] = None, tried: Optional[set] = None) -> str:
+        """单次 API 请求，失败时抛出异常；传入 on_text 时流式接收并回调累计文本
+
+        tried 为本语音段已使用过的接口，选择接口时尽量避开。
+        """
+        async with self.semaphore:
+            endpoint = self.router.select(tried or ())
+            if tried is not None:
+                tried.add(endpoint)
+            self.router.acquire(endpoint)
+            self.in_flight += 1
+            start = time.monotonic()
+            try:
+                if on_text is not None:
+                    text = await self.request_stream(endpoint, formatted_audio, timeout, on_text)
+                else:
+                    # 调用 API
+                    completion = await endpoint.client.chat.completions.create(
+                        model=endpoint.model,
+                        messages=self.build_messages(formatted_audio),
+                        timeout=timeout
+                    )
+                    text = completion.choices[0].message.content
+            except asyncio.CancelledError as e:
+                # 单次超时由 ResilientCaller 取消并标明；对冲落败或客户端断开的取消不算接口失败
+                self.router.release(endpoint, failed=is_attempt_timeout(e))
+                raise
+            except Exception as e:
+                self.router.release(endpoint, failed=is_retryable(e))
+                raise
+            else:
+                self.router.release(endpoint, time.monotonic() - start)
+            finally:
+                self.in_flight -= 1
+        return text
+
+    async def request_stream(self, endpoint: Endpoint, formatted_audio: str, timeout: float,
+                             on_text: Callable[[str], Awaitable]) -> str:
+        """流式请求：逐个消费增量片段，返回完整文本"""
+        stream = await endpoint.client.chat.completions.create(
+            model=endpoint.model,
+            messages=self.build_messages(formatted_audio),
+            stream=True,
+            # 通过 extra_body 传递，兼容不支持 stream_options 参数的旧版 openai
+            extra_body={"stream_options": {"include_usage": True}},
+            timeout=timeout
+        )
+        parts = []
+        try:
+            async for chunk in stream:
+                # include_usage 时最后一个 chunk 的 choices 为空列表，需要跳过
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    await on_text(''.join(parts))
+        finally:
+            # 提前退出（取消、超时）时关闭连接
+            await stream.response.aclose()
+        return ''.join(parts)
+
+    @staticmethod
+    def build_messages(formatted_audio: str) -> list:
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "input_audio",
+                        "input_audio": {
+                            "data": formatted_audio,
+                        },
+                    }
+                ],
+            }
+        ]
+
+    async def probe_endpoint(self, endpoint: Endpoint) -> bool:
+        """健康检查：请求 /models，接口有响应即认为可用（部分服务不提供 /models）"""
+        from openai import APIStatusError
+        try:
+            await endpoint.client.models.list(timeout=Config.ASR_CONNECT_TIMEOUT)
+        except APIStatusError as e:
+            return e.status_code < 500 and e.status_code != 429
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """运行指标：进行中请求数、容错统计、熔断状态与缓存命中率"""
+        return {
+            "in_flight": self.in_flight,
+            "codec": self.codec.name,
+            "payload_bytes": self.payload_bytes,
+            "resilience": dict(self.resilience.stats),
+            "breaker_state": self.resilience.breaker.state,
+            "latency_p95": self.resilience.latency.percentile(95),
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "endpoints": self.router.stats() if self.initialized else []
+        }
+
+    async def close(self):
+        """关闭连接池、编码线程池与缓存"""
+        if self.initialized:
+            await self.router.close()
+            await self.http_client.aclose()
+        self.encoder_pool.shutdown(wait=False)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.close)  # 等待排队的磁盘写入
+
+def is_retryable(error: BaseException) -> bool:
+    """超时、连接错误、429 与 5xx 可重试；其余 4xx（请求本身有误）不重试"""
+    from openai import APIStatusError
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return True
+
 # 全局服务实例
-qwen_asr_service = QwenASRService()
\ No newline at end of file
+qwen_asr_service = QwenASRService()
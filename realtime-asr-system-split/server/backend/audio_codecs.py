@@ -0,0 +1,121 @@
+"""
+识别请求音频编码 - 可选 WAV / FLAC / Opus / MP3
+
+输入为16位单声道PCM（可带44字节WAV文件头），输出编码后的字节与 data URI 的 MIME 类型。
+FLAC / Opus / MP3 通过 soundfile（libsndfile ≥ 1.1）编码，未安装时只能使用 wav。
+"""
+import io
+import struct
+
+try:
+    import soundfile
+except ImportError:  # 未安装 soundfile 时只能使用 wav
+    soundfile = None
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+
+
+def strip_wav_header(audio_data: bytes) -> bytes:
+    """去掉 WAV 文件头，返回纯 PCM"""
+    if audio_data[:4] == b'RIFF':
+        return audio_data[WAV_HEADER_SIZE:]
+    return audio_data
+
+
+class PayloadCodec:
+    """请求音频编码器接口
+
+    inline 为 True 的编码器开销很小，直接在事件循环中执行；
+    其余编码器由调用方放到编码线程池中执行。
+    """
+
+    name = ''
+    mime = ''
+    inline = False
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+
+    def encode(self, audio_data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class WavCodec(PayloadCodec):
+    """未压缩 16 位 WAV（缺少文件头时补上）"""
+
+    name = 'wav'
+    mime = 'audio/wav'
+    inline = True
+
+    def encode(self, audio_data: bytes) -> bytes:
+        if audio_data[:4] == b'RIFF':
+            return audio_data
+        size = len(audio_data) // 2 * 2
+        header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + size, b'WAVE', b'fmt ', 16, 1, 1,
+                             self.sample_rate, self.sample_rate * 2, 2, 16, b'data', size)
+        return header + audio_data[:size]
+
+
+class SoundFileCodec(PayloadCodec):
+    """soundfile 编码器基类，format / subtype 对应 libsndfile 的容器与编码"""
+
+    format = ''
+    subtype = None
+
+    def __init__(self, sample_rate: int = 16000, **options):
+        if soundfile is None:
+            raise ImportError(f"soundfile 未安装，无法使用 {self.name} 编码")
+        super().__init__(sample_rate)
+        self.options = options  # 如 compression_level / bitrate_mode
+
+    def encode(self, audio_data: bytes) -> bytes:
+        pcm = strip_wav_header(audio_data)
+        samples = np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype='<i2')
+        output = io.BytesIO()
+        soundfile.write(output, samples, self.sample_rate, format=self.format, subtype=self.subtype,
+                        **self.options)
+        return output.getvalue()
+
+
+class FlacCodec(SoundFileCodec):
+    """FLAC 无损压缩"""
+
+    name = 'flac'
+    mime = 'audio/flac'
+    format = 'FLAC'
+    subtype = 'PCM_16'
+
+
+class OpusCodec(SoundFileCodec):
+    """Ogg Opus 有损压缩"""
+
+    name = 'opus'
+    mime = 'audio/ogg'
+    format = 'OGG'
+    subtype = 'OPUS'
+
+
+class Mp3Codec(SoundFileCodec):
+    """MP3 有损压缩"""
+
+    name = 'mp3'
+    mime = 'audio/mpeg'
+    format = 'MP3'
+    subtype = 'MPEG_LAYER_III'
+
+
+PAYLOAD_CODECS = {
+    'wav': WavCodec,
+    'flac': FlacCodec,
+    'opus': OpusCodec,
+    'mp3': Mp3Codec,
+}
+
+
+def create_codec(name: str, sample_rate: int = 16000, **options) -> PayloadCodec:
+    """按名称创建请求音频编码器"""
+    if name not in PAYLOAD_CODECS:
+        raise ValueError(f"未知的音频编码: {name}，可选 {list(PAYLOAD_CODECS)}")
+    return PAYLOAD_CODECS[name](sample_rate, **options)
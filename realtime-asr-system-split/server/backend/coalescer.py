@@ -0,0 +1,68 @@
+"""
+语音段合并 - 将相邻的短语音段合并为一次识别请求，减少断续语音下的请求数
+"""
+from typing import List
+
+import numpy as np
+
+from backend.segmenter import Segment
+
+
+class SegmentCoalescer:
+    """短语音段合并器
+
+    时长不足 target_duration 的语音段先暂存；暂存音频累计达到 target_duration，
+    或最早暂存的语音段已等待 max_delay 秒（新增延迟预算）时，合并为一个语音段输出。
+    较长的语音段与强制切分的语音段不等待，连同暂存内容立即输出。
+    合并时段与段之间插入 join_silence 秒静音，保留停顿以便识别断句。
+    时间以样本时钟表示，与 VADEngine.sample_clock 一致。
+    """
+
+    def __init__(self, sample_rate: int, target_duration: float = 1.5, max_delay: float = 0.6,
+                 join_silence: float = 0.1):
+        self.sample_rate = sample_rate
+        self.target_samples = int(target_duration * sample_rate)
+        self.max_delay_samples = int(max_delay * sample_rate)
+        self.join_gap = np.zeros(int(join_silence * sample_rate), dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self.pending: List[Segment] = []
+        self.pending_samples = 0
+        self.pending_since = 0  # 最早暂存语音段入队时的样本时钟
+
+    def push(self, segment: Segment, now_sample: int) -> List[Segment]:
+        """输入一个语音段，返回可以送去识别的语音段"""
+        if not self.target_samples:
+            return [segment]
+        if not self.pending:
+            self.pending_since = now_sample
+        self.pending.append(segment)
+        self.pending_samples += len(segment.audio)
+
+        if (segment.forced or len(segment.audio) >= self.target_samples
+                or self.pending_samples >= self.target_samples):
+            return self.flush()
+        return self.poll(now_sample)
+
+    def poll(self, now_sample: int) -> List[Segment]:
+        """新增延迟达到预算时输出暂存的语音段"""
+        if self.pending and now_sample - self.pending_since >= self.max_delay_samples:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[Segment]:
+        """立即输出全部暂存内容（合并为一个语音段）"""
+        if not self.pending:
+            return []
+        if len(self.pending) == 1:
+            merged = self.pending[0]
+        else:
+            parts = [self.pending[0].audio]
+            for segment in self.pending[1:]:
+                parts.append(self.join_gap)
+                parts.append(segment.audio)
+            merged = Segment(np.concatenate(parts), self.pending[0].start_sample,
+                             self.pending[-1].end_sample, self.pending[-1].forced)
+        self.reset()
+        return [merged]
@@ -0,0 +1,128 @@
+"""
+语音分段 - 根据逐帧VAD判定切分语音段，带前导环（pre-roll）与拖尾（hangover），
+以及最大段长下的强制切分
+"""
+import math
+from collections import deque
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+
+class Segment(NamedTuple):
+    """一个完整的语音段，位置以样本序号表示"""
+    audio: np.ndarray
+    start_sample: int
+    end_sample: int
+    forced: bool = False  # 因达到最大段长而强制切分（说话人尚未停顿）
+
+
+class SpeechSegmenter:
+    """逐帧语音分段器
+
+    空闲时最近 pre_roll 秒的静音帧保存在环形队列中，检测到语音时一并并入语音段，
+    避免起音被截掉；连续静音达到 silence_threshold 秒后结束语音段，但只保留最后
+    一个语音帧之后 hangover 秒的音频，其余静音不上传，转入前导环供下一段使用。
+
+    语音段达到 max_duration 秒时，在末尾 cut_window 秒内寻找能量最低的帧处强制切分，
+    下一段从切点前 overlap 秒处开始，使长时间连续语音以长度有界的请求持续输出。
+    """
+
+    def __init__(self, sample_rate: int, frame_size: int, silence_threshold: float = 0.5,
+                 pre_roll: float = 0.2, hangover: float = 0.2, max_duration: Optional[float] = None,
+                 cut_window: float = 1.0, overlap: float = 0.0):
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        frames_per_second = sample_rate / frame_size
+        self.silence_frames = max(1, math.ceil(silence_threshold * frames_per_second))
+        self.pre_roll_frames = int(round(pre_roll * frames_per_second))
+        # 拖尾不超过结束判定所需的静音长度
+        self.hangover_frames = min(int(round(hangover * frames_per_second)), self.silence_frames)
+        self.pre_roll_ring = deque(maxlen=self.pre_roll_frames)
+
+        # 最大段长（帧），None 或 0 表示不限制
+        self.max_frames = int(round(max_duration * frames_per_second)) if max_duration else 0
+        if self.max_frames:
+            self.cut_window_frames = min(max(1, int(round(cut_window * frames_per_second))), self.max_frames - 1)
+            # 重叠部分不能超过切点之前的最短长度，否则下一段不会前进
+            self.overlap_frames = min(int(round(overlap * frames_per_second)),
+                                      self.max_frames - self.cut_window_frames - 1)
+        self.reset()
+
+    @property
+    def is_speaking(self) -> bool:
+        return self.chunk is not None
+
+    def reset(self):
+        """丢弃进行中的语音段与前导环"""
+        self.pre_roll_ring.clear()
+        self.chunk = None         # 进行中语音段的帧列表，None 表示空闲
+        self.start_sample = 0     # 进行中语音段的起始样本序号
+        self.trailing_silence = 0  # 最后一个语音帧之后的连续静音帧数
+
+    def push(self, frames: np.ndarray, decisions: np.ndarray, start_sample: int) -> List[Segment]:
+        """输入一批帧及其判定，返回本批中结束的语音段"""
+        segments = []
+        for i, is_speech in enumerate(decisions):
+            frame = frames[i]
+            if self.chunk is None:
+                if is_speech:
+                    # 语音开始：前导环中的静音帧作为起音前缀
+                    self.chunk = list(self.pre_roll_ring)
+                    self.chunk.append(frame)
+                    self.start_sample = start_sample + (i - len(self.pre_roll_ring)) * self.frame_size
+                    self.pre_roll_ring.clear()
+                    self.trailing_silence = 0
+                elif self.pre_roll_frames:
+                    self.pre_roll_ring.append(frame)
+                continue
+
+            self.chunk.append(frame)
+            if is_speech:
+                self.trailing_silence = 0
+            else:
+                self.trailing_silence += 1
+                if self.trailing_silence >= self.silence_frames:
+                    segments.append(self._close())
+                    continue
+            if self.max_frames and len(self.chunk) >= self.max_frames:
+                segments.append(self._cut())
+        return segments
+
+    def flush(self, tail: Optional[np.ndarray] = None) -> Optional[Segment]:
+        """停止时结束进行中的语音段（tail 为不足一帧的剩余样本），空闲时返回 None"""
+        if self.chunk is None:
+            self.reset()
+            return None
+        if tail is not None and len(tail) and self.trailing_silence == 0:
+            self.chunk.append(tail)
+        segment = self._close()
+        self.reset()
+        return segment
+
+    def _cut(self) -> Segment:
+        """在搜索窗口内能量最低的帧之前强制切分，保留重叠部分继续当前语音段"""
+        window_start = len(self.chunk) - self.cut_window_frames
+        window = np.stack(self.chunk[window_start:])
+        energy = np.einsum('ij,ij->i', window, window)
+        cut = window_start + int(np.argmin(energy))
+
+        audio = np.concatenate(self.chunk[:cut])
+        segment = Segment(audio, self.start_sample, self.start_sample + len(audio), forced=True)
+
+        resume = cut - self.overlap_frames
+        self.start_sample += resume * self.frame_size
+        self.chunk = self.chunk[resume:]
+        self.trailing_silence = min(self.trailing_silence, len(self.chunk))
+        return segment
+
+    def _close(self) -> Segment:
+        """按拖尾长度截断语音段，多余的静音帧转入前导环"""
+        keep = len(self.chunk) - self.trailing_silence + min(self.hangover_frames, self.trailing_silence)
+        audio = np.concatenate(self.chunk[:keep])
+        if self.pre_roll_frames:
+            self.pre_roll_ring.extend(self.chunk[keep:])
+        segment = Segment(audio, self.start_sample, self.start_sample + len(audio))
+        self.chunk = None
+        self.trailing_silence = 0
+        return segment
@@ -0,0 +1,229 @@
+"""
+多进程监督 - 启动多个工作进程通过 SO_REUSEPORT 共享监听端口，崩溃时重启，并汇总各进程的运行指标
+
+每个工作进程运行一个完整的 ServerWebSocketASR（各自的事件循环、识别后端与准入控制），
+由内核在进程间分配新连接。工作进程每 report_interval 秒把指标放入队列，监督进程合并后
+通过 HTTP GET /metrics 提供。注意准入控制的令牌桶在每个进程内独立计算。
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 合并时取各进程最大值的指标（延迟分位数、比率等不可相加）
+NON_ADDITIVE = ('p50', 'p95', 'rate', 'ewma', 'wait', 'window')
+
+
+def combine_metrics(reports: List[Any], key: str = '') -> Any:
+    """合并多个进程的同一项指标：计数相加，分位数与比率取最大，字符串不一致时列出全部取值"""
+    values = [r for r in reports if r is not None]
+    if not values:
+        return None
+    first = values[0]
+    if isinstance(first, dict):
+        keys = []
+        for value in values:
+            keys += [k for k in value if k not in keys]
+        return {k: combine_metrics([v.get(k) for v in values], k) for k in keys}
+    if isinstance(first, list):
+        if all(isinstance(item, dict) and 'name' in item for value in values for item in value):
+            # 按名称合并（如各接口的统计）
+            names = []
+            for value in values:
+                names += [item['name'] for item in value if item['name'] not in names]
+            return [combine_metrics([next((item for item in value if item['name'] == name), None)
+                                     for value in values], key) for name in names]
+        return first
+    if isinstance(first, bool):
+        return sum(1 for v in values if v)
+    if isinstance(first, (int, float)):
+        if any(part in key for part in NON_ADDITIVE):
+            return max(values)
+        total = sum(values)
+        return round(total, 3) if isinstance(total, float) else total
+    distinct = list(dict.fromkeys(values))
+    return distinct[0] if len(distinct) == 1 else distinct
+
+
+def run_worker(index: int, reports, report_interval: float):
+    """工作进程入口：以 SO_REUSEPORT 启动服务器，并定期上报指标"""
+    import asyncio
+    from backend.websocket_server import server_websocket_asr
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 由监督进程处理，再统一停止工作进程
+
+    async def report():
+        while True:
+            try:
+                reports.put_nowait((index, server_websocket_asr.worker_metrics()))
+            except Exception as e:
+                logger.error(f"工作进程 {index} 上报指标失败: {e}")
+            await asyncio.sleep(report_interval)
+
+    async def main():
+        reporter = asyncio.create_task(report())
+        try:
+            await server_websocket_asr.start_server(reuse_port=True)
+        finally:
+            reporter.cancel()
+
+    asyncio.run(main())
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics 返回合并后的指标"""
+
+    supervisor = None
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = json.dumps(self.supervisor.metrics(), ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"指标请求 {self.address_string()}: {format % args}")
+
+
+class Supervisor:
+    """监督进程
+
+    worker_target(index, reports, report_interval) 在工作进程中运行服务器（默认 run_worker）。
+    工作进程以 spawn 方式启动；退出后等待 restart_delay 秒重启，启动后 stable_time 秒内再次退出时
+    等待时间加倍（最多 max_restart_delay 秒），避免崩溃循环。
+    """
+
+    def __init__(self, workers: int, restart_delay: float = 1.0, max_restart_delay: float = 30.0,
+                 stable_time: float = 10.0, report_interval: float = 5.0,
+                 metrics_host: str = '127.0.0.1', metrics_port: Optional[int] = None,
+                 worker_target: Callable = run_worker):
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise RuntimeError("当前平台不支持 SO_REUSEPORT，无法以多进程模式运行")
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_time = stable_time
+        self.report_interval = report_interval
+        self.metrics_host = metrics_host
+        self.metrics_port = metrics_port
+        self.worker_target = worker_target
+        self.context = multiprocessing.get_context('spawn')
+        self.reports = self.context.Queue()
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self.started = [0.0] * workers
+        self.delays = [restart_delay] * workers
+        self.restart_at: Dict[int, float] = {}  # 工作进程编号 -> 计划重启时间
+        self.latest: Dict[int, dict] = {}      # 工作进程编号 -> 最近一次上报的指标
+        self.lock = threading.Lock()
+        self.stats = {'starts': 0, 'restarts': 0, 'crashes': 0}
+        self.http_server = None
+        self.running = False
+
+    def start_worker(self, index: int):
+        process = self.context.Process(target=self.worker_target, name=f'asr-worker-{index}',
+                                       args=(index, self.reports, self.report_interval), daemon=True)
+        process.start()
+        self.processes[index] = process
+        self.started[index] = time.monotonic()
+        self.stats['starts'] += 1
+        logger.info(f"工作进程 {index} 已启动，pid {process.pid}")
+
+    def check_workers(self, now: float):
+        """发现退出的工作进程并按退避时间重启"""
+        for index, process in enumerate(self.processes):
+            if index in self.restart_at:
+                if now >= self.restart_at[index]:
+                    del self.restart_at[index]
+                    self.stats['restarts'] += 1
+                    self.start_worker(index)
+                continue
+            if process is None or process.is_alive():
+                continue
+            self.stats['crashes'] += 1
+            with self.lock:
+                self.latest.pop(index, None)
+            if now - self.started[index] < self.stable_time:
+                self.delays[index] = min(self.delays[index] * 2, self.max_restart_delay)
+            else:
+                self.delays[index] = self.restart_delay
+            logger.error(f"工作进程 {index}（pid {process.pid}）退出，退出码 {process.exitcode}，"
+                         f"{self.delays[index]:.1f}s 后重启")
+            self.restart_at[index] = now + self.delays[index]
+
+    def collect_reports(self, timeout: float):
+        try:
+            index, report = self.reports.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            report['reported_at'] = time.time()
+            with self.lock:
+                self.latest[index] = report
+            try:
+                index, report = self.reports.get_nowait()
+            except queue.Empty:
+                return
+
+    def metrics(self) -> Dict[str, Any]:
+        """合并后的指标，并附各工作进程的原始指标"""
+        with self.lock:
+            latest = dict(sorted(self.latest.items()))
+        return {
+            "workers": self.workers,
+            "alive": sum(1 for p in self.processes if p is not None and p.is_alive()),
+            "supervisor": dict(self.stats),
+            "combined": combine_metrics([{k: v for k, v in r.items() if k not in ('pid', 'reported_at')}
+                                         for r in latest.values()]),
+            "per_worker": {str(index): report for index, report in latest.items()},
+        }
+
+    def start_metrics_server(self):
+        if self.metrics_port is None:
+            return
+        handler = type('SupervisorMetricsHandler', (MetricsHandler,), {'supervisor': self})
+        self.http_server = ThreadingHTTPServer((self.metrics_host, self.metrics_port), handler)
+        threading.Thread(target=self.http_server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"汇总指标: http://{self.metrics_host}:{self.http_server.server_port}/metrics")
+
+    def run(self):
+        """启动全部工作进程并持续监督，直到 stop() 或 KeyboardInterrupt"""
+        logger.info(f"监督进程 {os.getpid()} 启动 {self.workers} 个工作进程")
+        self.running = True
+        self.start_metrics_server()
+        for index in range(self.workers):
+            self.start_worker(index)
+        try:
+            while self.running:
+                self.collect_reports(timeout=0.2)
+                self.check_workers(time.monotonic())
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self.running = False
+
+    def shutdown(self):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=5)
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+        logger.info("全部工作进程已停止")
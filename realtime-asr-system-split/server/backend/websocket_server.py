@@ -2,16 +2,33 @@ import asyncio
 import websockets
 import json
 import logging
+import os
 import time
+import uuid
+from collections import deque
 from datetime import datetime
-from typing import Dict, Set
-from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set, Union
+
+import numpy as np
 
 from config.config import Config as ServerConfig
-from backend.asr_service import qwen_asr_service
+from backend.recognizer import create_recognizer, pcm_to_array
+from backend.admission import AdmissionRecognizer
+from backend.resampler import create_resampler
+from backend.vad import VADEngine, create_vad_backend
+from backend.segmenter import SpeechSegmenter
+from backend.coalescer import SegmentCoalescer
+from backend.wire_protocol import (SUBPROTOCOL_BINARY, SUBPROTOCOLS, decode_message, is_binary, select_subprotocol,
+                                   serialize)
 
 logger = logging.getLogger(__name__)
 
+# 流式接入支持的 PCM 格式（小端）
+PCM_FORMATS = {
+    'pcm_s16le': np.dtype('<i2'),
+    'pcm_f32le': np.dtype('<f4'),
+}
+
 class ServerWebSocketASR:
     """服务器WebSocket ASR服务 - 接收音频并返回识别结果"""
     
@@ -19,14 +36,47 @@ class ServerWebSocketASR:
         self.host = ServerConfig.WS_HOST
         self.port = ServerConfig.WS_PORT
         self.connected_clients: Set[websockets.WebSocketServerProtocol] = set()
-        self.thread_pool = ThreadPoolExecutor(max_workers=10)
+        self.connections: Dict[websockets.WebSocketServerProtocol, dict] = {}  # 每个连接的识别流水线状态
+        self.sessions: Dict[str, dict] = {}  # 会话编号 -> 流水线状态（断线后保留 SESSION_TTL 秒供恢复）
+        self.pipeline_window = ServerConfig.PIPELINE_WINDOW
+        self.sample_rate = ServerConfig.SAMPLE_RATE  # 识别与 VAD 使用的采样率
+        self.vad_frame_duration = 0.02  # 20ms帧，VAD要求10, 20 or 30ms
+        
+        # 识别后端：HTTP 接口或本机模型进程池
+        if ServerConfig.RECOGNIZER_BACKEND == 'local':
+            recognizer_options = {'model_factory': ServerConfig.LOCAL_MODEL_FACTORY,
+                                  'model_options': ServerConfig.LOCAL_MODEL_OPTIONS,
+                                  'workers': ServerConfig.LOCAL_MODEL_WORKERS,
+                                  'max_restarts': ServerConfig.LOCAL_MODEL_MAX_RESTARTS,
+                                  'restart_backoff': ServerConfig.LOCAL_MODEL_RESTART_BACKOFF}
+        else:
+            recognizer_options = {}
+        self.recognizer = create_recognizer(ServerConfig.RECOGNIZER_BACKEND, ServerConfig.SAMPLE_RATE,
+                                            **recognizer_options)
+        # 所有连接共用的准入控制
+        if ServerConfig.ADMISSION_REQUESTS_PER_SECOND > 0 or ServerConfig.ADMISSION_AUDIO_SECONDS_PER_MINUTE > 0:
+            self.recognizer = AdmissionRecognizer(
+                self.recognizer,
+                requests_per_second=ServerConfig.ADMISSION_REQUESTS_PER_SECOND,
+                request_burst=ServerConfig.ADMISSION_REQUEST_BURST,
+                audio_seconds_per_minute=ServerConfig.ADMISSION_AUDIO_SECONDS_PER_MINUTE,
+                audio_burst=ServerConfig.ADMISSION_AUDIO_BURST,
+                policy=ServerConfig.ADMISSION_POLICY,
+                max_wait=ServerConfig.ADMISSION_MAX_WAIT,
+                max_queue=ServerConfig.ADMISSION_MAX_QUEUE
+            )
         
     async def handle_client(self, websocket):
         """处理客户端连接"""
         client_id = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
         self.connected_clients.add(websocket)
+        connection = self.create_connection(websocket)
+        self.connections[websocket] = connection
+        if ServerConfig.STREAM_INGEST_DEFAULT:
+            connection['ingest'] = self.create_stream_ingest({})
         
-        logger.info(f"客户端连接: {client_id}, 当前连接数: {len(self.connected_clients)}")
+        logger.info(f"客户端连接: {client_id}（协议: {websocket.subprotocol or 'legacy'}）, "
+                    f"当前连接数: {len(self.connected_clients)}")
         
         try:
             # 发送连接成功消息
@@ -47,15 +97,176 @@ class ServerWebSocketASR:
         finally:
             if websocket in self.connected_clients:
                 self.connected_clients.remove(websocket)
+            self.detach(websocket, client_id)
             logger.info(f"客户端清理完成: {client_id}, 剩余连接数: {len(self.connected_clients)}")
     
+    def create_connection(self, websocket) -> dict:
+        """创建连接的流水线状态：最多 pipeline_window 个音频段同时识别，结果按到达顺序发送"""
+        return {
+            'websocket': websocket,  # 当前连接，会话断线期间为 None
+            'session_id': None,   # 建立会话后断线不取消识别，结果保留在 replay 中供恢复
+            'replay': None,       # 最近发送的识别结果（有界），按客户端确认的序号重发
+            'expiry': None,       # 断线后的会话过期任务
+            'received': {},       # 流编号 -> 已收到的最大音频帧序号，恢复时告知客户端从何处重发
+            'next_sequence': 0,   # 旧协议下下一个音频段的序号
+            'next_slot': 0,       # 下一个到达的音频段在连接内的顺序号
+            'next_delivery': 0,   # 下一个应发送结果的顺序号
+            'results': {},        # 已完成但尚未按序发送的结果，顺序号 -> 响应（None 表示不发送）
+            'send_lock': asyncio.Lock(),
+            'window': asyncio.Semaphore(self.pipeline_window),  # 已到达但结果尚未发送的音频段
+            'tasks': set(),
+            'ingest': None,       # 流式接入状态（start_stream 后创建），None 表示每条二进制消息即一个音频段
+        }
+    
+    def detach(self, websocket, client_id: str):
+        """连接断开：没有会话时取消进行中的识别；有会话时保留状态，SESSION_TTL 秒内可恢复"""
+        connection = self.connections.pop(websocket, None)
+        if connection is None or connection['websocket'] is not websocket:
+            return  # 会话已被新连接接管
+        connection['websocket'] = None
+        if connection['session_id'] is None:
+            for task in list(connection['tasks']):
+                task.cancel()
+            return
+        logger.info(f"客户端 {client_id} 断线，会话 {connection['session_id']} 保留 {ServerConfig.SESSION_TTL}s")
+        connection['expiry'] = asyncio.create_task(self.expire_session(connection))
+    
+    async def expire_session(self, connection: dict):
+        await asyncio.sleep(ServerConfig.SESSION_TTL)
+        self.sessions.pop(connection['session_id'], None)
+        for task in list(connection['tasks']):
+            task.cancel()
+        logger.info(f"会话 {connection['session_id']} 已过期")
+    
+    async def handle_session(self, websocket, client_id: str, data: dict):
+        """建立或恢复会话（须在发送音频前）
+
+        {"type": "session"} 建立新会话；{"type": "session", "session_id": ..., "acked": {流编号: 已确认的最大序号}}
+        恢复会话：重发回放缓冲区中序号大于已确认序号的识别结果，断线期间完成的识别不再重复计费；
+        回复中的 received 为各流已收到的最大音频帧序号（仅二进制子协议），客户端只需重发其后的音频。
+        会话不存在或已过期时建立新会话（resumed 为 False），客户端需自行重发未确认的音频。
+        会话仅支持二进制子协议：旧协议与 JSON 子协议下音频段没有客户端序号，无法判断哪些音频需要重发。
+        流式接入（含 STREAM_INGEST_DEFAULT）的连接恢复时沿用会话的分段状态；回复中的 segmented 表示
+        结果序号为服务器分配的语音段序号，不对应客户端的音频帧序号。
+        """
+        if not is_binary(websocket.subprotocol):
+            raise ValueError(f"会话需要 {SUBPROTOCOL_BINARY} 子协议")
+        current = self.connections[websocket]
+        if current['received'] or current['next_slot'] or current['session_id'] is not None:
+            raise ValueError("会话消息须在发送音频前发送")
+        session = self.sessions.get(data.get('session_id') or '')
+        if session is None:
+            current['session_id'] = uuid.uuid4().hex
+            current['replay'] = deque(maxlen=ServerConfig.SESSION_REPLAY_BUFFER)
+            self.sessions[current['session_id']] = current
+            logger.info(f"客户端 {client_id} 建立会话 {current['session_id']}")
+            await websocket.send(json.dumps({
+                "type": "session",
+                "session_id": current['session_id'],
+                "resumed": False,
+                "segmented": current['ingest'] is not None,
+                "timestamp": datetime.now().isoformat()
+            }))
+            return
+        
+        # 接管会话：仍未断开的旧连接（半开连接）直接关闭
+        old = session['websocket']
+        if old is not None and old is not websocket:
+            self.connections.pop(old, None)
+            asyncio.create_task(old.close())
+        if session['expiry'] is not None:
+            session['expiry'].cancel()
+            session['expiry'] = None
+        if session['ingest'] is None:
+            session['ingest'] = current['ingest']  # 默认或本连接已声明的流式接入；会话已有分段状态时沿用
+        acked = {int(stream_id): int(sequence) for stream_id, sequence in data.get('acked', {}).items()}
+        async with session['send_lock']:
+            session['websocket'] = websocket
+            self.connections[websocket] = session
+            replay = [response for response in session['replay']
+                      if response['sequence'] > acked.get(response.get('stream_id', 0), -1)]
+            logger.info(f"客户端 {client_id} 恢复会话 {session['session_id']}，重发 {len(replay)} 个结果")
+            await websocket.send(json.dumps({
+                "type": "session",
+                "session_id": session['session_id'],
+                "resumed": True,
+                "replayed": len(replay),
+                "segmented": session['ingest'] is not None,
+                "received": {str(stream_id): sequence for stream_id, sequence in session['received'].items()},
+                "timestamp": datetime.now().isoformat()
+            }))
+            for response in replay:
+                await websocket.send(serialize(response, websocket.subprotocol))
+    
+    async def send_to_client(self, connection: dict, message: dict):
+        """发送给连接当前的客户端；断线期间不发送（有会话时结果留在回放缓冲区）"""
+        websocket = connection['websocket']
+        if websocket is None:
+            return
+        try:
+            await websocket.send(serialize(message, websocket.subprotocol))
+        except websockets.ConnectionClosed:
+            logger.debug(f"连接已断开，未发送 {message.get('type')} #{message.get('sequence')}")
+    
+    def create_stream_ingest(self, data: dict) -> dict:
+        """按 start_stream 声明创建流式接入状态（格式解码、重采样、VAD、分段、短段合并）"""
+        sample_rate = int(data.get('sample_rate', self.sample_rate))
+        pcm_format = data.get('format', 'pcm_s16le')
+        channels = int(data.get('channels', 1))
+        if pcm_format not in PCM_FORMATS:
+            raise ValueError(f"不支持的音频格式: {pcm_format}，可选 {list(PCM_FORMATS)}")
+        if not 8000 <= sample_rate <= ServerConfig.STREAM_MAX_SAMPLE_RATE or not 1 <= channels <= 8:
+            raise ValueError(f"不支持的采样率或声道数: {sample_rate}Hz / {channels} 声道")
+        
+        vad_backend = create_vad_backend(ServerConfig.VAD_BACKEND, self.sample_rate, **ServerConfig.VAD_OPTIONS)
+        frame_size = int(self.sample_rate * self.vad_frame_duration)
+        return {
+            'stream_id': int(data.get('stream_id', 0)),
+            'sample_rate': sample_rate,
+            'dtype': PCM_FORMATS[pcm_format],
+            'channels': channels,
+            'remainder': b'',     # 上一条消息末尾不足一个采样帧的字节
+            'resampler': create_resampler(  # 有状态重采样器 → 16000Hz，采样率一致时不重采样
+                sample_rate, self.sample_rate, quality=ServerConfig.RESAMPLE_QUALITY,
+                backend=ServerConfig.RESAMPLER_BACKEND
+            ) if sample_rate != self.sample_rate else None,
+            'vad': VADEngine(vad_backend, self.sample_rate, self.vad_frame_duration),
+            'segmenter': SpeechSegmenter(  # 语音分段（前导环 + 拖尾）
+                self.sample_rate, frame_size, ServerConfig.VAD_SILENCE_THRESHOLD,
+                pre_roll=(ServerConfig.VAD_PRE_ROLL if ServerConfig.VAD_PRE_ROLL is not None
+                          else vad_backend.DEFAULT_PRE_ROLL),
+                hangover=(ServerConfig.VAD_HANGOVER if ServerConfig.VAD_HANGOVER is not None
+                          else vad_backend.DEFAULT_HANGOVER),
+                max_duration=ServerConfig.MAX_SEGMENT_DURATION, cut_window=ServerConfig.SEGMENT_CUT_WINDOW,
+                overlap=ServerConfig.SEGMENT_OVERLAP
+            ),
+            'coalescer': SegmentCoalescer(  # 短语音段合并
+                self.sample_rate, target_duration=ServerConfig.COALESCE_TARGET_DURATION,
+                max_delay=ServerConfig.COALESCE_MAX_DELAY, join_silence=ServerConfig.COALESCE_JOIN_SILENCE
+            ),
+        }
+    
     async def handle_audio_message(self, websocket, client_id: str, message):
         """处理音频消息"""
         try:
             if isinstance(message, bytes):
-                # 二进制消息是音频数据
+                # 二进制消息是音频数据：二进制子协议下为带帧头的音频帧，旧协议下为裸 PCM
                 logger.debug(f"收到音频数据，长度: {len(message)} 字节")
-                await self.process_audio_data(websocket, client_id, message)
+                if is_binary(websocket.subprotocol):
+                    frame = decode_message(message)
+                    if frame['type'] != 'audio':
+                        logger.warning(f"客户端 {client_id} 发送了非音频帧: {frame['type']}")
+                        return
+                    audio_data = frame.pop('audio')
+                    received = self.connections[websocket]['received']
+                    received[frame['stream_id']] = max(frame['sequence'], received.get(frame['stream_id'], -1))
+                else:
+                    frame, audio_data = None, message
+                connection = self.connections[websocket]
+                if connection['ingest'] is not None:
+                    await self.ingest_audio(websocket, client_id, connection, audio_data)
+                else:
+                    await self.submit_audio(websocket, client_id, audio_data, frame)
             else:
                 # 文本消息可能是控制命令
                 data = json.loads(message)
@@ -66,6 +277,24 @@ class ServerWebSocketASR:
                         "type": "pong",
                         "timestamp": datetime.now().isoformat()
                     }))
+                elif message_type == "session":
+                    await self.handle_session(websocket, client_id, data)
+                elif message_type == "start_stream":
+                    await self.handle_start_stream(websocket, client_id, data)
+                elif message_type == "end_stream":
+                    await self.handle_end_stream(websocket, client_id)
+                elif message_type == "metrics":
+                    # 运行指标（缓存命中率、容错统计等）
+                    connection = self.connections[websocket]
+                    await websocket.send(json.dumps({
+                        "type": "metrics",
+                        "metrics": self.recognizer.metrics(),
+                        "pipeline": {
+                            "window": self.pipeline_window,
+                            "in_flight": connection['next_slot'] - connection['next_delivery']
+                        },
+                        "timestamp": datetime.now().isoformat()
+                    }))
                 else:
                     logger.warning(f"未知消息类型: {message_type}")
                     
@@ -77,18 +306,168 @@ class ServerWebSocketASR:
                 "timestamp": datetime.now().isoformat()
             }))
     
-    async def process_audio_data(self, websocket, client_id: str, audio_data: bytes):
-        """处理音频数据并返回识别结果"""
+    async def handle_start_stream(self, websocket, client_id: str, data: dict):
+        """进入流式接入模式：此后的二进制消息为连续 PCM，由服务器分段后识别
+
+        声明字段: sample_rate（默认 16000）、format（pcm_s16le / pcm_f32le）、channels（默认 1，多声道交错）、
+        stream_id（写入结果的流编号）。再次声明时先结束上一条流。
+        """
+        connection = self.connections[websocket]
+        if connection['ingest'] is not None:
+            await self.handle_end_stream(websocket, client_id, notify=False)
+        connection['ingest'] = self.create_stream_ingest(data)
+        ingest = connection['ingest']
+        logger.info(f"客户端 {client_id} 开始流式推送: {ingest['sample_rate']}Hz {ingest['dtype'].str} "
+                    f"{ingest['channels']} 声道")
+        await websocket.send(json.dumps({
+            "type": "status",
+            "message": "音频流已开始",
+            "timestamp": datetime.now().isoformat()
+        }))
+    
+    async def handle_end_stream(self, websocket, client_id: str, notify: bool = True):
+        """结束流式接入：送出进行中的语音段，恢复为每条二进制消息即一个音频段"""
+        connection = self.connections[websocket]
+        ingest = connection['ingest']
+        if ingest is None:
+            return
+        segments = []
+        if ingest['resampler'] is not None:
+            segments += self.segment_audio(ingest, ingest['resampler'].flush())
+        tail = ingest['vad'].accumulator[:ingest['vad'].pending]
+        segment = ingest['segmenter'].flush(tail)
+        if segment is not None:
+            segments += ingest['coalescer'].push(segment, ingest['vad'].sample_clock)
+        segments += ingest['coalescer'].flush()
+        connection['ingest'] = None
+        for segment in segments:
+            await self.submit_segment(websocket, client_id, connection, ingest, segment)
+        logger.info(f"客户端 {client_id} 结束流式推送")
+        if notify:
+            await websocket.send(json.dumps({
+                "type": "status",
+                "message": "音频流已结束",
+                "timestamp": datetime.now().isoformat()
+            }))
+    
+    async def ingest_audio(self, websocket, client_id: str, connection: dict, audio_data: bytes):
+        """流式接入：解码一段连续 PCM，VAD 分段后把完整的语音段送入识别窗口"""
+        ingest = connection['ingest']
+        frame_bytes = ingest['dtype'].itemsize * ingest['channels']
+        if ingest['remainder']:
+            audio_data = ingest['remainder'] + audio_data
+        usable = len(audio_data) - len(audio_data) % frame_bytes
+        ingest['remainder'] = bytes(audio_data[usable:])
+        
+        audio = np.frombuffer(audio_data, dtype=ingest['dtype'], count=usable // ingest['dtype'].itemsize)
+        if ingest['channels'] > 1:
+            audio = audio.reshape(-1, ingest['channels']).mean(axis=1, dtype=np.float32)
+        audio = audio.astype(np.float32) / 32768.0 if ingest['dtype'].kind == 'i' else audio.astype(np.float32)
+        if ingest['resampler'] is not None:
+            audio = ingest['resampler'].process(audio)
+        
+        for segment in self.segment_audio(ingest, audio):
+            await self.submit_segment(websocket, client_id, connection, ingest, segment)
+    
+    def segment_audio(self, ingest: dict, audio: np.ndarray) -> list:
+        """VAD 分段并合并短语音段，返回可以送去识别的语音段"""
+        frames, decisions, start_sample = ingest['vad'].process(audio)
+        now_sample = ingest['vad'].sample_clock
+        segments = []
+        for segment in ingest['segmenter'].push(frames, decisions, start_sample):
+            segments += ingest['coalescer'].push(segment, now_sample)
+        segments += ingest['coalescer'].poll(now_sample)
+        return segments
+    
+    async def submit_segment(self, websocket, client_id: str, connection: dict, ingest: dict, segment):
+        """为语音段分配序号后送入识别窗口，结果带流编号与 16kHz 样本区间"""
+        if len(segment.audio) < ServerConfig.MIN_SPEECH_DURATION * self.sample_rate:
+            return
+        sequence = connection['next_sequence']
+        connection['next_sequence'] += 1
+        await self.submit_audio(websocket, client_id, segment.audio, {
+            'sequence': sequence,
+            'stream_id': ingest['stream_id'],
+            'start_sample': segment.start_sample,
+            'end_sample': segment.end_sample
+        })
+    
+    async def submit_audio(self, websocket, client_id: str, audio_data: Union[bytes, np.ndarray],
+                           frame: Optional[dict] = None):
+        """把音频段放入连接的识别窗口，不等待识别结果
+
+        窗口已满时在此等待，消息循环随之暂停读取该连接，背压经 TCP 传回客户端。
+        二进制音频帧或流式接入的语音段（frame）的流编号、序号与样本区间原样带回；
+        旧协议下由服务器按连接分配序号。
+        """
+        connection = self.connections[websocket]
+        await connection['window'].acquire()
+        if frame is not None:
+            sequence = frame['sequence']
+            position = {key: frame[key] for key in ('stream_id', 'start_sample', 'end_sample')}
+        else:
+            sequence = connection['next_sequence']
+            connection['next_sequence'] += 1
+            position = {}
+        slot = connection['next_slot']
+        connection['next_slot'] += 1
+        task = asyncio.create_task(
+            self.recognize_in_window(client_id, connection, slot, audio_data, sequence, position)
+        )
+        connection['tasks'].add(task)
+        task.add_done_callback(connection['tasks'].discard)
+    
+    async def recognize_in_window(self, client_id: str, connection: dict, slot: int,
+                                  audio_data: Union[bytes, np.ndarray], sequence: int, position: dict):
+        """识别一个音频段并按到达顺序发送结果"""
+        response = await self.process_audio_data(client_id, connection, audio_data, sequence, position)
+        await self.deliver_result(connection, slot, response)
+    
+    async def deliver_result(self, connection: dict, slot: int, response: Optional[dict]):
+        """按到达顺序发送识别结果，先完成的结果等待前面的音频段；每发出（或跳过）一个结果释放一个窗口位置
+
+        有会话时结果同时放入回放缓冲区，断线期间完成的结果在恢复时重发。
+        """
+        results = connection['results']
+        results[slot] = response
+        async with connection['send_lock']:
+            while connection['next_delivery'] in results:
+                response = results.pop(connection['next_delivery'])
+                connection['next_delivery'] += 1
+                connection['window'].release()
+                if response is None:
+                    continue
+                if connection['replay'] is not None:
+                    connection['replay'].append(response)
+                await self.send_to_client(connection, response)
+    
+    async def process_audio_data(self, client_id: str, connection: dict, audio_data: Union[bytes, np.ndarray],
+                                 sequence: int, position: dict) -> Optional[dict]:
+        """识别音频数据，返回发送给客户端的响应（客户端已断开或音频段被合并时返回 None）
+
+        识别过程中立即发送 partial_transcript（部分结果，不经过按序发送的结果缓冲区），
+        最终的 transcript 带相同的 sequence 以便客户端对应。
+        """
         try:
             logger.debug(f"处理客户端 {client_id} 的音频数据")
             
-            # 在线程池中调用ASR服务
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                self.thread_pool,
-                qwen_asr_service.recognize_speech,
-                audio_data
-            )
+            async def send_partial(text: str):
+                await self.send_to_client(connection, {
+                    "type": "partial_transcript",
+                    "text": text,
+                    "sequence": sequence,
+                    **position,
+                    "timestamp": datetime.now().isoformat()
+                })
+            
+            # 异步调用ASR服务，客户端断开时取消请求（有会话时继续识别）
+            result = await self.recognize_until_closed(connection, client_id, audio_data, send_partial)
+            if result is None:
+                logger.info(f"客户端 {client_id} 已断开，取消进行中的识别请求")
+                return None
+            if result.get("merged"):
+                # 已合并到更早的音频段一起识别，不单独发送结果
+                return None
             
             logger.debug(f"ASR服务返回结果: {result}")
             
@@ -98,31 +477,74 @@ class ServerWebSocketASR:
                     "type": "transcript",
                     "text": result["text"],
                     "timestamp": datetime.now().isoformat(),
-                    "processing_time": result.get("processing_time", 0)
+                    "processing_time": result.get("processing_time", 0),
+                    "first_token_time": result.get("first_token_time"),
+                    "sequence": sequence,
+                    **position
                 }
                 logger.info(f"ASR识别成功: 「{result['text']}」, 耗时: {result.get('processing_time', 0):.2f}s")
             else:
                 response = {
                     "type": "error",
                     "message": result.get("error", "识别失败"),
+                    "sequence": sequence,
+                    **position,
                     "timestamp": datetime.now().isoformat()
                 }
                 logger.warning(f"ASR识别失败: {result.get('error')}")
             
-            await websocket.send(json.dumps(response))
+            return response
             
         except Exception as e:
             logger.error(f"处理音频数据失败: {e}")
-            error_response = {
+            return {
                 "type": "error",
                 "message": f"处理音频数据失败: {str(e)}",
+                "sequence": sequence,
+                **position,
                 "timestamp": datetime.now().isoformat()
             }
-            await websocket.send(json.dumps(error_response))
     
-    async def start_server(self):
-        """启动 WebSocket 服务器"""
-        logger.info(f"启动服务器 WebSocket ASR 服务在 {self.host}:{self.port}")
+    async def recognize_until_closed(self, connection: dict, client_id: str, audio_data: Union[bytes, np.ndarray],
+                                     on_partial=None):
+        """调用识别后端（PCM 字节或 float32 语音段），连接先关闭时取消请求并返回 None
+
+        有会话的连接断线后继续识别，结果留待恢复时重发（会话过期时才取消）。
+        """
+        audio = pcm_to_array(audio_data) if isinstance(audio_data, bytes) else audio_data
+        recognition = asyncio.ensure_future(
+            self.recognizer.recognize(audio, on_partial=on_partial, stream=client_id)
+        )
+        websocket = connection['websocket']
+        if connection['session_id'] is not None or websocket is None:
+            return await recognition
+        closed = asyncio.ensure_future(websocket.wait_closed())
+        try:
+            await asyncio.wait({recognition, closed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not recognition.done():
+                recognition.cancel()
+        if recognition.cancelled():
+            return None
+        return recognition.result()
+    
+    def worker_metrics(self) -> dict:
+        """本进程的运行指标（多进程模式下由监督进程汇总）"""
+        return {
+            "pid": os.getpid(),
+            "connections": len(self.connected_clients),
+            "in_flight": sum(c['next_slot'] - c['next_delivery'] for c in self.connections.values()),
+            "streaming": sum(1 for c in self.connections.values() if c['ingest'] is not None),
+            "sessions": len(self.sessions),
+            "detached_sessions": sum(1 for c in self.sessions.values() if c['websocket'] is None),
+            "recognizer": self.recognizer.metrics()
+        }
+    
+    async def start_server(self, reuse_port: bool = False):
+        """启动 WebSocket 服务器（reuse_port 为 True 时多个进程可共享监听端口）"""
+        logger.info(f"启动服务器 WebSocket ASR 服务在 {self.host}:{self.port}（进程 {os.getpid()}）")
+        self.recognizer.start()
         
         async with websockets.serve(
             self.handle_client,
@@ -130,7 +552,11 @@ class ServerWebSocketASR:
             self.port,
             ping_interval=20,
             ping_timeout=10,
-            max_size=ServerConfig.MAX_AUDIO_SIZE
+            max_size=ServerConfig.MAX_AUDIO_SIZE,
+            # 协商二进制 / JSON 子协议，未提供子协议的旧客户端按 JSON 处理
+            subprotocols=SUBPROTOCOLS,
+            select_subprotocol=select_subprotocol,
+            reuse_port=reuse_port
         ):
             logger.info("服务器 WebSocket ASR 服务已启动，等待客户端连接...")
             await asyncio.Future()  # 永久运行
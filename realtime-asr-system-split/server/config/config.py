@@ -8,13 +8,102 @@ class Config:
     WS_HOST = '0.0.0.0'  # 监听所有接口
     WS_PORT = 8756
     
+    # 多进程模式（SERVER_WORKERS > 1 时由监督进程启动工作进程，SO_REUSEPORT 共享监听端口，需 Linux）
+    SERVER_WORKERS = 1  # 工作进程数
+    WORKER_RESTART_DELAY = 1.0  # 工作进程退出后的重启等待（秒），频繁崩溃时加倍
+    WORKER_MAX_RESTART_DELAY = 30.0  # 重启等待上限（秒）
+    WORKER_REPORT_INTERVAL = 5.0  # 工作进程上报指标的间隔（秒）
+    SUPERVISOR_METRICS_HOST = '127.0.0.1'
+    SUPERVISOR_METRICS_PORT = 8757  # 汇总指标 HTTP 端口（GET /metrics），None 不启动
+    
     # Qwen3 API 配置
     Qwen3_API_URL = 'https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions'
     DASHSCOPE_API_KEY = os.getenv('DASHSCOPE_API_KEY')
     QWEN_MODEL = 'qwen3-omni-30b-a3b-captioner'
+
+    # ASR 请求配置
+    ASR_TIMEOUT = 30.0  # 单次请求超时上限（秒）
+    ASR_CONNECT_TIMEOUT = 5.0  # 建立连接超时（秒）
+    ASR_MAX_IN_FLIGHT = 64  # 同时进行的ASR请求上限
+    ASR_MAX_CONNECTIONS = 32  # 连接池最大连接数
+    ASR_MAX_KEEPALIVE = 16  # 连接池保持的空闲连接数
+    ASR_KEEPALIVE_EXPIRY = 60.0  # 空闲连接保持时长（秒）
+    ASR_HTTP2 = True  # 启用HTTP/2多路复用（需要安装 h2）
+    ASR_AUDIO_CODEC = 'wav'  # 上传音频编码: wav / flac / opus / mp3（压缩编码需要 soundfile）
+    ASR_AUDIO_CODEC_OPTIONS = {}  # 传给编码器的参数，如 {'compression_level': 0.5}
+    ASR_ENCODER_THREADS = 2  # 压缩编码线程数
+    ASR_STREAMING = True  # 流式识别，识别过程中推送 partial_transcript 消息
+    ASR_PARTIAL_INTERVAL = 0.1  # partial_transcript 消息最小间隔（秒）
+    ASR_BASE_URL = 'https://dashscope.aliyuncs.com/compatible-mode/v1'  # 可指向本地模拟服务
+    ASR_BASE_TIMEOUT = 5.0  # 单次请求基础超时（秒），再按音频时长增加
+    ASR_TIMEOUT_PER_SECOND = 1.0  # 每秒音频增加的超时（秒）
+    ASR_DEADLINE_FACTOR = 2.5  # 语音段截止时间 = 单次超时 × 该系数，重试须在截止时间内完成
+    ASR_MAX_ATTEMPTS = 3  # 每个语音段最多请求次数
+    ASR_BACKOFF_BASE = 0.2  # 指数退避初始间隔（秒）
+    ASR_BACKOFF_MAX = 2.0  # 指数退避最大间隔（秒）
+    ASR_HEDGE = True  # 请求超过滚动延迟百分位仍未返回时发出对冲请求
+    ASR_HEDGE_PERCENTILE = 95.0  # 对冲请求触发的延迟百分位
+    ASR_BREAKER_FAILURES = 5  # 连续失败多少次后熔断
+    ASR_BREAKER_RESET = 10.0  # 熔断持续时长（秒），之后放行探测请求
+    ASR_BREAKER_HALF_OPEN_TIMEOUT = 30.0  # 探测请求超过该时长（秒）仍无结果时重新熔断
+    ASR_ENDPOINTS = []  # 多个识别接口，为空时只使用 ASR_BASE_URL；每项如
+    # {'name': 'vllm', 'base_url': 'http://10.0.0.2:8000/v1', 'model': 'Qwen3-Omni', 'api_key': 'EMPTY'}，
+    # 省略 model 时使用 QWEN_MODEL，省略 api_key 时读取 api_key_env 指定的环境变量或 DASHSCOPE_API_KEY
+    ASR_ROUTING = 'least_outstanding'  # 多接口路由策略: least_outstanding / ewma
+    ASR_EWMA_ALPHA = 0.3  # 接口延迟 EWMA 的平滑系数
+    ASR_EJECT_FAILURES = 3  # 接口连续失败多少次后摘除
+    ASR_EJECT_TIME = 10.0  # 接口摘除时长（秒），重复摘除时加倍，之后健康检查通过再加入
+    ASR_HEALTH_INTERVAL = 5.0  # 多接口时的健康检查间隔（秒），0 表示不检查
+
+    # 识别结果缓存
+    TRANSCRIPT_CACHE_ENABLED = True
+    TRANSCRIPT_CACHE_SIZE = 1024  # 内存缓存最大条目数
+    TRANSCRIPT_CACHE_MAX_CHARS = 1_000_000  # 内存缓存文本总字符数上限
+    TRANSCRIPT_CACHE_TTL = 24 * 3600  # 缓存有效期（秒）
+    TRANSCRIPT_CACHE_DB = None  # SQLite 磁盘缓存路径（如 'transcript_cache.sqlite3'），None 仅用内存
+
+    # 识别后端
+    RECOGNIZER_BACKEND = 'http'  # http: OpenAI 兼容接口（上面的 ASR_* 配置）/ local: 本机 CPU 模型进程池
+    LOCAL_MODEL_FACTORY = None  # 本地模型 'package.module:callable'，返回的模型提供 transcribe(audio, sample_rate) -> str
+    LOCAL_MODEL_OPTIONS = {}  # 传给本地模型工厂的参数
+    LOCAL_MODEL_WORKERS = 2  # 本地模型工作进程数（每个进程加载一份模型）
+    LOCAL_MODEL_MAX_RESTARTS = 3  # 进程池连续异常退出（如模型加载失败）多少次后停止重建
+    LOCAL_MODEL_RESTART_BACKOFF = 30.0  # 停止重建后多久（秒）再尝试创建进程池，期间请求直接返回错误
+
+    # 识别准入控制（全局令牌桶，0 表示不限制）
+    ADMISSION_REQUESTS_PER_SECOND = 0  # 每秒识别请求数上限
+    ADMISSION_REQUEST_BURST = 10  # 请求数突发上限
+    ADMISSION_AUDIO_SECONDS_PER_MINUTE = 0  # 每分钟识别音频秒数上限
+    ADMISSION_AUDIO_BURST = 30.0  # 音频秒数突发上限
+    ADMISSION_POLICY = 'queue'  # 预算用尽时: queue 排队 / merge 合并同一路流的排队语音段 / drop_oldest 丢弃最早的语音段
+    ADMISSION_MAX_WAIT = 5.0  # 最长排队时间（秒）
+    ADMISSION_MAX_QUEUE = 64  # 最大排队请求数
     
     # 音频处理配置
     MAX_AUDIO_SIZE = 10 * 1024 * 1024  # 10MB
+    SAMPLE_RATE = 16000  # 客户端上传的PCM采样率
+    PIPELINE_WINDOW = 4  # 每个连接同时识别的音频段数，窗口满时暂停读取该连接（对客户端形成背压）
+    SESSION_TTL = 30.0  # 会话断线后保留时长（秒），期间重连可恢复，进行中的识别继续完成
+    # 会话保存在工作进程内存中：SERVER_WORKERS > 1 时重连可能落到其他进程，此时建立新会话并由客户端重发音频
+    SESSION_REPLAY_BUFFER = 64  # 每个会话保留的最近识别结果数，恢复时重发客户端未确认的部分
+
+    # 流式接入：客户端以 start_stream 声明采样率与格式后连续推送 PCM，由服务器做 VAD 分段
+    STREAM_INGEST_DEFAULT = False  # 未声明的连接也按流式接入处理（16kHz 16位单声道），供无法发送声明的推流脚本使用
+    STREAM_MAX_SAMPLE_RATE = 192000  # 允许声明的最高采样率
+    RESAMPLE_QUALITY = 'HQ'  # 重采样质量: LQ / MQ / HQ / VHQ
+    RESAMPLER_BACKEND = 'auto'  # 重采样后端: soxr / polyphase / linear（auto 优先 soxr）
+    VAD_BACKEND = 'webrtc'  # VAD后端: webrtc / energy / spectral
+    VAD_OPTIONS = {'aggressiveness': 2}  # 传给VAD后端的参数（随后端不同而不同）
+    VAD_SILENCE_THRESHOLD = 0.5  # 连续静音多长时间（秒）结束语音段
+    VAD_PRE_ROLL = None  # 语音起点前保留时长（秒），None 使用后端默认值
+    VAD_HANGOVER = None  # 最后一个语音帧后保留时长（秒），None 使用后端默认值
+    MIN_SPEECH_DURATION = 0.01  # 短于此时长（秒）的语音段不送去识别
+    MAX_SEGMENT_DURATION = 10.0  # 最大语音段时长（秒），达到后强制切分，None 不限制
+    SEGMENT_CUT_WINDOW = 1.0  # 强制切分时在段末尾多长范围内（秒）寻找能量最低点
+    SEGMENT_OVERLAP = 0.0  # 强制切分后下一段与上一段的重叠时长（秒）
+    COALESCE_TARGET_DURATION = 1.5  # 短语音段合并的目标时长（秒），0 表示不合并
+    COALESCE_MAX_DELAY = 0.6  # 合并等待带来的最大新增延迟（秒）
+    COALESCE_JOIN_SILENCE = 0.1  # 合并时段间插入的静音时长（秒）
     
     # 日志配置
     LOG_LEVEL = 'INFO'
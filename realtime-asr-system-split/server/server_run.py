@@ -1,12 +1,21 @@
 #!/usr/bin/env python3
 """
 服务器启动脚本
+
+用法: python server_run.py [--workers N]
+N > 1 时以多进程模式运行：监督进程启动 N 个工作进程共享监听端口，崩溃的工作进程自动重启，
+汇总指标见 http://127.0.0.1:8757/metrics（端口见配置 SUPERVISOR_METRICS_PORT）。
 """
+import argparse
 import logging
-from backend.websocket_server import server_websocket_asr
+from config.config import Config
 
 def main():
     """主启动函数"""
+    parser = argparse.ArgumentParser(description="语音识别服务器")
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS, help='工作进程数')
+    args = parser.parse_args()
+    
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -16,8 +25,21 @@ def main():
     logger.info("正在启动语音识别服务器...")
     
     try:
-        # 启动WebSocket服务器
-        server_websocket_asr.run()
+        if args.workers > 1:
+            # 多进程模式：监督进程不创建识别服务，只管理工作进程
+            from backend.supervisor import Supervisor
+            Supervisor(
+                args.workers,
+                restart_delay=Config.WORKER_RESTART_DELAY,
+                max_restart_delay=Config.WORKER_MAX_RESTART_DELAY,
+                report_interval=Config.WORKER_REPORT_INTERVAL,
+                metrics_host=Config.SUPERVISOR_METRICS_HOST,
+                metrics_port=Config.SUPERVISOR_METRICS_PORT
+            ).run()
+        else:
+            # 启动WebSocket服务器
+            from backend.websocket_server import server_websocket_asr
+            server_websocket_asr.run()
         
     except KeyboardInterrupt:
         logger.info("收到中断信号，正在关闭服务器...")
@@ -0,0 +1,10 @@
+"""
+测试配置 - 把 realtime-asr-system-split/server 加入导入路径（与 run.py 的运行方式一致）
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DASHSCOPE_API_KEY', 'fake-key')
+os.chdir(tempfile.mkdtemp())  # 配置模块会在当前目录创建日志文件
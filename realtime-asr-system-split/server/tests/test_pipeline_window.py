@@ -0,0 +1,60 @@
+"""
+识别窗口测试 - 每个连接最多 PIPELINE_WINDOW 个音频段同时识别，结果按上传顺序返回
+"""
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from backend.recognizer import Recognizer
+from backend.websocket_server import ServerWebSocketASR
+from config.config import Config
+
+SEGMENT = bytes(int(0.1 * Config.SAMPLE_RATE) * 2)
+
+
+class ScriptedRecognizer(Recognizer):
+    """按调用顺序使用给定延迟，后上传的音频段先完成；记录最大并发数"""
+
+    def __init__(self, latencies):
+        super().__init__(Config.SAMPLE_RATE)
+        self.latencies = list(latencies)
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def recognize(self, audio, on_partial=None, stream=None):
+        index = self.calls
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latencies[index])
+        finally:
+            self.in_flight -= 1
+        return {"success": True, "text": f"segment {index}", "processing_time": self.latencies[index]}
+
+
+async def run(window: int, latencies):
+    server = ServerWebSocketASR()
+    server.pipeline_window = window  # 新连接按此创建窗口
+    server.recognizer = ScriptedRecognizer(latencies)
+    async with websockets.serve(server.handle_client, '127.0.0.1', 0) as ws:
+        port = list(ws.sockets)[0].getsockname()[1]
+        async with websockets.connect(f'ws://127.0.0.1:{port}') as client:
+            await client.recv()  # 连接状态消息
+            for _ in latencies:
+                await client.send(SEGMENT)
+            messages = [json.loads(await asyncio.wait_for(client.recv(), 10)) for _ in latencies]
+    return messages, server.recognizer.peak
+
+
+@pytest.mark.parametrize('window', [1, 3])
+def test_results_are_delivered_in_upload_order(window):
+    latencies = [0.15, 0.1, 0.05, 0.01, 0.12, 0.02]
+    messages, peak = asyncio.run(run(window, latencies))
+    assert [m['type'] for m in messages] == ['transcript'] * len(latencies)
+    assert [m['sequence'] for m in messages] == list(range(len(latencies)))
+    assert [m['text'] for m in messages] == [f"segment {i}" for i in range(len(latencies))]
+    assert peak == window  # 窗口内并发识别，且不超过窗口深度
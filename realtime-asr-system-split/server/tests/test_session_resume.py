@@ -0,0 +1,149 @@
+"""
+会话恢复测试 - 重连后只重发客户端未确认的识别结果，会话仅在二进制子协议下可用
+"""
+import asyncio
+import json
+
+import numpy as np
+import pytest
+import websockets
+
+from backend.recognizer import Recognizer
+from backend.websocket_server import ServerWebSocketASR
+from backend.wire_protocol import (SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON, SUBPROTOCOLS, decode_message, encode_audio,
+                                   select_subprotocol)
+from config.config import Config
+
+FRAME = bytes(int(0.1 * Config.SAMPLE_RATE) * 2)
+
+
+class CountingRecognizer(Recognizer):
+    """模拟识别服务：固定延迟，记录请求数"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(Config.SAMPLE_RATE)
+        self.latency = latency
+        self.requests = 0
+
+    async def recognize(self, audio, on_partial=None, stream=None):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return {"success": True, "text": "ok", "processing_time": self.latency}
+
+
+async def connect(url: str, session_id=None, acked=None):
+    client = await websockets.connect(url, subprotocols=[SUBPROTOCOL_BINARY])
+    await client.recv()  # 连接状态消息
+    await client.send(json.dumps({"type": "session", "session_id": session_id, "acked": acked or {}}))
+    return client, json.loads(await client.recv())
+
+
+async def receive_results(client, count: int):
+    results = []
+    while len(results) < count:
+        message = await asyncio.wait_for(client.recv(), 10)
+        if isinstance(message, bytes):
+            results.append(decode_message(message))
+    return results
+
+
+async def with_server(scenario, recognizer):
+    server = ServerWebSocketASR()
+    server.recognizer = recognizer
+    async with websockets.serve(server.handle_client, '127.0.0.1', 0, subprotocols=[SUBPROTOCOL_BINARY]) as ws:
+        port = list(ws.sockets)[0].getsockname()[1]
+        return server, await scenario(server, f'ws://127.0.0.1:{port}')
+
+
+def test_resume_replays_only_results_above_acked_sequence():
+    async def scenario(server, url):
+        client, reply = await connect(url)
+        assert not reply['resumed'] and not reply['segmented']
+        for sequence in range(4):
+            await client.send(encode_audio(FRAME, 0, sequence, sequence * len(FRAME) // 2))
+        assert [r['sequence'] for r in await receive_results(client, 4)] == [0, 1, 2, 3]
+        client.transport.abort()  # 客户端只确认了序号 1 之前的结果
+        await asyncio.sleep(0.1)
+
+        client, reply = await connect(url, reply['session_id'], {"0": 1})
+        replayed = await receive_results(client, reply['replayed'])
+        await client.close()
+        return reply, replayed
+
+    server, (reply, replayed) = asyncio.run(with_server(scenario, CountingRecognizer()))
+    assert reply['resumed'] and reply['received'] == {'0': 3}
+    assert [r['sequence'] for r in replayed] == [2, 3]
+    assert server.recognizer.requests == 4  # 已完成的识别不重复请求
+
+
+def test_results_finished_while_disconnected_are_replayed():
+    async def scenario(server, url):
+        client, reply = await connect(url)
+        for sequence in range(3):
+            await client.send(encode_audio(FRAME, 0, sequence, sequence * len(FRAME) // 2))
+        await client.send(json.dumps({"type": "ping"}))
+        while json.loads(await client.recv())['type'] != 'pong':
+            pass
+        client.transport.abort()  # 识别仍在进行
+        await asyncio.sleep(0.5)
+
+        client, reply = await connect(url, reply['session_id'], {})
+        replayed = await receive_results(client, reply['replayed'])
+        await client.close()
+        return reply, replayed
+
+    server, (reply, replayed) = asyncio.run(with_server(scenario, CountingRecognizer(0.2)))
+    assert reply['resumed'] and [r['sequence'] for r in replayed] == [0, 1, 2]
+    assert server.recognizer.requests == 3
+
+
+@pytest.mark.parametrize('subprotocols', [[SUBPROTOCOL_JSON], None])
+def test_session_without_binary_subprotocol_is_refused(subprotocols):
+    async def scenario():
+        server = ServerWebSocketASR()
+        async with websockets.serve(server.handle_client, '127.0.0.1', 0, subprotocols=SUBPROTOCOLS,
+                                    select_subprotocol=select_subprotocol) as ws:
+            port = list(ws.sockets)[0].getsockname()[1]
+            async with websockets.connect(f'ws://127.0.0.1:{port}', subprotocols=subprotocols) as client:
+                await client.recv()  # 连接状态消息
+                await client.send(json.dumps({"type": "session"}))
+                return server, json.loads(await client.recv())
+
+    server, reply = asyncio.run(scenario())
+    assert reply['type'] == 'error' and SUBPROTOCOL_BINARY in reply['message']
+    assert not server.sessions
+
+
+def test_stream_ingest_resume_keeps_segmenter_state(monkeypatch):
+    monkeypatch.setattr(Config, 'STREAM_INGEST_DEFAULT', True)
+    monkeypatch.setattr(Config, 'VAD_BACKEND', 'energy')
+    monkeypatch.setattr(Config, 'VAD_OPTIONS', {})
+    t = np.arange(Config.SAMPLE_RATE // 2) / Config.SAMPLE_RATE
+    tone = (0.3 * np.sin(2 * np.pi * 200 * t) * 32767).astype('<i2').tobytes()  # 0.5 秒“语音”
+    silence = bytes(Config.SAMPLE_RATE)                                          # 0.5 秒静音
+    frames = [tone] * 4 + [silence] * 4
+
+    async def scenario(server, url):
+        client, reply = await connect(url)
+        assert reply['segmented'] and not reply['resumed']
+        for sequence, pcm in enumerate(frames[:2]):  # 语音中途断线
+            await client.send(encode_audio(pcm, 0, sequence, sequence * len(pcm) // 2))
+        await client.send(json.dumps({"type": "ping"}))
+        await client.recv()
+        ingest = server.sessions[reply['session_id']]['ingest']
+        client.transport.abort()
+        await asyncio.sleep(0.1)
+
+        client, reply = await connect(url, reply['session_id'])
+        assert reply['resumed'] and reply['received'] == {'0': 1}
+        assert server.sessions[reply['session_id']]['ingest'] is ingest
+        for sequence in range(2, len(frames)):
+            await client.send(encode_audio(frames[sequence], 0, sequence, sequence * Config.SAMPLE_RATE // 2))
+        await client.send(json.dumps({"type": "end_stream"}))
+        results = await receive_results(client, 1)
+        await client.close()
+        return results
+
+    server, results = asyncio.run(with_server(scenario, CountingRecognizer()))
+    assert results[0]['type'] == 'transcript'
+    assert server.recognizer.requests == 1  # 断线前后的语音合为一个识别请求
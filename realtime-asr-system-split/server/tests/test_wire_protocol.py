@@ -0,0 +1,92 @@
+"""
+传输协议测试 - asr.binary.v1 帧的编解码往返、畸形帧拒绝与子协议协商
+"""
+import asyncio
+import json
+import struct
+
+import pytest
+import websockets
+
+from backend.websocket_server import ServerWebSocketASR
+from backend.wire_protocol import (AUDIO, HEADER, PROTOCOL_VERSION, SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON,
+                                   ProtocolError, decode_frame, decode_message, encode_audio, encode_frame,
+                                   select_subprotocol, serialize)
+
+POSITION = {"stream_id": 3, "sequence": 1234, "start_sample": 48_000_000, "end_sample": 48_032_000}
+
+
+def test_audio_frame_round_trip():
+    pcm = struct.pack('<4h', 0, 1, -1, 32767)
+    frame = encode_audio(pcm, 3, 1234, 48_000_000)
+    assert len(frame) == HEADER.size + len(pcm)
+    message = decode_message(frame)
+    assert message == {"type": "audio", "audio": pcm, "stream_id": 3, "sequence": 1234,
+                       "start_sample": 48_000_000, "end_sample": 48_000_004}
+
+
+@pytest.mark.parametrize('message', [
+    {"type": "transcript", "text": "今天下午三点开会", "processing_time": 0.5, "first_token_time": 0.25},
+    {"type": "transcript", "text": "", "processing_time": 0.5, "first_token_time": None},
+    {"type": "partial_transcript", "text": "今天下午"},
+    {"type": "error", "message": "识别失败"},
+    {"type": "status", "message": "已连接"},
+])
+def test_result_frames_round_trip(message):
+    message = {**message, **POSITION}
+    frame = serialize(message, SUBPROTOCOL_BINARY)
+    assert isinstance(frame, bytes)
+    decoded = decode_message(frame)
+    decoded.pop('timestamp')
+    assert decoded == message
+
+
+def test_json_subprotocol_and_control_messages_stay_text():
+    message = {"type": "transcript", "text": "你好", **POSITION}
+    assert json.loads(serialize(message, SUBPROTOCOL_JSON)) == message
+    assert json.loads(serialize(message, None)) == message
+    pong = {"type": "pong"}
+    assert serialize(pong, SUBPROTOCOL_BINARY) == json.dumps(pong)
+
+
+def test_unsupported_version_is_rejected():
+    frame = bytearray(encode_audio(bytes(4), 0, 0, 0))
+    frame[0] = PROTOCOL_VERSION + 1
+    with pytest.raises(ProtocolError, match='版本'):
+        decode_frame(bytes(frame))
+
+
+def test_truncated_and_unknown_frames_are_rejected():
+    with pytest.raises(ProtocolError):
+        decode_message(encode_audio(bytes(4), 0, 0, 0)[:HEADER.size - 1])
+    with pytest.raises(ProtocolError, match='帧类型'):
+        decode_message(encode_frame(99))
+    assert issubclass(ProtocolError, ValueError)
+    assert decode_frame(encode_frame(AUDIO))[0] == AUDIO  # 空负载的帧头本身合法
+
+
+def test_subprotocol_selection_prefers_binary():
+    server = [SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON]
+    assert select_subprotocol([SUBPROTOCOL_JSON, SUBPROTOCOL_BINARY], server) == SUBPROTOCOL_BINARY
+    assert select_subprotocol(object(), [SUBPROTOCOL_JSON]) == SUBPROTOCOL_JSON  # 新版回调签名
+    assert select_subprotocol([], server) is None  # 旧客户端按旧协议继续
+
+
+def test_server_reports_malformed_frame_and_keeps_connection():
+    async def scenario():
+        server = ServerWebSocketASR()
+        async with websockets.serve(server.handle_client, '127.0.0.1', 0, subprotocols=[SUBPROTOCOL_BINARY]) as ws:
+            port = list(ws.sockets)[0].getsockname()[1]
+            async with websockets.connect(f'ws://127.0.0.1:{port}', subprotocols=[SUBPROTOCOL_BINARY]) as client:
+                await client.recv()  # 连接状态消息
+                frame = bytearray(encode_audio(bytes(640), 0, 0, 0))
+                frame[0] = PROTOCOL_VERSION + 1
+                await client.send(bytes(frame))
+                error = json.loads(await client.recv())
+                await client.send(json.dumps({"type": "ping"}))
+                pong = json.loads(await client.recv())
+        return error, pong, server.connections
+
+    error, pong, connections = asyncio.run(scenario())
+    assert error['type'] == 'error' and '版本' in error['message']
+    assert pong['type'] == 'pong' and not connections
@@ -0,0 +1,122 @@
+"""
+单生产者/单消费者环形缓冲区 - 采集线程写入，asyncio 推流协程读取
+"""
+import asyncio
+import threading
+import numpy as np
+
+
+class RingBuffer:
+    """线程安全的 SPSC 环形缓冲区
+
+    存储区长度为容量的两倍，每个样本同时写入 i 与 i + size 两个位置，
+    因此任意不超过容量的可读区间都是连续内存，peek() 可直接返回视图。
+    缓冲区满时覆盖最旧的数据，读指针随之前移，被覆盖的样本数累计在 dropped。
+    消费者通过 wait_available() 挂起，直到生产者写入足够样本后被唤醒。
+    """
+
+    def __init__(self, size, dtype=np.float32):
+        self.size = size   #容量
+        self.dtype = np.dtype(dtype)
+        self.storage = np.zeros(size * 2, dtype=self.dtype)
+        self.write_count = 0  # 累计写入样本数
+        self.read_count = 0   # 累计读出（含被覆盖）样本数
+        self.dropped = 0      # 因溢出被覆盖的样本数
+        self.lock = threading.Lock()
+        self.waiter = None    # (所需样本数, 事件循环, future)，单消费者只有一个
+
+    @property
+    def available(self):
+        """当前可读样本数"""
+        return self.write_count - self.read_count
+
+    def write(self, data: np.ndarray):
+        """写入数据（生产者），溢出时覆盖最旧的数据"""
+        n = len(data)
+        if n > self.size:
+            data = data[-self.size:]  # 只保留最新
+        m = len(data)
+        with self.lock:
+            # 超出容量而被截掉的样本也计入写入总数，保证位置与计数一致
+            start = (self.write_count + n - m) % self.size
+            first = min(m, self.size - start)
+            # 主副本
+            self.storage[start:start + first] = data[:first]
+            self.storage[:m - first] = data[first:]
+            # 镜像副本
+            self.storage[self.size + start:self.size + start + first] = data[:first]
+            self.storage[self.size:self.size + m - first] = data[first:]
+            self.write_count += n
+
+            overflow = self.write_count - self.read_count - self.size
+            if overflow > 0:
+                self.read_count += overflow
+                self.dropped += overflow
+
+            waiter = None
+            if self.waiter is not None and self.available >= self.waiter[0]:
+                waiter, self.waiter = self.waiter, None
+
+        if waiter is not None:
+            # 生产者可能在其他线程，通过 call_soon_threadsafe 唤醒事件循环
+            _, loop, future = waiter
+            loop.call_soon_threadsafe(_wake, future)
+
+    async def wait_available(self, n, timeout=None) -> bool:
+        """等待至少 n 个样本可读（消费者），超时返回 False"""
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.available >= n:
+                return True
+            future = loop.create_future()
+            self.waiter = (n, loop, future)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                if self.waiter is not None and self.waiter[2] is future:
+                    self.waiter = None
+
+    def peek(self, n):
+        """返回最旧 n 个样本的连续只读视图（不消费），数据不足返回 None
+
+        视图在 consume() 之前有效；若期间发生溢出，视图内容可能被新数据覆盖。
+        """
+        with self.lock:
+            if n > self.available or n > self.size:
+                return None
+            start = self.read_count % self.size
+            view = self.storage[start:start + n]
+        view.flags.writeable = False
+        return view
+
+    def consume(self, n):
+        """丢弃最旧的 n 个样本（配合 peek 使用）"""
+        with self.lock:
+            self.read_count += min(n, self.available)
+
+    def read_into(self, out: np.ndarray) -> bool:
+        """读出 len(out) 个样本写入 out，不分配新内存；数据不足返回 False"""
+        n = len(out)
+        with self.lock:
+            if n > self.available:
+                return False  # 数据不足
+            start = self.read_count % self.size
+            out[:] = self.storage[start:start + n]
+            self.read_count += n
+        return True
+
+    def read(self, n):
+        """读出 n 个样本并返回副本，数据不足返回 None"""
+        out = np.empty(n, dtype=self.dtype)
+        if not self.read_into(out):
+            return None
+        return out
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)